@@ -0,0 +1,425 @@
+"""
+Bulk Scoring CLI
+
+Streams dogs and reviews from JSONL or CSV exports and scores every dog
+against a set of target dogs with the compatibility pipeline, writing one
+result row per (dog, target) pair as soon as its chunk is done.
+
+Reading, joining and chunking the exports is a chain of generators that runs
+in a background thread feeding one bounded queue. Each chunk is then scored as
+a single task on a pool of worker processes, with a bounded number of chunks
+in flight, and results are written in input order. Embedding, sentiment and
+the compatibility formula are fused in that task (BulkScorer.score_chunk)
+rather than run as separate queued stages, so per-chunk intermediates never
+cross a process boundary. Memory therefore depends on chunk size and worker
+count, never on the size of the exports.
+
+Both exports must be sorted by dog id (dogs by "id", reviews by "dog_id";
+numeric ids numerically), so each dog's reviews can be merge-joined without
+holding them all in memory.
+"""
+
+import argparse
+import csv
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+from compatibilitywithReviewsandRatings import COMPATIBILITY_THRESHOLD, calculate_pairwise_compatibility_with_reviews
+from cosine_similarity import DogCompatibilityCalculator
+from data_access import DogRecord, ReviewRecord
+from sentiment_analysis import SentimentAnalyzer
+from vector_embedding import traits_from_dict
+
+
+TRAIT_FIELDS = ('age', 'weight', 'sex', 'neutered', 'sociability', 'temperament')
+RESULT_FIELDS = ('dog_id', 'target_id', 'cosine_similarity', 'sentiment_score',
+                 'target_sentiment_score', 'overall_compatibility', 'is_compatible')
+
+T = TypeVar('T')
+
+# Per-process scorer set up by _init_worker
+_worker_state = {}
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows from a JSONL or CSV file.
+    
+    Args:
+        path: File ending in .jsonl/.json (one object per line) or .csv (with header)
+        
+    Yields:
+        One dictionary per row
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _number(value: Any) -> Optional[float]:
+    """Convert a JSON or CSV field to a number, treating blanks as missing."""
+    if value is None or value == '':
+        return None
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def _id_key(dog_id: str) -> Tuple[int, Any]:
+    """Sort key of a dog id: numeric ids in numeric order, others as strings."""
+    return (0, int(dog_id)) if dog_id.isdigit() else (1, dog_id)
+
+
+def join_dogs(dog_rows: Iterable[Dict[str, Any]],
+              review_rows: Iterable[Dict[str, Any]] = ()) -> Iterator[DogRecord]:
+    """
+    Merge-join dog rows with their reviews.
+    
+    Args:
+        dog_rows: Dog rows sorted by "id" (numerically for numeric ids)
+        review_rows: Review rows sorted by "dog_id" the same way; reviews of unknown dogs are skipped
+        
+    Yields:
+        One DogRecord per dog row, in input order
+    """
+    reviews = iter(review_rows)
+    pending = next(reviews, None)
+    previous_key = previous_review_key = None
+    
+    for row in dog_rows:
+        dog_id = str(row['id'])
+        dog_key = _id_key(dog_id)
+        if previous_key is not None and dog_key <= previous_key:
+            raise ValueError(f"Dogs must be sorted by unique id: {dog_id} after {previous_key[1]}")
+        previous_key = dog_key
+        
+        record = DogRecord(dog_id, traits_from_dict({
+            name: _number(row.get(name)) for name in TRAIT_FIELDS if _number(row.get(name)) is not None
+        }), about=row.get('about') or None)
+        
+        while pending is not None and _id_key(str(pending['dog_id'])) <= dog_key:
+            review_key = _id_key(str(pending['dog_id']))
+            if previous_review_key is not None and review_key < previous_review_key:
+                raise ValueError(f"Reviews must be sorted by dog_id: {review_key[1]} after {previous_review_key[1]}")
+            previous_review_key = review_key
+            if review_key == dog_key:
+                record.reviews.append(ReviewRecord(
+                    pending.get('id'), _number(pending.get('rating')),
+                    pending.get('description') or None, pending.get('created_at')
+                ))
+            pending = next(reviews, None)
+        yield record
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Group an iterable into lists of at most size items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def prefetch(items: Iterable[T], max_size: int) -> Iterator[T]:
+    """
+    Produce items on a background thread, buffering at most max_size of them.
+    
+    Args:
+        items: Iterable to consume, e.g. a parsing generator
+        max_size: Capacity of the queue between producer and consumer
+        
+    Yields:
+        The items of the iterable, in order
+    """
+    buffer: queue.Queue = queue.Queue(max_size)
+    done = object()
+    
+    def produce() -> None:
+        try:
+            for item in items:
+                buffer.put((item, None))
+        except BaseException as error:
+            buffer.put((None, error))
+        buffer.put((done, None))
+    
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item, error = buffer.get()
+        if error is not None:
+            raise error
+        if item is done:
+            return
+        yield item
+
+
+def ordered_map(func: Callable[[T], Any], items: Iterable[T], executor: Optional[ProcessPoolExecutor],
+                max_in_flight: int) -> Iterator[Any]:
+    """
+    Map func over items on an executor, keeping at most max_in_flight items pending.
+    
+    Args:
+        func: Picklable function applied to each item
+        items: Input iterable, consumed lazily
+        executor: Executor running func, or None to run it inline
+        max_in_flight: Largest number of submitted items without a consumed result
+        
+    Yields:
+        Results in input order
+    """
+    if executor is None:
+        for item in items:
+            yield func(item)
+        return
+    
+    pending: deque = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        future: Future = pending.popleft()
+        yield future.result()
+
+
+class BulkScorer:
+    """
+    Scores chunks of dogs against a fixed set of target dogs.
+    """
+    
+    def __init__(self, targets: Sequence[DogRecord], k: float = 1.0, fast_sentiment: bool = False,
+                 compatibility_threshold: float = COMPATIBILITY_THRESHOLD):
+        """
+        Initialize the scorer and precompute everything about the targets.
+        
+        Args:
+            targets: Dogs every streamed dog is scored against
+            k: Smoothing parameter of the compatibility formula (default: 1.0)
+            fast_sentiment: Use the lexicon-only sentiment fast path (default: False)
+            compatibility_threshold: Minimum overall compatibility (default: COMPATIBILITY_THRESHOLD)
+        """
+        self.calculator = DogCompatibilityCalculator()
+        self.analyzer = SentimentAnalyzer()
+        # The sentiment score never reads the TF-IDF part of the embedding, but
+        # create_embedding needs a fitted vocabulary; an empty one is the cheapest
+        self.analyzer.build_vocabulary([])
+        self.k = k
+        self.fast_sentiment = fast_sentiment
+        self.compatibility_threshold = compatibility_threshold
+        
+        self.target_ids = [target.dog_id for target in targets]
+        self.target_vectors = self._trait_vectors(targets)
+        self.target_sentiments = self._average_sentiments(targets)
+        self.target_ratings = np.array([target.ratings_sum for target in targets], dtype=np.float64)
+    
+    def _trait_vectors(self, dogs: Sequence[DogRecord]) -> np.ndarray:
+        """Unweighted trait vectors, one row per dog."""
+        embedder = self.calculator.embedder
+        return np.array([embedder.create_trait_vector(dog.traits) for dog in dogs]).reshape(
+            len(dogs), len(embedder.trait_names)
+        )
+    
+    def _average_sentiments(self, dogs: Sequence[DogRecord]) -> np.ndarray:
+        """Average review sentiment per dog, 0 for dogs without reviews."""
+        texts = [text for dog in dogs for text in dog.review_texts]
+        if not texts:
+            return np.zeros(len(dogs))
+        
+        scores = self.analyzer.analyze_batch(texts, fast=self.fast_sentiment)
+        
+        averages = np.zeros(len(dogs))
+        offset = 0
+        for index, dog in enumerate(dogs):
+            count = len(dog.review_texts)
+            if count:
+                averages[index] = np.mean(scores[offset:offset + count])
+                offset += count
+        return averages
+    
+    def score_chunk(self, dogs: Sequence[DogRecord]) -> List[Dict[str, Any]]:
+        """
+        Score a chunk of dogs against every target.
+        
+        Args:
+            dogs: Dogs to score
+            
+        Returns:
+            One result row per (dog, target) pair, skipping a dog paired with itself
+        """
+        cosine = self.calculator.calculate_similarity_matrix(self._trait_vectors(dogs), self.target_vectors)
+        sentiments = self._average_sentiments(dogs)
+        ratings = np.array([dog.ratings_sum for dog in dogs], dtype=np.float64)
+        
+        # The formula is elementwise, so the whole chunk x targets grid is one call
+        overall = calculate_pairwise_compatibility_with_reviews(
+            cosine, sentiments[:, None], self.target_sentiments[None, :],
+            ratings[:, None], self.target_ratings[None, :], self.k
+        )
+        
+        rows = []
+        for row, dog in enumerate(dogs):
+            for column, target_id in enumerate(self.target_ids):
+                if dog.dog_id == target_id:
+                    continue
+                rows.append({
+                    'dog_id': dog.dog_id,
+                    'target_id': target_id,
+                    'cosine_similarity': float(cosine[row, column]),
+                    'sentiment_score': float(sentiments[row]),
+                    'target_sentiment_score': float(self.target_sentiments[column]),
+                    'overall_compatibility': float(overall[row, column]),
+                    'is_compatible': bool(overall[row, column] >= self.compatibility_threshold)
+                })
+        return rows
+
+
+def _init_worker(targets: Sequence[DogRecord], k: float, fast_sentiment: bool) -> None:
+    """Build the scorer of a worker process."""
+    _worker_state['scorer'] = BulkScorer(targets, k, fast_sentiment)
+
+
+def _score_chunk(dogs: Sequence[DogRecord]) -> List[Dict[str, Any]]:
+    """Score one chunk with the worker's scorer."""
+    return _worker_state['scorer'].score_chunk(dogs)
+
+
+class ResultWriter:
+    """
+    Writes result rows to a JSONL or CSV stream as they arrive.
+    """
+    
+    def __init__(self, handle, output_format: str = 'jsonl'):
+        self.handle = handle
+        self.output_format = output_format
+        if output_format == 'csv':
+            self.csv_writer = csv.DictWriter(handle, fieldnames=RESULT_FIELDS)
+            self.csv_writer.writeheader()
+    
+    def write(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Write and flush a batch of rows."""
+        if self.output_format == 'csv':
+            self.csv_writer.writerows(rows)
+        else:
+            self.handle.writelines(json.dumps(row) + '\n' for row in rows)
+        self.handle.flush()
+
+
+def load_targets(dogs_path: str, reviews_path: Optional[str], target_ids: Sequence[str]) -> List[DogRecord]:
+    """
+    Stream the exports once and keep only the target dogs.
+    
+    Args:
+        dogs_path: Dogs export
+        reviews_path: Reviews export, if any
+        target_ids: Ids of the dogs to keep
+        
+    Returns:
+        Target DogRecords in the order of target_ids
+    """
+    wanted = set(target_ids)
+    found = {
+        dog.dog_id: dog
+        for dog in join_dogs(read_rows(dogs_path), read_rows(reviews_path) if reviews_path else ())
+        if dog.dog_id in wanted
+    }
+    missing = [dog_id for dog_id in target_ids if dog_id not in found]
+    if missing:
+        raise ValueError(f"Unknown target dog ids: {missing}")
+    return [found[dog_id] for dog_id in target_ids]
+
+
+def run(dogs_path: str, reviews_path: Optional[str], target_ids: Sequence[str], output,
+        output_format: str = 'jsonl', chunk_size: int = 1000, workers: int = 0,
+        k: float = 1.0, fast_sentiment: bool = False) -> Dict[str, float]:
+    """
+    Score every dog of an export against the target dogs.
+    
+    Args:
+        dogs_path: Dogs export (.jsonl or .csv), sorted by id
+        reviews_path: Reviews export (.jsonl or .csv) sorted by dog_id, or None
+        target_ids: Ids of the dogs every dog is scored against
+        output: Writable text stream receiving the results
+        output_format: 'jsonl' or 'csv' (default: 'jsonl')
+        chunk_size: Dogs scored per task (default: 1000)
+        workers: Worker processes, 0 scores in this process (default: 0)
+        k: Smoothing parameter (default: 1.0)
+        fast_sentiment: Use the lexicon-only sentiment fast path (default: False)
+        
+    Returns:
+        Dictionary with the number of dogs and result rows and the elapsed seconds
+    """
+    start = time.perf_counter()
+    targets = load_targets(dogs_path, reviews_path, target_ids)
+    dogs = join_dogs(read_rows(dogs_path), read_rows(reviews_path) if reviews_path else ())
+    chunks = prefetch(chunked(dogs, chunk_size), max(2, workers * 2))
+    writer = ResultWriter(output, output_format)
+    summary = {'dogs': 0, 'rows': 0}
+    
+    def counted(chunks: Iterable[List[DogRecord]]) -> Iterator[List[DogRecord]]:
+        for chunk in chunks:
+            summary['dogs'] += len(chunk)
+            yield chunk
+    
+    if workers > 0:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                       initargs=(targets, k, fast_sentiment))
+        results = ordered_map(_score_chunk, counted(chunks), executor, workers * 2)
+    else:
+        executor = None
+        results = ordered_map(BulkScorer(targets, k, fast_sentiment).score_chunk, counted(chunks), None, 1)
+    
+    try:
+        for rows in results:
+            writer.write(rows)
+            summary['rows'] += len(rows)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def main() -> None:
+    """Run bulk scoring from the command line."""
+    parser = argparse.ArgumentParser(description="Score exported dogs against target dogs")
+    parser.add_argument('dogs', help="Dogs export (.jsonl or .csv) sorted by id")
+    parser.add_argument('--reviews', help="Reviews export (.jsonl or .csv) sorted by dog_id")
+    parser.add_argument('--targets', required=True, help="Comma-separated ids of the dogs to score against")
+    parser.add_argument('--output', default='-', help="Output file, - for stdout (default: -)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default=None,
+                        help="Output format (default: from the output file extension, else jsonl)")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes, 0 scores inline")
+    parser.add_argument('--k', type=float, default=1.0, help="Smoothing parameter")
+    parser.add_argument('--fast-sentiment', action='store_true',
+                        help="Score reviews with the lexicon-only fast path")
+    args = parser.parse_args()
+    
+    output_format = args.format or ('csv' if args.output.endswith('.csv') else 'jsonl')
+    target_ids = [dog_id.strip() for dog_id in args.targets.split(',') if dog_id.strip()]
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        summary = run(args.dogs, args.reviews, target_ids, output, output_format,
+                      args.chunk_size, args.workers, args.k, args.fast_sentiment)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Scored {summary['dogs']} dogs into {summary['rows']} rows "
+          f"in {summary['seconds']:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
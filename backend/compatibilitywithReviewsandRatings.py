@@ -8,6 +8,12 @@ overall compatibility between two dogs.
 import numpy as np
 from cosine_similarity import DogCompatibilityCalculator
 from sentiment_analysis import SentimentAnalyzer
+from review_dedup import score_deduplicated
+from instrumentation import registry
+
+
+# Minimum overall compatibility for a match
+COMPATIBILITY_THRESHOLD = 0.4
 
 
 def calculate_pairwise_compatibility_with_reviews(cosComp, writtenA, writtenB, ratingsA, ratingsB, k=1.0):
@@ -31,7 +37,7 @@ def calculate_pairwise_compatibility_with_reviews(cosComp, writtenA, writtenB, r
 
 
 def calculate_compatibility_pipeline(dog_a_traits, dog_b_traits, dog_a_reviews, dog_b_reviews, 
-                                   dog_a_ratings_sum, dog_b_ratings_sum, k=1.0):
+                                   dog_a_ratings_sum, dog_b_ratings_sum, k=1.0, deduplicate_reviews=False):
     """
     Complete pipeline to calculate compatibility from raw data.
     
@@ -43,34 +49,72 @@ def calculate_compatibility_pipeline(dog_a_traits, dog_b_traits, dog_a_reviews,
         dog_a_ratings_sum: Sum of ratings for dog A
         dog_b_ratings_sum: Sum of ratings for dog B
         k: Smoothing parameter
-        
+        deduplicate_reviews: Score one review per cluster of near-duplicates
+            and reuse its score for the others (default: False)
+            
     Returns:
-        Dictionary with all scores and final compatibility
+        Dictionary with all scores and final compatibility; with
+        deduplicate_reviews, 'review_dedup' holds the scoring work saved
     """
     # Calculate cosine similarity
-    compatibility_calc = DogCompatibilityCalculator()
-    cosine_result = compatibility_calc.calculate_compatibility(dog_a_traits, dog_b_traits)
-    cosine_similarity = cosine_result.cosine_similarity
+    with registry.stage('cosine'):
+        compatibility_calc = DogCompatibilityCalculator()
+        cosine_result = compatibility_calc.calculate_compatibility(dog_a_traits, dog_b_traits)
+        cosine_similarity = cosine_result.cosine_similarity
     
     # Calculate sentiment scores
     sentiment_analyzer = SentimentAnalyzer()
     
     # Build vocabulary from all reviews
     all_reviews = dog_a_reviews + dog_b_reviews
-    sentiment_analyzer.build_vocabulary(all_reviews)
+    with registry.stage('build_vocabulary', len(all_reviews)):
+        sentiment_analyzer.build_vocabulary(all_reviews)
     
     # Calculate average sentiment for each dog
-    sentiment_a_scores = [sentiment_analyzer.analyze_sentiment(review) for review in dog_a_reviews]
-    sentiment_b_scores = [sentiment_analyzer.analyze_sentiment(review) for review in dog_b_reviews]
+    dedup_stats = None
+    with registry.stage('sentiment', len(all_reviews)):
+        if deduplicate_reviews:
+            all_scores, dedup_stats = score_deduplicated(all_reviews, sentiment_analyzer.analyze_batch)
+            sentiment_a_scores = all_scores[:len(dog_a_reviews)]
+            sentiment_b_scores = all_scores[len(dog_a_reviews):]
+        else:
+            sentiment_a_scores = [sentiment_analyzer.analyze_sentiment(review) for review in dog_a_reviews]
+            sentiment_b_scores = [sentiment_analyzer.analyze_sentiment(review) for review in dog_b_reviews]
     
     avg_sentiment_a = np.mean(sentiment_a_scores) if sentiment_a_scores else 0.0
     avg_sentiment_b = np.mean(sentiment_b_scores) if sentiment_b_scores else 0.0
     
-    # Calculate overall compatibility
-    overall_compatibility = calculate_pairwise_compatibility_with_reviews(
+    result = build_compatibility_result(
         cosine_similarity, avg_sentiment_a, avg_sentiment_b,
         dog_a_ratings_sum, dog_b_ratings_sum, k
     )
+    if dedup_stats is not None:
+        result['review_dedup'] = dedup_stats
+    return result
+
+
+def build_compatibility_result(cosine_similarity, avg_sentiment_a, avg_sentiment_b,
+                               dog_a_ratings_sum, dog_b_ratings_sum, k=1.0):
+    """
+    Build the pipeline result dictionary from already computed components.
+    
+    Args:
+        cosine_similarity: Cosine similarity value from dog traits
+        avg_sentiment_a: Average review sentiment for dog A
+        avg_sentiment_b: Average review sentiment for dog B
+        dog_a_ratings_sum: Sum of ratings for dog A
+        dog_b_ratings_sum: Sum of ratings for dog B
+        k: Smoothing parameter
+        
+    Returns:
+        Dictionary with all scores and final compatibility
+    """
+    # Calculate overall compatibility
+    with registry.stage('formula'):
+        overall_compatibility = calculate_pairwise_compatibility_with_reviews(
+            cosine_similarity, avg_sentiment_a, avg_sentiment_b,
+            dog_a_ratings_sum, dog_b_ratings_sum, k
+        )
     
     return {
         'cosine_similarity': cosine_similarity,
@@ -79,10 +123,141 @@ def calculate_compatibility_pipeline(dog_a_traits, dog_b_traits, dog_a_reviews,
         'ratings_component_a': (dog_a_ratings_sum + 2.5 * k) / (dog_a_ratings_sum + 5 * k),
         'ratings_component_b': (dog_b_ratings_sum + 2.5 * k) / (dog_b_ratings_sum + 5 * k),
         'overall_compatibility': overall_compatibility,
-        'is_compatible': overall_compatibility >= 0.4  # Adjust threshold as needed
+        'is_compatible': overall_compatibility >= COMPATIBILITY_THRESHOLD
     }
 
 
+def calculate_mutual_compatibility(cosComp, writtenA, writtenB, k=1.0):
+    """
+    Calculate the compatibility formula in both directions.
+    
+    The formula treats the two dogs' sentiments differently, so "A likes B"
+    and "B likes A" differ. All arguments may be numpy arrays, in which case
+    both directions are computed elementwise in one pass.
+    
+    Args:
+        cosComp: Cosine similarity value(s) from dog traits (symmetric)
+        writtenA: Sentiment score(s) for dog A reviews (-1 to +1)
+        writtenB: Sentiment score(s) for dog B reviews (-1 to +1)
+        k: Smoothing parameter (default: 1.0)
+        
+    Returns:
+        Tuple of (A-to-B score, B-to-A score)
+    """
+    # Ratings do not enter the formula, so they are not needed here
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a_to_b = calculate_pairwise_compatibility_with_reviews(cosComp, writtenA, writtenB, 0, 0, k)
+        b_to_a = calculate_pairwise_compatibility_with_reviews(cosComp, writtenB, writtenA, 0, 0, k)
+    return a_to_b, b_to_a
+
+
+def find_mutual_matches(dog_traits, dog_sentiment, candidates, candidate_sentiments,
+                        k=1.0, threshold=COMPATIBILITY_THRESHOLD, weights=None):
+    """
+    Find candidates that are compatible with a dog in both directions.
+    
+    Cosine similarity and both directions of the compatibility formula are
+    computed for all candidates in one vectorized pass. Only reciprocal
+    matches, where both directions reach the threshold, are returned.
+    
+    Args:
+        dog_traits: DogTraits object of the dog looking for matches
+        dog_sentiment: Average review sentiment of that dog
+        candidates: List of (dog_id, DogTraits) tuples
+        candidate_sentiments: Average review sentiment per candidate
+        k: Smoothing parameter
+        threshold: Minimum compatibility required in both directions
+        weights: Optional per-query trait weights
+        
+    Returns:
+        List of dictionaries with both directions and the mutual score (the
+        weaker direction), best mutual score first
+    """
+    if not candidates:
+        return []
+    
+    with registry.stage('mutual_matches', len(candidates)):
+        compatibility_calc = DogCompatibilityCalculator()
+        embedder = compatibility_calc.embedder
+        dog_vector = embedder.create_trait_vector(dog_traits)
+        candidate_vectors = np.array([embedder.create_trait_vector(traits) for _, traits in candidates])
+        cosine = compatibility_calc.calculate_similarity_matrix(dog_vector, candidate_vectors, weights)[0]
+        
+        forward, backward = calculate_mutual_compatibility(
+            cosine, dog_sentiment, np.asarray(candidate_sentiments, dtype=np.float64), k
+        )
+        mutual = np.minimum(forward, backward)
+        # NaN scores (singular sentiment values) fail the comparison and are dropped
+        reciprocal = np.flatnonzero(mutual >= threshold)
+        reciprocal = reciprocal[np.argsort(-mutual[reciprocal], kind='stable')]
+    
+    return [
+        {
+            'dog_id': candidates[index][0],
+            'cosine_similarity': float(cosine[index]),
+            'compatibility_to_candidate': float(forward[index]),
+            'compatibility_from_candidate': float(backward[index]),
+            'mutual_compatibility': float(mutual[index])
+        }
+        for index in reciprocal
+    ]
+
+
+def calculate_compatibility_for_pairs(data_source, pairs, k=1.0, deduplicate_reviews=False):
+    """
+    Score many dog pairs, loading every dog involved in one batched fetch.
+    
+    Each dog's average sentiment is computed once and shared by all of its
+    pairs, instead of fetching and scoring a dog's reviews per pair.
+    
+    Args:
+        data_source: DogDataSource providing traits, reviews and ratings
+        pairs: List of (dog_a_id, dog_b_id) tuples
+        k: Smoothing parameter
+        deduplicate_reviews: Score one review per cluster of near-duplicates
+            across all dogs and reuse its score for the others (default: False)
+            
+    Returns:
+        Dictionary mapping each pair to its pipeline result dictionary
+    """
+    dog_ids = list(dict.fromkeys(dog_id for pair in pairs for dog_id in pair))
+    dogs = data_source.fetch_dogs(dog_ids)
+    missing = [dog_id for dog_id in dog_ids if dog_id not in dogs]
+    if missing:
+        raise ValueError(f"Unknown dog ids: {missing}")
+    
+    # Calculate sentiment scores once per dog
+    sentiment_analyzer = SentimentAnalyzer()
+    all_reviews = [review for dog in dogs.values() for review in dog.review_texts]
+    average_sentiments = {dog_id: 0.0 for dog_id in dogs}
+    if all_reviews and deduplicate_reviews:
+        sentiment_analyzer.build_vocabulary(all_reviews)
+        all_scores, _ = score_deduplicated(all_reviews, sentiment_analyzer.analyze_batch)
+        offset = 0
+        for dog_id, dog in dogs.items():
+            if dog.review_texts:
+                average_sentiments[dog_id] = np.mean(all_scores[offset:offset + len(dog.review_texts)])
+                offset += len(dog.review_texts)
+    elif all_reviews:
+        sentiment_analyzer.build_vocabulary(all_reviews)
+        for dog_id, dog in dogs.items():
+            if dog.review_texts:
+                average_sentiments[dog_id] = np.mean(sentiment_analyzer.analyze_batch(dog.review_texts))
+    
+    compatibility_calc = DogCompatibilityCalculator()
+    results = {}
+    for dog_a_id, dog_b_id in pairs:
+        dog_a, dog_b = dogs[dog_a_id], dogs[dog_b_id]
+        cosine_result = compatibility_calc.calculate_compatibility(dog_a.traits, dog_b.traits, dog_a_id, dog_b_id)
+        results[(dog_a_id, dog_b_id)] = build_compatibility_result(
+            cosine_result.cosine_similarity,
+            average_sentiments[dog_a_id], average_sentiments[dog_b_id],
+            dog_a.ratings_sum, dog_b.ratings_sum, k
+        )
+    
+    return results
+
+
 # Example usage
 if __name__ == "__main__":
     from vector_embedding import DogTraits
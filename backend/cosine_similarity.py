@@ -6,9 +6,15 @@ to determine compatibility in the dog dating app.
 """
 
 import numpy as np
-from typing import Tuple, List, Dict, Any, Optional
+from typing import Tuple, List, Dict, Any, Optional, Union
 from dataclasses import dataclass
-from vector_embedding import DogVectorEmbedder, DogTraits
+from vector_embedding import DogVectorEmbedder, DogTraits, traits_from_dict
+from instrumentation import registry
+
+
+# Trait weights accepted at query time: None (embedder defaults), a dict of
+# per-trait overrides, a weight vector, or one weight vector per query row
+TraitWeights = Optional[Union[Dict[str, float], np.ndarray]]
 
 
 @dataclass
@@ -61,8 +67,110 @@ class DogCompatibilityCalculator:
         # Clamp to [-1, 1] to handle floating point precision issues
         return np.clip(cosine_sim, -1.0, 1.0)
     
+    def get_weight_vector(self, weights: TraitWeights = None) -> np.ndarray:
+        """
+        Resolve query-time trait weights to a weight vector (or one row per query).
+        
+        Args:
+            weights: None, a dict of per-trait overrides, or weights as an array
+            
+        Returns:
+            Weight array aligned with the embedder's trait_names
+        """
+        if weights is None or isinstance(weights, dict):
+            return self.embedder.get_weight_vector(weights)
+        return np.asarray(weights, dtype=float)
+    
+    def _squared_weights(self, weights: TraitWeights, n_queries: int) -> np.ndarray:
+        """Resolve query-time trait weights to one squared weight row per query."""
+        dimension = len(self.embedder.trait_names)
+        return np.broadcast_to(self.get_weight_vector(weights) ** 2, (n_queries, dimension))
+    
+    def calculate_similarity_matrix(self, query_vectors: np.ndarray, corpus_vectors: np.ndarray,
+                                    weights: TraitWeights = None) -> np.ndarray:
+        """
+        Calculate weighted cosine similarities between unweighted trait vectors.
+        
+        Weights are applied inside the kernel as a weighted inner product with
+        norms computed on the fly, so stored trait vectors never go stale when
+        weights change. With the embedder's default weights this equals the
+        cosine similarity of the corresponding create_embedding vectors.
+        
+        Args:
+            query_vectors: Trait vectors of shape (n_queries, dim) or (dim,)
+            corpus_vectors: Trait vectors of shape (n_corpus, dim) or (dim,)
+            weights: Trait weights as a dict, a (dim,) vector, or a
+                (n_queries, dim) array with one weight vector per query
+            
+        Returns:
+            Similarity matrix of shape (n_queries, n_corpus) with values in [-1, 1]
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=float))
+        corpus = np.atleast_2d(np.asarray(corpus_vectors, dtype=float))
+        squared_weights = self._squared_weights(weights, len(queries))
+        
+        with registry.stage('similarity_matrix', len(queries) * len(corpus)):
+            # Weighted inner products and weighted norms (per query weights)
+            dot_products = (queries * squared_weights) @ corpus.T
+            query_norms = np.sqrt(np.sum(queries * queries * squared_weights, axis=1))
+            corpus_norms = np.sqrt(squared_weights @ (corpus * corpus).T)
+            
+            denominators = query_norms[:, None] * corpus_norms
+            similarities = np.divide(dot_products, denominators,
+                                     out=np.zeros_like(dot_products), where=denominators > 0)
+        
+        # Clamp to [-1, 1] to handle floating point precision issues
+        return np.clip(similarities, -1.0, 1.0)
+    
+    def calculate_weighted_cosine_similarity(self, vector1: np.ndarray, vector2: np.ndarray,
+                                             weights: TraitWeights = None) -> float:
+        """
+        Calculate weighted cosine similarity between two unweighted trait vectors.
+        
+        Args:
+            vector1: First dog's trait vector
+            vector2: Second dog's trait vector
+            weights: Optional trait weights (defaults to the embedder's trait_weights)
+            
+        Returns:
+            Cosine similarity value between -1 and 1
+        """
+        return float(self.calculate_similarity_matrix(vector1, vector2, weights)[0, 0])
+    
+    def calculate_pairwise_similarities(self, vectors1: np.ndarray, vectors2: np.ndarray,
+                                        weights: TraitWeights = None) -> np.ndarray:
+        """
+        Calculate weighted cosine similarities of aligned pairs of trait vectors.
+        
+        Unlike calculate_similarity_matrix, only vectors1[i] vs vectors2[i] is
+        scored, so unrelated pairs from many requests can share one pass.
+        
+        Args:
+            vectors1: Trait vectors of shape (n_pairs, dim)
+            vectors2: Trait vectors of shape (n_pairs, dim)
+            weights: Trait weights as a dict, a (dim,) vector, or a
+                (n_pairs, dim) array with one weight vector per pair
+            
+        Returns:
+            Similarity per pair, shape (n_pairs,), with values in [-1, 1]
+        """
+        vectors1 = np.atleast_2d(np.asarray(vectors1, dtype=float))
+        vectors2 = np.atleast_2d(np.asarray(vectors2, dtype=float))
+        squared_weights = self._squared_weights(weights, len(vectors1))
+        
+        with registry.stage('pairwise_similarities', len(vectors1)):
+            dot_products = np.sum(vectors1 * vectors2 * squared_weights, axis=1)
+            denominators = np.sqrt(np.sum(vectors1 * vectors1 * squared_weights, axis=1) *
+                                   np.sum(vectors2 * vectors2 * squared_weights, axis=1))
+            similarities = np.divide(dot_products, denominators,
+                                     out=np.zeros_like(dot_products), where=denominators > 0)
+        
+        # Clamp to [-1, 1] to handle floating point precision issues
+        return np.clip(similarities, -1.0, 1.0)
+    
     def calculate_compatibility(self, dog1_traits: DogTraits, dog2_traits: DogTraits, 
-                              dog1_id: str = "dog1", dog2_id: str = "dog2") -> CompatibilityResult:
+                              dog1_id: str = "dog1", dog2_id: str = "dog2",
+                              weights: TraitWeights = None) -> CompatibilityResult:
         """
         Calculate compatibility between two dogs based on their traits.
         
@@ -71,16 +179,18 @@ class DogCompatibilityCalculator:
             dog2_traits: Second dog's traits
             dog1_id: First dog's identifier
             dog2_id: Second dog's identifier
+            weights: Optional per-query trait weights (defaults to the embedder's trait_weights)
             
         Returns:
             CompatibilityResult with similarity score and compatibility status
         """
-        # Create vector embeddings
-        embedding1 = self.embedder.create_embedding(dog1_traits)
-        embedding2 = self.embedder.create_embedding(dog2_traits)
+        # Create unweighted trait vectors
+        with registry.stage('trait_embedding', 2):
+            vector1 = self.embedder.create_trait_vector(dog1_traits)
+            vector2 = self.embedder.create_trait_vector(dog2_traits)
         
-        # Calculate cosine similarity
-        cosine_sim = self.calculate_cosine_similarity(embedding1, embedding2)
+        # Calculate weighted cosine similarity
+        cosine_sim = self.calculate_weighted_cosine_similarity(vector1, vector2, weights)
         
         # Determine compatibility
         is_compatible = cosine_sim >= self.compatibility_threshold
@@ -95,7 +205,8 @@ class DogCompatibilityCalculator:
     
     def calculate_compatibility_from_dicts(self, dog1_traits: Dict[str, int], 
                                          dog2_traits: Dict[str, int],
-                                         dog1_id: str = "dog1", dog2_id: str = "dog2") -> CompatibilityResult:
+                                         dog1_id: str = "dog1", dog2_id: str = "dog2",
+                                         weights: TraitWeights = None) -> CompatibilityResult:
         """
         Calculate compatibility between two dogs from trait dictionaries.
         
@@ -104,30 +215,16 @@ class DogCompatibilityCalculator:
             dog2_traits: Second dog's traits as dictionary
             dog1_id: First dog's identifier
             dog2_id: Second dog's identifier
+            weights: Optional per-query trait weights (defaults to the embedder's trait_weights)
             
         Returns:
             CompatibilityResult with similarity score and compatibility status
         """
         # Create DogTraits objects
-        dog1 = DogTraits(
-            age=dog1_traits.get('age', 0),
-            weight=dog1_traits.get('weight', 0),
-            sex=dog1_traits.get('sex', 0),
-            neutered=dog1_traits.get('neutered', 0),
-            sociability=dog1_traits.get('sociability', 1),
-            temperament=dog1_traits.get('temperament', 1)
-        )
+        dog1 = traits_from_dict(dog1_traits)
+        dog2 = traits_from_dict(dog2_traits)
         
-        dog2 = DogTraits(
-            age=dog2_traits.get('age', 0),
-            weight=dog2_traits.get('weight', 0),
-            sex=dog2_traits.get('sex', 0),
-            neutered=dog2_traits.get('neutered', 0),
-            sociability=dog2_traits.get('sociability', 1),
-            temperament=dog2_traits.get('temperament', 1)
-        )
-        
-        return self.calculate_compatibility(dog1, dog2, dog1_id, dog2_id)
+        return self.calculate_compatibility(dog1, dog2, dog1_id, dog2_id, weights)
     
     def calculate_compatibility_from_embeddings(self, embedding1: np.ndarray, 
                                               embedding2: np.ndarray,
@@ -156,23 +253,39 @@ class DogCompatibilityCalculator:
         )
     
     def find_compatible_dogs(self, target_dog_traits: DogTraits, 
-                           candidate_dogs: List[Tuple[str, DogTraits]]) -> List[CompatibilityResult]:
+                           candidate_dogs: List[Tuple[str, DogTraits]],
+                           weights: TraitWeights = None) -> List[CompatibilityResult]:
         """
         Find all compatible dogs from a list of candidates.
         
         Args:
             target_dog_traits: Traits of the target dog
             candidate_dogs: List of (dog_id, traits) tuples
+            weights: Optional per-query trait weights (defaults to the embedder's trait_weights)
             
         Returns:
             List of CompatibilityResult objects for compatible dogs
         """
         compatible_dogs = []
+        if not candidate_dogs:
+            return compatible_dogs
+        
+        # Score all candidates in one pass over their trait vectors
+        target_vector = self.embedder.create_trait_vector(target_dog_traits)
+        candidate_vectors = np.array([
+            self.embedder.create_trait_vector(dog_traits) for _, dog_traits in candidate_dogs
+        ])
+        similarities = self.calculate_similarity_matrix(target_vector, candidate_vectors, weights)[0]
         
-        for dog_id, dog_traits in candidate_dogs:
-            result = self.calculate_compatibility(target_dog_traits, dog_traits, "target", dog_id)
-            if result.is_compatible:
-                compatible_dogs.append(result)
+        for (dog_id, _), cosine_sim in zip(candidate_dogs, similarities):
+            if cosine_sim >= self.compatibility_threshold:
+                compatible_dogs.append(CompatibilityResult(
+                    dog1_id="target",
+                    dog2_id=dog_id,
+                    cosine_similarity=float(cosine_sim),
+                    is_compatible=True,
+                    compatibility_threshold=self.compatibility_threshold
+                ))
         
         # Sort by cosine similarity (highest first)
         compatible_dogs.sort(key=lambda x: x.cosine_similarity, reverse=True)
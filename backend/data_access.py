@@ -0,0 +1,446 @@
+"""
+Data Access Module
+
+Batched loading of everything the compatibility pipeline needs per dog (traits,
+reviews and the ratings sum) for many dog ids in a single round trip.
+
+Backends are pluggable through DogDataSource:
+    SQLiteDataSource    Local database built from frontend/supabase/migrations,
+                        for offline use and tests. Connections come from a pool.
+    SupabaseDataSource  Production database via the Supabase client; reviews are
+                        embedded in the dogs query, so one request covers all ids.
+    CachedDataSource    Read-through cache in front of any other source.
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from vector_embedding import DogTraits, traits_from_dict
+
+
+DEFAULT_MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'supabase', 'migrations'
+)
+
+# SQLite limits the number of bound parameters per statement
+SQLITE_MAX_IDS_PER_QUERY = 900
+
+
+@dataclass
+class ReviewRecord:
+    """Data class to represent one review of a dog."""
+    review_id: str
+    rating: int
+    description: str
+    created_at: Optional[str] = None
+
+
+@dataclass
+class DogRecord:
+    """Data class to represent a dog with everything the compatibility pipeline needs."""
+    dog_id: str
+    traits: DogTraits
+    reviews: List[ReviewRecord] = field(default_factory=list)
+    about: Optional[str] = None
+    
+    @property
+    def review_texts(self) -> List[str]:
+        """Review descriptions, skipping empty ones."""
+        return [review.description for review in self.reviews if review.description]
+    
+    @property
+    def ratings_sum(self) -> int:
+        """Sum of all ratings of the dog."""
+        return sum(review.rating or 0 for review in self.reviews)
+
+
+class DogDataSource(ABC):
+    """
+    Interface for batched loading of dogs with their reviews and ratings.
+    """
+    
+    @abstractmethod
+    def fetch_dogs(self, dog_ids: Sequence[str]) -> Dict[str, DogRecord]:
+        """
+        Fetch traits, reviews and ratings for many dogs in one round trip.
+        
+        Args:
+            dog_ids: Dog identifiers
+            
+        Returns:
+            Dictionary mapping each found dog id to its DogRecord (unknown ids are left out)
+        """
+    
+    def fetch_dog(self, dog_id: str) -> Optional[DogRecord]:
+        """
+        Fetch a single dog.
+        
+        Args:
+            dog_id: Dog identifier
+            
+        Returns:
+            The dog's DogRecord, or None if it does not exist
+        """
+        return self.fetch_dogs([dog_id]).get(dog_id)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of reusable database connections.
+    """
+    
+    def __init__(self, connect: Callable[[], sqlite3.Connection], max_size: int = 4):
+        """
+        Initialize the pool. Connections are opened lazily.
+        
+        Args:
+            connect: Function opening a new connection
+            max_size: Maximum number of open connections (default: 4)
+        """
+        self._connect = connect
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, blocking while all connections are in use."""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                with self._lock:
+                    self._all.append(conn)
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+    
+    def close(self) -> None:
+        """Close every connection opened by the pool."""
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+def _split_sql_statements(sql: str) -> List[str]:
+    """Split a SQL script into statements, keeping $$-quoted function bodies intact."""
+    statements = []
+    current = []
+    in_dollar_quote = False
+    for line in sql.splitlines():
+        stripped = line.split('--', 1)[0] if not in_dollar_quote else line
+        current.append(stripped)
+        if stripped.count('$$') % 2 == 1:
+            in_dollar_quote = not in_dollar_quote
+        if not in_dollar_quote and stripped.rstrip().endswith(';'):
+            statements.append('\n'.join(current).strip().rstrip(';'))
+            current = []
+    if ''.join(current).strip():
+        statements.append('\n'.join(current).strip().rstrip(';'))
+    return [statement for statement in statements if statement]
+
+
+def _translate_to_sqlite(statement: str, dropped_constraints: Sequence[str]) -> str:
+    """Rewrite a Postgres DDL/DML statement into its SQLite equivalent."""
+    statement = re.sub(r'\bpublic\.', '', statement)
+    statement = re.sub(r'\buuid primary key default uuid_generate_v4\(\)',
+                       'text primary key default (lower(hex(randomblob(16))))', statement, flags=re.I)
+    statement = re.sub(r'\bdefault now\(\)', 'default current_timestamp', statement, flags=re.I)
+    statement = re.sub(r'\breferences auth\.\w+\s*\(\w+\)(\s+on delete cascade)?', '', statement, flags=re.I)
+    statement = re.sub(r'\buuid\b', 'text', statement, flags=re.I)
+    statement = re.sub(r'\btext\[\]', 'text', statement, flags=re.I)
+    for name in dropped_constraints:
+        statement = re.sub(rf',\s*constraint {re.escape(name)}\b[^,)]*\([^)]*\)', '', statement, flags=re.I)
+    return statement
+
+
+def build_sqlite_schema(conn: sqlite3.Connection, migrations_dir: str = DEFAULT_MIGRATIONS_DIR) -> None:
+    """
+    Create the app schema (and seed data) in SQLite by replaying the Supabase migrations.
+    
+    Tables, indexes, added columns and inserts are translated to SQLite.
+    Postgres-only statements (extensions, row level security, policies,
+    functions, triggers, column type changes) have no SQLite equivalent and are
+    skipped. Constraints dropped by a later migration are left out of the
+    table definition, since SQLite cannot drop them afterwards.
+    
+    Args:
+        conn: SQLite connection
+        migrations_dir: Directory with the .sql migration files
+    """
+    statements = []
+    for file_name in sorted(os.listdir(migrations_dir)):
+        if file_name.endswith('.sql'):
+            with open(os.path.join(migrations_dir, file_name)) as f:
+                statements.extend(_split_sql_statements(f.read()))
+    
+    dropped_constraints = [
+        match.group(1) for statement in statements
+        for match in [re.match(r'alter table\s+\S+\s+drop constraint\s+(?:if exists\s+)?(\w+)', statement, re.I)]
+        if match
+    ]
+    
+    for statement in statements:
+        lowered = ' '.join(statement.lower().split())
+        if lowered.startswith(('create table', 'create index', 'insert into')):
+            conn.execute(_translate_to_sqlite(statement, dropped_constraints))
+            continue
+        
+        add_column = re.match(r'alter table\s+(\S+)\s+add column\s+(?:if not exists\s+)?(\w+)\s+(.*)',
+                              statement, re.I | re.S)
+        if add_column:
+            table = re.sub(r'^public\.', '', add_column.group(1))
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if add_column.group(2) not in existing:
+                definition = _translate_to_sqlite(add_column.group(3), dropped_constraints)
+                # SQLite cannot add UNIQUE columns; uniqueness is not needed for scoring
+                definition = re.sub(r'\bunique\b', '', definition, flags=re.I)
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {add_column.group(2)} {definition}')
+    conn.commit()
+
+
+class SQLiteDataSource(DogDataSource):
+    """
+    Local SQLite backend with a connection pool.
+    """
+    
+    def __init__(self, database: Optional[str] = None, pool_size: int = 4,
+                 migrations_dir: Optional[str] = DEFAULT_MIGRATIONS_DIR):
+        """
+        Initialize the data source.
+        
+        Args:
+            database: Path of the SQLite file (default: a private in-memory database)
+            pool_size: Maximum number of pooled connections (default: 4)
+            migrations_dir: Migrations replayed when the database has no dogs table
+                yet (None to skip)
+        """
+        if database is None:
+            # Named shared-cache memory database, so pooled connections see the same data
+            self._uri = f'file:pawpalooza_{uuid.uuid4().hex}?mode=memory&cache=shared'
+        else:
+            self._uri = f'file:{os.path.abspath(database)}'
+        
+        self.pool = ConnectionPool(self._connect, pool_size)
+        
+        # Keeps a private in-memory database alive for the lifetime of the source
+        self._keepalive = self._connect()
+        has_schema = self._keepalive.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dogs'"
+        ).fetchone()
+        if not has_schema and migrations_dir:
+            build_sqlite_schema(self._keepalive, migrations_dir)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def fetch_dogs(self, dog_ids: Sequence[str]) -> Dict[str, DogRecord]:
+        """
+        Fetch dogs with their reviews using one joined query per chunk of ids.
+        
+        Args:
+            dog_ids: Dog identifiers
+            
+        Returns:
+            Dictionary mapping each found dog id to its DogRecord
+        """
+        unique_ids = list(dict.fromkeys(dog_ids))
+        records: Dict[str, DogRecord] = {}
+        
+        with self.pool.connection() as conn:
+            for start in range(0, len(unique_ids), SQLITE_MAX_IDS_PER_QUERY):
+                chunk = unique_ids[start:start + SQLITE_MAX_IDS_PER_QUERY]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"""
+                    SELECT d.id, d.about, d.age, d.weight, d.sex, d.neutered, d.sociability, d.temperament,
+                           r.id AS review_id, r.rating, r.description, r.created_at
+                    FROM dogs d
+                    LEFT JOIN reviews r ON r.dog_id = d.id
+                    WHERE d.id IN ({placeholders})
+                    ORDER BY d.id, r.created_at, r.id
+                    """,
+                    chunk
+                ).fetchall()
+                
+                for row in rows:
+                    record = records.get(row['id'])
+                    if record is None:
+                        record = records[row['id']] = DogRecord(row['id'], traits_from_dict({
+                            name: row[name] for name in
+                            ('age', 'weight', 'sex', 'neutered', 'sociability', 'temperament')
+                            if row[name] is not None
+                        }), about=row['about'])
+                    if row['review_id'] is not None:
+                        record.reviews.append(ReviewRecord(
+                            row['review_id'], row['rating'], row['description'], row['created_at']
+                        ))
+        return records
+    
+    def close(self) -> None:
+        """Close all connections (a private in-memory database is discarded)."""
+        self.pool.close()
+        self._keepalive.close()
+
+
+class SupabaseDataSource(DogDataSource):
+    """
+    Supabase backend. Reviews are embedded in the dogs query, so a batch of ids
+    costs one HTTP request over the client's pooled connections.
+    """
+    
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None, client=None,
+                 max_ids_per_request: int = 200):
+        """
+        Initialize the data source.
+        
+        Args:
+            url: Supabase project URL (default: SUPABASE_URL environment variable)
+            key: Supabase API key (default: SUPABASE_ANON_KEY environment variable)
+            client: Existing Supabase client to reuse instead of url/key
+            max_ids_per_request: Ids per request, keeping URLs within server limits
+        """
+        if client is None:
+            try:
+                from supabase import create_client
+            except ImportError as error:
+                raise ImportError("SupabaseDataSource requires the 'supabase' package") from error
+            client = create_client(url or os.environ['SUPABASE_URL'],
+                                   key or os.environ['SUPABASE_ANON_KEY'])
+        self.client = client
+        self.max_ids_per_request = max_ids_per_request
+    
+    def fetch_dogs(self, dog_ids: Sequence[str]) -> Dict[str, DogRecord]:
+        """
+        Fetch dogs with their embedded reviews.
+        
+        Args:
+            dog_ids: Dog identifiers
+            
+        Returns:
+            Dictionary mapping each found dog id to its DogRecord
+        """
+        unique_ids = list(dict.fromkeys(dog_ids))
+        records: Dict[str, DogRecord] = {}
+        
+        for start in range(0, len(unique_ids), self.max_ids_per_request):
+            chunk = unique_ids[start:start + self.max_ids_per_request]
+            response = (
+                self.client.table('dogs')
+                .select('id, about, age, weight, sex, neutered, sociability, temperament, '
+                        'reviews(id, rating, description, created_at)')
+                .in_('id', chunk)
+                .execute()
+            )
+            for row in response.data:
+                reviews = sorted(row.get('reviews') or [], key=lambda r: (r.get('created_at') or '', r['id']))
+                records[row['id']] = DogRecord(
+                    row['id'],
+                    traits_from_dict({name: value for name, value in row.items() if value is not None}),
+                    [ReviewRecord(r['id'], r.get('rating'), r.get('description'), r.get('created_at'))
+                     for r in reviews],
+                    row.get('about')
+                )
+        return records
+
+
+class CachedDataSource(DogDataSource):
+    """
+    Read-through cache in front of another data source. Only ids missing from
+    the cache are fetched, all in one call to the wrapped source.
+    """
+    
+    def __init__(self, source: DogDataSource, max_size: int = 10000, ttl: Optional[float] = 300.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            source: Data source to read through to
+            max_size: Maximum number of cached dogs (default: 10000)
+            ttl: Seconds an entry stays valid, None for no expiry (default: 300)
+        """
+        self.source = source
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def fetch_dogs(self, dog_ids: Sequence[str]) -> Dict[str, DogRecord]:
+        """
+        Fetch dogs, serving cached ones from memory.
+        
+        Args:
+            dog_ids: Dog identifiers
+            
+        Returns:
+            Dictionary mapping each found dog id to its DogRecord
+        """
+        now = time.monotonic()
+        records: Dict[str, DogRecord] = {}
+        missing = []
+        
+        with self._lock:
+            for dog_id in dict.fromkeys(dog_ids):
+                entry = self._entries.get(dog_id)
+                if entry is not None and (self.ttl is None or now - entry[0] < self.ttl):
+                    self._entries.move_to_end(dog_id)
+                    records[dog_id] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(dog_id)
+                    self.misses += 1
+        
+        if missing:
+            fetched = self.source.fetch_dogs(missing)
+            with self._lock:
+                for dog_id, record in fetched.items():
+                    self._entries[dog_id] = (now, record)
+                    self._entries.move_to_end(dog_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            records.update(fetched)
+        
+        return records
+    
+    def invalidate(self, dog_id: str) -> None:
+        """
+        Drop a dog from the cache after its traits or reviews changed.
+        
+        Args:
+            dog_id: Dog identifier
+        """
+        with self._lock:
+            self._entries.pop(dog_id, None)
+
+
+# Example usage
+if __name__ == "__main__":
+    source = CachedDataSource(SQLiteDataSource())
+    
+    with source.source.pool.connection() as conn:
+        dog_ids = [row['id'] for row in conn.execute("SELECT id FROM dogs ORDER BY name")]
+    
+    dogs = source.fetch_dogs(dog_ids)
+    for dog_id, dog in dogs.items():
+        print(f"{dog_id}: {dog.traits} - {len(dog.reviews)} reviews, ratings sum {dog.ratings_sum}")
@@ -0,0 +1,224 @@
+"""
+Fast Sentiment Module
+
+Lexicon-only approximation of SentimentAnalyzer for bulk and latency-critical
+paths. The TextBlob and VADER lexicons are compiled once into a single token
+vocabulary with per-token weight arrays, and batches of reviews are scored as
+flat token-id arrays reduced per review with np.add.reduceat.
+
+Negation and intensifiers are approximated by looking at the preceding tokens
+of the flat array (shifted copies masked at review boundaries) instead of
+running each library's word-by-word state machine. Returns the same blended
+score as SentimentAnalyzer.analyze_sentiment, from -1 to +1.
+"""
+
+import re
+import numpy as np
+from typing import List, Sequence, Tuple
+from textblob.en import sentiment as textblob_lexicon
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, NEGATE, N_SCALAR, SentimentIntensityAnalyzer
+from instrumentation import registry
+
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z']*")
+
+# VADER constants: boosters fade with distance, exclamation marks amplify the sum
+BOOSTER_DECAY = (1.0, 0.95, 0.9)
+EXCLAMATION_BOOST = 0.292
+MAX_EXCLAMATIONS = 4
+VADER_ALPHA = 15.0
+
+# TextBlob negates a chunk to -0.5 of its polarity ("not good" = slightly bad)
+TEXTBLOB_NEGATION = -0.5
+TEXTBLOB_NEGATIONS = ('no', 'not', "n't", 'never')
+
+
+class FastSentimentAnalyzer:
+    """Scores batches of reviews with a compiled polarity lexicon."""
+    
+    def __init__(self):
+        # Token 0 is reserved for words missing from both lexicons
+        self.vocabulary = {}
+        tokens = sorted(
+            set(textblob_lexicon) | set(SentimentIntensityAnalyzer().lexicon) |
+            set(BOOSTER_DICT) | set(NEGATE) | set(TEXTBLOB_NEGATIONS)
+        )
+        tokens = [token for token in tokens if TOKEN_PATTERN.fullmatch(token)]
+        for index, token in enumerate(tokens, start=1):
+            self.vocabulary[token] = index
+        self._compile(tokens)
+    
+    def _compile(self, tokens: List[str]) -> None:
+        """Build the per-token weight arrays."""
+        size = len(tokens) + 1
+        vader_lexicon = SentimentIntensityAnalyzer().lexicon
+        
+        self.textblob_polarity = np.zeros(size)
+        self.textblob_intensity = np.ones(size)
+        self.textblob_known = np.zeros(size, dtype=bool)
+        self.textblob_modifier = np.zeros(size, dtype=bool)
+        self.vader_valence = np.zeros(size)
+        self.vader_booster = np.zeros(size)
+        self.negator = np.zeros(size, dtype=bool)
+        
+        for index, token in enumerate(tokens, start=1):
+            if token in textblob_lexicon:
+                polarity, _, intensity = textblob_lexicon[token][None]
+                self.textblob_polarity[index] = polarity
+                self.textblob_intensity[index] = intensity
+                self.textblob_known[index] = True
+                self.textblob_modifier[index] = 'RB' in textblob_lexicon[token]
+            self.vader_valence[index] = vader_lexicon.get(token, 0.0)
+            self.vader_booster[index] = BOOSTER_DICT.get(token, 0.0)
+            self.negator[index] = token in NEGATE or token in TEXTBLOB_NEGATIONS or token.endswith("n't")
+    
+    def tokenize(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Convert reviews to one flat token-id array.
+        
+        Args:
+            texts: Review texts
+            
+        Returns:
+            Tuple of (token ids, start offset of each review)
+        """
+        vocabulary = self.vocabulary
+        token_lists = [TOKEN_PATTERN.findall(text.lower()) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(texts))
+        starts = np.zeros(len(texts), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        token_ids = np.fromiter(
+            (vocabulary.get(token, 0) for tokens in token_lists for token in tokens),
+            dtype=np.int64, count=int(lengths.sum())
+        )
+        return token_ids, starts
+    
+    def analyze_batch(self, texts: Sequence[str]) -> List[float]:
+        """
+        Score many reviews at once.
+        
+        Args:
+            texts: Review texts
+            
+        Returns:
+            List of sentiment scores from -1 (negative) to +1 (positive), one per text
+        """
+        if not texts:
+            return []
+        with registry.stage('fast_sentiment_batch', len(texts)):
+            token_ids, starts = self.tokenize(texts)
+            document = np.repeat(np.arange(len(texts)), np.diff(np.append(starts, len(token_ids))))
+            
+            textblob_polarity = self._textblob_polarity(token_ids, document, starts)
+            exclamations, caps_ratio = self._character_features(texts)
+            vader_compound = self._vader_compound(token_ids, document, starts, exclamations)
+            
+            # Same blend and bonuses as SentimentAnalyzer.analyze_sentiment
+            combined_sentiment = textblob_polarity * 0.4 + vader_compound * 0.6
+            punctuation_bonus = np.minimum(exclamations * 0.1, 0.3)
+            caps_bonus = caps_ratio * 0.2
+            scores = np.clip(combined_sentiment + punctuation_bonus + caps_bonus, -1.0, 1.0)
+        return scores.tolist()
+    
+    def analyze_sentiment(self, text: str) -> float:
+        """
+        Score a single review.
+        
+        Args:
+            text: Review text
+            
+        Returns:
+            Sentiment score from -1 (negative) to +1 (positive)
+        """
+        return self.analyze_batch([text])[0]
+    
+    @staticmethod
+    def _previous(values: np.ndarray, document: np.ndarray, distance: int, fill) -> np.ndarray:
+        """Value of the token `distance` positions earlier in the same review, else fill."""
+        shifted = np.full(len(values), fill, dtype=values.dtype)
+        if distance < len(values):
+            shifted[distance:] = values[:-distance]
+            shifted[distance:][document[distance:] != document[:-distance]] = fill
+        return shifted
+    
+    @staticmethod
+    def _per_document(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """Sum values per review; empty reviews sum to zero."""
+        # Padding keeps trailing empty reviews in range, the mask fixes empty ones
+        sums = np.add.reduceat(np.append(values, 0.0), starts)
+        lengths = np.diff(np.append(starts, len(values)))
+        sums[lengths == 0] = 0.0
+        return sums
+    
+    def _textblob_polarity(self, token_ids: np.ndarray, document: np.ndarray,
+                           starts: np.ndarray) -> np.ndarray:
+        """Mean polarity of the known-word chunks of each review."""
+        known = self.textblob_known[token_ids]
+        polarity = self.textblob_polarity[token_ids]
+        
+        # A known adverb directly before a known word scales it and joins its chunk
+        previous_ids = self._previous(token_ids, document, 1, 0)
+        modified = known & self.textblob_modifier[previous_ids] & self.textblob_known[previous_ids]
+        polarity = np.where(modified, np.clip(polarity * self.textblob_intensity[previous_ids], -1.0, 1.0), polarity)
+        absorbed = np.zeros(len(token_ids), dtype=bool)
+        absorbed[:-1] = modified[1:]
+        
+        # A negation up to two tokens earlier flips the chunk
+        negated = self.negator[previous_ids] | self.negator[self._previous(token_ids, document, 2, 0)]
+        polarity = np.where(negated, polarity * TEXTBLOB_NEGATION, polarity)
+        
+        chunks = known & ~absorbed
+        totals = self._per_document(np.where(chunks, polarity, 0.0), starts)
+        counts = self._per_document(chunks.astype(np.float64), starts)
+        return np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+    
+    def _vader_compound(self, token_ids: np.ndarray, document: np.ndarray, starts: np.ndarray,
+                        exclamations: np.ndarray) -> np.ndarray:
+        """VADER-style normalized valence sum of each review."""
+        valence = self.vader_valence[token_ids]
+        sign = np.sign(valence)
+        negated = np.zeros(len(token_ids), dtype=bool)
+        
+        for distance, decay in enumerate(BOOSTER_DECAY, start=1):
+            previous_ids = self._previous(token_ids, document, distance, 0)
+            valence = valence + sign * self.vader_booster[previous_ids] * decay
+            negated |= self.negator[previous_ids]
+        valence = np.where(negated, valence * N_SCALAR, valence)
+        
+        totals = self._per_document(valence, starts)
+        totals += np.sign(totals) * np.minimum(exclamations, MAX_EXCLAMATIONS) * EXCLAMATION_BOOST
+        return np.clip(totals / np.sqrt(totals * totals + VADER_ALPHA), -1.0, 1.0)
+    
+    @staticmethod
+    def _character_features(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Exclamation counts and uppercase ratios of each review."""
+        # UTF-32 gives one code point per character, so offsets match len(text)
+        characters = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        starts = np.zeros(len(texts), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        
+        exclamations = FastSentimentAnalyzer._per_document((characters == ord('!')).astype(np.float64), starts)
+        uppercase = FastSentimentAnalyzer._per_document(
+            ((characters >= ord('A')) & (characters <= ord('Z'))).astype(np.float64), starts
+        )
+        caps_ratio = np.divide(uppercase, lengths, out=np.zeros(len(texts)), where=lengths > 0)
+        return exclamations, caps_ratio
+
+
+# Example usage
+if __name__ == "__main__":
+    analyzer = FastSentimentAnalyzer()
+    
+    test_reviews = [
+        "This is a wonderful dog! So loving and well-behaved.",
+        "Terrible dog. Very aggressive and mean.",
+        "Not a good dog, never listens.",
+        "Okay dog, nothing special.",
+        ""
+    ]
+    
+    for review, score in zip(test_reviews, analyzer.analyze_batch(test_reviews)):
+        print(f"Review: {review}")
+        print(f"Sentiment Score: {score:.3f}")
+        print()
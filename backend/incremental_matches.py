@@ -0,0 +1,248 @@
+"""
+Incremental Match-List Maintenance
+
+Keeps precomputed top-k match lists current as dogs are inserted, updated or
+deleted, without recomputing all pairs.
+
+A changed dog is scored once against every other dog. Its own top-k is rebuilt
+from that row, and the same row tells which other dogs it now enters. Dogs whose
+lists it leaves are found through a reverse-neighbour map (dog -> dogs listing
+it), so only those are rescanned. Deletes touch only the reverse neighbours of
+the deleted dog.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Set, Tuple
+from cosine_similarity import DogCompatibilityCalculator, TraitWeights
+from vector_embedding import DogTraits
+
+
+# Match list entries are (-similarity, dog_id) so that sorting ranks by
+# similarity (highest first) and breaks ties by dog id
+MatchKey = Tuple[float, str]
+
+
+class IncrementalMatchIndex:
+    """
+    Maintains the top-k most similar dogs for every dog under inserts, updates and deletes.
+    """
+    
+    def __init__(self, top_k: int = 50, calculator: Optional[DogCompatibilityCalculator] = None,
+                 weights: TraitWeights = None, initial_capacity: int = 1024):
+        """
+        Initialize an empty index.
+        
+        Args:
+            top_k: Number of matches kept per dog (default: 50)
+            calculator: Compatibility calculator providing the embedder (default: new instance)
+            weights: Optional trait weights (defaults to the embedder's trait_weights)
+            initial_capacity: Number of dogs storage is allocated for up front
+        """
+        self.top_k = top_k
+        self.calculator = calculator or DogCompatibilityCalculator()
+        self.squared_weights = self.calculator.get_weight_vector(weights) ** 2
+        
+        dimension = len(self.calculator.embedder.trait_names)
+        self._vectors = np.zeros((initial_capacity, dimension))
+        self._norms = np.zeros(initial_capacity)
+        self._active = np.zeros(initial_capacity, dtype=bool)
+        # Similarity of the worst entry of each full match list (-inf if not full)
+        self._worst_scores = np.full(initial_capacity, -np.inf)
+        self._slot_ids: List[Optional[str]] = [None] * initial_capacity
+        self._slots: Dict[str, int] = {}
+        self._free_slots: List[int] = list(range(initial_capacity - 1, -1, -1))
+        
+        self.match_lists: Dict[str, List[MatchKey]] = {}
+        self.reverse_neighbours: Dict[str, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def __contains__(self, dog_id: str) -> bool:
+        return dog_id in self._slots
+    
+    def _grow(self) -> None:
+        """Double the storage capacity."""
+        capacity = len(self._vectors)
+        self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        self._norms = np.concatenate([self._norms, np.zeros(capacity)])
+        self._active = np.concatenate([self._active, np.zeros(capacity, dtype=bool)])
+        self._worst_scores = np.concatenate([self._worst_scores, np.full(capacity, -np.inf)])
+        self._slot_ids.extend([None] * capacity)
+        self._free_slots.extend(range(2 * capacity - 1, capacity - 1, -1))
+    
+    def _score_slot(self, slot: int) -> np.ndarray:
+        """
+        Score one dog against every stored dog.
+        
+        The kernel is evaluated elementwise so that sim(a, b) is bit-identical
+        to sim(b, a) regardless of storage layout, which keeps incremental
+        patches exactly equal to a full recompute.
+        
+        Returns:
+            Similarity per slot, -inf for the dog itself and for free slots
+        """
+        dot_products = np.sum(self._vectors * self._vectors[slot] * self.squared_weights, axis=1)
+        denominators = self._norms * self._norms[slot]
+        scores = np.divide(dot_products, denominators,
+                           out=np.zeros_like(dot_products), where=denominators > 0)
+        scores = np.clip(scores, -1.0, 1.0)
+        scores[~self._active] = -np.inf
+        scores[slot] = -np.inf
+        return scores
+    
+    def _top_k_from_scores(self, scores: np.ndarray) -> List[MatchKey]:
+        """Select the top-k entries from a row of scores, breaking ties by dog id."""
+        n_candidates = int(np.count_nonzero(scores > -np.inf))
+        if n_candidates == 0 or self.top_k == 0:
+            return []
+        
+        # Keep everything tied with the k-th score so the id tie-break is exact
+        k = min(self.top_k, n_candidates)
+        kth_score = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= kth_score)
+        entries = sorted((-float(scores[slot]), self._slot_ids[slot]) for slot in candidates)
+        return entries[:self.top_k]
+    
+    def _set_match_list(self, dog_id: str, entries: List[MatchKey]) -> None:
+        """Replace a dog's match list, keeping the reverse-neighbour map in sync."""
+        old_neighbours = {other_id for _, other_id in self.match_lists.get(dog_id, [])}
+        new_neighbours = {other_id for _, other_id in entries}
+        for other_id in old_neighbours - new_neighbours:
+            self.reverse_neighbours[other_id].discard(dog_id)
+        for other_id in new_neighbours - old_neighbours:
+            self.reverse_neighbours[other_id].add(dog_id)
+        
+        self.match_lists[dog_id] = entries
+        full = len(entries) == self.top_k and self.top_k > 0
+        self._worst_scores[self._slots[dog_id]] = -entries[-1][0] if full else -np.inf
+    
+    def _rescan(self, dog_id: str) -> None:
+        """Recompute a dog's match list from scratch."""
+        scores = self._score_slot(self._slots[dog_id])
+        self._set_match_list(dog_id, self._top_k_from_scores(scores))
+    
+    def upsert_dog(self, dog_id: str, dog_traits: DogTraits) -> None:
+        """
+        Insert a new dog or update an existing dog's traits.
+        
+        Args:
+            dog_id: Dog identifier
+            dog_traits: The dog's current traits
+        """
+        self.upsert_vector(dog_id, self.calculator.embedder.create_trait_vector(dog_traits))
+    
+    def upsert_vector(self, dog_id: str, trait_vector: np.ndarray) -> None:
+        """
+        Insert a new dog or update an existing dog from an unweighted trait vector.
+        
+        Args:
+            dog_id: Dog identifier
+            trait_vector: Range-normalized trait vector from create_trait_vector
+        """
+        if dog_id not in self._slots:
+            if not self._free_slots:
+                self._grow()
+            slot = self._free_slots.pop()
+            self._slots[dog_id] = slot
+            self._slot_ids[slot] = dog_id
+            self._active[slot] = True
+            self.reverse_neighbours[dog_id] = set()
+        slot = self._slots[dog_id]
+        
+        vector = np.asarray(trait_vector, dtype=float)
+        self._vectors[slot] = vector
+        self._norms[slot] = np.sqrt(np.sum(vector * vector * self.squared_weights))
+        
+        # One pass over the index serves every list touched by this dog
+        scores = self._score_slot(slot)
+        self._set_match_list(dog_id, self._top_k_from_scores(scores))
+        
+        # Dogs already listing this dog: re-rank it, or rescan if it may drop out
+        for other_id in list(self.reverse_neighbours[dog_id]):
+            other_slot = self._slots[other_id]
+            entries = self.match_lists[other_id]
+            new_key = (-float(scores[other_slot]), dog_id)
+            if len(entries) < self.top_k or new_key < entries[-1]:
+                entries = [entry for entry in entries if entry[1] != dog_id]
+                entries.append(new_key)
+                entries.sort()
+                self._set_match_list(other_id, entries)
+            else:
+                self._rescan(other_id)
+        
+        # Dogs whose list this dog may now enter
+        listed_by = self.reverse_neighbours[dog_id]
+        for other_slot in np.flatnonzero((scores > -np.inf) & (scores >= self._worst_scores)):
+            other_id = self._slot_ids[other_slot]
+            if other_id in listed_by:
+                continue
+            entries = self.match_lists[other_id]
+            new_key = (-float(scores[other_slot]), dog_id)
+            if len(entries) < self.top_k or new_key < entries[-1]:
+                entries = sorted(entries + [new_key])[:self.top_k]
+                self._set_match_list(other_id, entries)
+    
+    def remove_dog(self, dog_id: str) -> None:
+        """
+        Delete a dog, patching only the match lists that contained it.
+        
+        Args:
+            dog_id: Dog identifier
+        """
+        slot = self._slots.pop(dog_id)
+        self._active[slot] = False
+        self._worst_scores[slot] = -np.inf
+        self._slot_ids[slot] = None
+        self._free_slots.append(slot)
+        
+        for _, other_id in self.match_lists.pop(dog_id):
+            self.reverse_neighbours[other_id].discard(dog_id)
+        
+        # A full list losing an entry needs a rescan to find its replacement
+        for other_id in self.reverse_neighbours.pop(dog_id):
+            entries = self.match_lists[other_id]
+            was_full = len(entries) == self.top_k
+            self.match_lists[other_id] = [entry for entry in entries if entry[1] != dog_id]
+            if was_full:
+                self._rescan(other_id)
+            else:
+                self._set_match_list(other_id, self.match_lists[other_id])
+    
+    def get_matches(self, dog_id: str) -> List[Tuple[str, float]]:
+        """
+        Get a dog's current match list.
+        
+        Args:
+            dog_id: Dog identifier
+            
+        Returns:
+            List of (dog_id, similarity) matches, best first
+        """
+        return [(other_id, -neg_score) for neg_score, other_id in self.match_lists[dog_id]]
+    
+    def compute_full_match_lists(self) -> Dict[str, List[MatchKey]]:
+        """
+        Recompute every match list from scratch without modifying the index.
+        
+        Returns:
+            Dictionary mapping each dog id to its match list entries
+        """
+        return {
+            dog_id: self._top_k_from_scores(self._score_slot(slot))
+            for dog_id, slot in self._slots.items()
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    index = IncrementalMatchIndex(top_k=2)
+    index.upsert_dog("dog1", DogTraits(age=3, weight=45, sex=1, neutered=1, sociability=8, temperament=7))
+    index.upsert_dog("dog2", DogTraits(age=2, weight=40, sex=0, neutered=1, sociability=9, temperament=8))
+    index.upsert_dog("dog3", DogTraits(age=5, weight=60, sex=1, neutered=0, sociability=4, temperament=3))
+    index.upsert_dog("dog4", DogTraits(age=3, weight=50, sex=0, neutered=1, sociability=8, temperament=6))
+    
+    print(f"Matches for dog1: {index.get_matches('dog1')}")
+    
+    index.remove_dog("dog2")
+    print(f"Matches for dog1 after removing dog2: {index.get_matches('dog1')}")
@@ -0,0 +1,315 @@
+"""
+Instrumentation Module
+
+Optional per-stage timing for the scoring pipeline. Stages (embedding, cosine,
+TextBlob, VADER, the final formula, ...) record call counts, wall time and
+batch sizes into an in-process registry that can be exported as JSON or in the
+Prometheus text format.
+
+Instrumentation is off by default. While off, registry.stage() returns a shared
+no-op context manager, so an instrumented block costs a method call and an
+empty with-block enter and exit, with no timing or locking. Set PAW_METRICS=1
+or call registry.enable() to turn it on.
+
+For digging into a single request, profile_call runs one call under cProfile or
+a lightweight sampling profiler and returns a text report.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class StageStats:
+    """Accumulated measurements of one pipeline stage."""
+    
+    __slots__ = ('count', 'total_seconds', 'min_seconds', 'max_seconds', 'items', 'max_batch_size')
+    
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.min_seconds = float('inf')
+        self.max_seconds = 0.0
+        self.items = 0
+        self.max_batch_size = 0
+    
+    def add(self, seconds: float, batch_size: int) -> None:
+        """Add one measurement."""
+        self.count += 1
+        self.total_seconds += seconds
+        self.min_seconds = min(self.min_seconds, seconds)
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.items += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+    
+    def to_dict(self) -> Dict[str, float]:
+        """Convert to a JSON-serializable dictionary."""
+        return {
+            'count': self.count,
+            'total_seconds': self.total_seconds,
+            'mean_seconds': self.total_seconds / self.count if self.count else 0.0,
+            'min_seconds': self.min_seconds if self.count else 0.0,
+            'max_seconds': self.max_seconds,
+            'items': self.items,
+            'mean_batch_size': self.items / self.count if self.count else 0.0,
+            'max_batch_size': self.max_batch_size
+        }
+
+
+class _NullStage:
+    """No-op context manager used while instrumentation is disabled."""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _StageTimer:
+    """Context manager timing one stage execution."""
+    
+    __slots__ = ('registry', 'name', 'batch_size', 'start')
+    
+    def __init__(self, registry: 'MetricsRegistry', name: str, batch_size: int):
+        self.registry = registry
+        self.name = name
+        self.batch_size = batch_size
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.record(self.name, time.perf_counter() - self.start, self.batch_size)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process registry of per-stage timings, call counts and batch sizes.
+    """
+    
+    def __init__(self, enabled: bool = False):
+        """
+        Initialize the registry.
+        
+        Args:
+            enabled: Whether stages are recorded (default: False)
+        """
+        self.enabled = enabled
+        self._stages: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+    
+    def enable(self) -> None:
+        """Start recording stages."""
+        self.enabled = True
+    
+    def disable(self) -> None:
+        """Stop recording stages (recorded data is kept)."""
+        self.enabled = False
+    
+    def reset(self) -> None:
+        """Drop all recorded data."""
+        with self._lock:
+            self._stages.clear()
+    
+    def stage(self, name: str, batch_size: int = 1):
+        """
+        Time a block of code as a pipeline stage.
+        
+        Args:
+            name: Stage name
+            batch_size: Number of items processed by this execution (default: 1)
+            
+        Returns:
+            Context manager recording the stage, or a no-op one when disabled
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self, name, batch_size)
+    
+    def record(self, name: str, seconds: float, batch_size: int = 1) -> None:
+        """
+        Record one stage execution measured elsewhere.
+        
+        Args:
+            name: Stage name
+            seconds: Wall time of the execution
+            batch_size: Number of items processed (default: 1)
+        """
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats()
+            stats.add(seconds, batch_size)
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the recorded measurements.
+        
+        Returns:
+            Dictionary mapping stage names to their statistics
+        """
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in sorted(self._stages.items())}
+    
+    def to_json(self) -> str:
+        """
+        Export the recorded measurements as JSON.
+        
+        Returns:
+            JSON document mapping stage names to their statistics
+        """
+        return json.dumps(self.snapshot(), indent=2)
+    
+    def to_prometheus(self, prefix: str = 'pawpalooza') -> str:
+        """
+        Export the recorded measurements in the Prometheus text exposition format.
+        
+        Args:
+            prefix: Metric name prefix (default: 'pawpalooza')
+            
+        Returns:
+            Metrics text suitable for a /metrics endpoint
+        """
+        metrics = [
+            ('stage_calls_total', 'counter', 'Number of stage executions', 'count'),
+            ('stage_seconds_total', 'counter', 'Total wall time spent in the stage', 'total_seconds'),
+            ('stage_seconds_max', 'gauge', 'Slowest stage execution', 'max_seconds'),
+            ('stage_items_total', 'counter', 'Total items processed by the stage', 'items'),
+            ('stage_batch_size_max', 'gauge', 'Largest batch processed by the stage', 'max_batch_size')
+        ]
+        snapshot = self.snapshot()
+        
+        lines = []
+        for suffix, metric_type, description, field in metrics:
+            name = f'{prefix}_{suffix}'
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for stage_name, stats in snapshot.items():
+                lines.append(f'{name}{{stage="{stage_name}"}} {stats[field]}')
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry used by the scoring modules
+registry = MetricsRegistry(enabled=os.environ.get('PAW_METRICS', '') not in ('', '0'))
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler for the thread that starts it.
+    
+    A background thread periodically captures the profiled thread's stack and
+    counts the functions found on it.
+    """
+    
+    def __init__(self, interval: float = 0.001):
+        """
+        Initialize the profiler.
+        
+        Args:
+            interval: Seconds between samples (default: 0.001)
+        """
+        self.interval = interval
+        self.samples = 0
+        self.leaf_counts = Counter()
+        self.stack_counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._target_thread_id = None
+    
+    @staticmethod
+    def _describe(frame) -> str:
+        code = frame.f_code
+        return f'{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})'
+    
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.leaf_counts[self._describe(frame)] += 1
+            seen = set()
+            while frame is not None:
+                description = self._describe(frame)
+                if description not in seen:
+                    seen.add(description)
+                    self.stack_counts[description] += 1
+                frame = frame.f_back
+    
+    def __enter__(self):
+        self._target_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        return False
+    
+    def report(self, limit: int = 25) -> str:
+        """
+        Format the most frequently sampled functions.
+        
+        Args:
+            limit: Number of functions listed (default: 25)
+            
+        Returns:
+            Text report with self and cumulative sample percentages
+        """
+        lines = [f'{self.samples} samples every {self.interval * 1000:.1f} ms',
+                 f'{"self %":>8} {"cum %":>8}  function']
+        total = max(self.samples, 1)
+        for description, count in self.stack_counts.most_common(limit):
+            self_share = 100.0 * self.leaf_counts.get(description, 0) / total
+            lines.append(f'{self_share:8.1f} {100.0 * count / total:8.1f}  {description}')
+        return '\n'.join(lines)
+
+
+def profile_call(func: Callable, args: Tuple = (), kwargs: Optional[Dict[str, Any]] = None,
+                 mode: str = 'cprofile', limit: int = 25, interval: float = 0.001) -> Tuple[Any, str]:
+    """
+    Run a single call (e.g. one pipeline request) under a profiler.
+    
+    Args:
+        func: Function to call
+        args: Positional arguments for func
+        kwargs: Keyword arguments for func
+        mode: 'cprofile' for deterministic profiling or 'sampling' for the sampling profiler
+        limit: Number of functions included in the report (default: 25)
+        interval: Seconds between samples in sampling mode (default: 0.001)
+        
+    Returns:
+        Tuple of (func's return value, text report)
+    """
+    kwargs = kwargs or {}
+    
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func, *args, **kwargs)
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        return result, output.getvalue()
+    
+    if mode == 'sampling':
+        with SamplingProfiler(interval) as profiler:
+            result = func(*args, **kwargs)
+        return result, profiler.report(limit)
+    
+    raise ValueError(f"Unknown profiling mode: {mode}")
@@ -0,0 +1,131 @@
+"""
+Match Service Load Generator
+
+Starts the match service locally, once with micro-batching and once without,
+fires concurrent keep-alive clients at it and reports throughput and latency
+percentiles for both modes.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from match_service import MatchService
+
+
+SAMPLE_REVIEWS = [
+    "This dog is absolutely amazing! So friendly and well-behaved.",
+    "Great companion, very loving and gentle.",
+    "Had some issues with training. Not very obedient.",
+    "Aggressive at times, needs more training.",
+    "Best dog ever! So playful and energetic.",
+    "This dog is okay, nothing special."
+]
+
+
+def random_dog(rng: random.Random, dog_id: Any = None) -> Dict[str, Any]:
+    """Create a random dog payload."""
+    return {
+        'id': dog_id,
+        'age': rng.randint(0, 15),
+        'weight': rng.randint(5, 120),
+        'sex': rng.randint(0, 1),
+        'neutered': rng.randint(0, 1),
+        'sociability': rng.randint(1, 10),
+        'temperament': rng.randint(1, 10)
+    }
+
+
+def build_payload(endpoint: str, rng: random.Random, candidates: int) -> bytes:
+    """Create one request body for an endpoint."""
+    if endpoint == 'match':
+        body = {
+            'dog': random_dog(rng),
+            'candidates': [random_dog(rng, index) for index in range(candidates)]
+        }
+    else:
+        body = {'reviews': rng.sample(SAMPLE_REVIEWS, 3)}
+    return json.dumps(body).encode('utf-8')
+
+
+async def run_client(host: str, port: int, endpoint: str, payloads: List[bytes],
+                     latencies: List[float]) -> None:
+    """Send payloads one after another over a single keep-alive connection."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for payload in payloads:
+            start = time.perf_counter()
+            writer.write(
+                f'POST /{endpoint} HTTP/1.1\r\nHost: {host}\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'.encode('latin-1')
+                + payload
+            )
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = next(int(line.split(':', 1)[1]) for line in head.decode('latin-1').split('\r\n')
+                          if line.lower().startswith('content-length:'))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(endpoint: str, max_batch_size: int, concurrency: int, requests_per_client: int,
+                   candidates: int, max_wait: float, seed: int = 0) -> Dict[str, float]:
+    """
+    Run one load test against a freshly started service.
+    
+    Returns:
+        Dictionary with throughput and latency percentiles (milliseconds)
+    """
+    service = MatchService(max_batch_size=max_batch_size, max_wait=max_wait)
+    server = await service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    
+    rng = random.Random(seed)
+    payloads = [[build_payload(endpoint, rng, candidates) for _ in range(requests_per_client)]
+                for _ in range(concurrency)]
+    latencies: List[float] = []
+    
+    start = time.perf_counter()
+    async with server:
+        await asyncio.gather(*(run_client('127.0.0.1', port, endpoint, client_payloads, latencies)
+                               for client_payloads in payloads))
+    elapsed = time.perf_counter() - start
+    service.executor.shutdown()
+    
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99))
+    }
+
+
+def main() -> None:
+    """Compare batched and unbatched handling from the command line."""
+    parser = argparse.ArgumentParser(description="Load test the match service")
+    parser.add_argument('--endpoint', choices=['match', 'sentiment'], default='match')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=50, help="Requests per client")
+    parser.add_argument('--candidates', type=int, default=100, help="Candidates per match request")
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+    
+    print(f"{'mode':<10} {'requests':>9} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for mode, max_batch_size in (('unbatched', 1), ('batched', args.max_batch_size)):
+        stats = asyncio.run(run_load(args.endpoint, max_batch_size, args.concurrency, args.requests,
+                                     args.candidates, args.max_wait_ms / 1000.0))
+        print(f"{mode:<10} {stats['requests']:>9} {stats['throughput']:>10.1f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
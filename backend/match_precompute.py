@@ -0,0 +1,335 @@
+"""
+Match Precomputation Job
+
+Nightly batch job that precomputes the top-k most similar dogs for every dog,
+so matches can be served instantly instead of being computed on request.
+
+The all-pairs similarity computation is split into shards of query rows, and
+each shard is scanned against the corpus one column tile at a time on a process
+pool. Trait vectors live in shared memory so workers never copy the corpus.
+Each shard keeps only a running top-k per dog and is written to disk as soon as
+it finishes, which makes the job resumable per shard after a crash. Besides the
+trait vectors themselves (N x 6 floats), memory use is bounded by
+shard_size x (tile_size + top_k) per worker regardless of N.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from cosine_similarity import DogCompatibilityCalculator, TraitWeights
+
+
+MANIFEST_FILE = 'manifest.json'
+
+# Per-process state set up by _init_worker
+_worker_state = {}
+
+
+def _init_worker(shm_name: str, shape: Tuple[int, int], weight_vector: np.ndarray) -> None:
+    """Attach a worker process to the shared trait vectors."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_state['shm'] = shm
+    _worker_state['vectors'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker_state['weights'] = weight_vector
+    _worker_state['calculator'] = DogCompatibilityCalculator()
+
+
+def _shard_path(output_dir: str, shard_index: int) -> str:
+    """Get the file path of a shard's match lists."""
+    return os.path.join(output_dir, f'shard_{shard_index:05d}.npz')
+
+
+def _process_shard(task: Tuple[int, int, int, int, int, str]) -> int:
+    """
+    Compute and write the top-k match lists for one shard of query rows.
+    
+    Args:
+        task: (shard_index, start, stop, top_k, tile_size, output_dir)
+        
+    Returns:
+        Index of the completed shard
+    """
+    shard_index, start, stop, top_k, tile_size, output_dir = task
+    vectors = _worker_state['vectors']
+    weights = _worker_state['weights']
+    calculator = _worker_state['calculator']
+    
+    queries = vectors[start:stop]
+    rows = np.arange(start, stop)
+    best_scores = np.full((len(queries), 0), -np.inf)
+    best_indices = np.zeros((len(queries), 0), dtype=np.int64)
+    
+    for tile_start in range(0, len(vectors), tile_size):
+        tile_stop = min(tile_start + tile_size, len(vectors))
+        scores = calculator.calculate_similarity_matrix(queries, vectors[tile_start:tile_stop], weights)
+        columns = np.arange(tile_start, tile_stop)
+        
+        # A dog is never its own match
+        scores[columns[None, :] == rows[:, None]] = -np.inf
+        
+        # Merge the tile into the running top-k
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_indices = np.concatenate([best_indices, np.broadcast_to(columns, scores.shape)], axis=1)
+        if merged_scores.shape[1] > top_k:
+            keep = np.argpartition(-merged_scores, top_k - 1, axis=1)[:, :top_k]
+            merged_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            merged_indices = np.take_along_axis(merged_indices, keep, axis=1)
+        best_scores, best_indices = merged_scores, merged_indices
+    
+    # Sort each list by score (highest first), breaking ties by dog index
+    order = np.lexsort((best_indices, -best_scores), axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_indices = np.take_along_axis(best_indices, order, axis=1)
+    
+    # Write atomically so a crash never leaves a partial shard behind
+    final_path = _shard_path(output_dir, shard_index)
+    temp_path = final_path + '.tmp.npz'
+    np.savez(temp_path, start=start, stop=stop,
+             indices=best_indices.astype(np.int32), scores=best_scores.astype(np.float32))
+    os.replace(temp_path, final_path)
+    return shard_index
+
+
+class MatchPrecomputer:
+    """
+    Precomputes and stores the top-k most similar dogs for every dog.
+    """
+    
+    def __init__(self, top_k: int = 50, shard_size: int = 1024, tile_size: int = 4096,
+                 workers: Optional[int] = None, weights: TraitWeights = None):
+        """
+        Initialize the precomputation job.
+        
+        Args:
+            top_k: Number of matches kept per dog (default: 50)
+            shard_size: Number of query dogs per shard, the unit of resumption (default: 1024)
+            tile_size: Number of corpus dogs scored per block (default: 4096)
+            workers: Number of worker processes (default: CPU count; 1 runs in-process)
+            weights: Optional trait weights (defaults to the embedder's trait_weights)
+        """
+        self.top_k = top_k
+        self.shard_size = shard_size
+        self.tile_size = tile_size
+        self.workers = workers or os.cpu_count() or 1
+        self.calculator = DogCompatibilityCalculator()
+        self.weight_vector = self.calculator.get_weight_vector(weights)
+    
+    def _fingerprint(self, dog_ids: List[str], trait_vectors: np.ndarray) -> str:
+        """Identify the inputs and parameters a set of shards was computed from."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(dog_ids).encode('utf-8'))
+        digest.update(np.ascontiguousarray(trait_vectors, dtype=np.float64).tobytes())
+        digest.update(self.weight_vector.tobytes())
+        digest.update(f'{self.top_k}:{self.shard_size}'.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _prepare_output(self, output_dir: str, manifest: Dict, overwrite: bool) -> None:
+        """Create the output directory, validating any manifest left by an earlier run."""
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+        
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                previous = json.load(f)
+            if previous.get('fingerprint') != manifest['fingerprint']:
+                if not overwrite:
+                    raise ValueError(
+                        f"{output_dir} holds matches for different inputs; pass overwrite=True to replace them"
+                    )
+                for shard_index in range(previous.get('n_shards', 0)):
+                    if os.path.exists(_shard_path(output_dir, shard_index)):
+                        os.remove(_shard_path(output_dir, shard_index))
+        
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+    
+    def run(self, dog_ids: List[str], trait_vectors: np.ndarray, output_dir: str,
+            overwrite: bool = False) -> Dict[str, int]:
+        """
+        Precompute match lists for all dogs, skipping shards already on disk.
+        
+        Args:
+            dog_ids: Dog identifiers, one per row of trait_vectors
+            trait_vectors: Unweighted trait vectors of shape (n_dogs, dim)
+            output_dir: Directory receiving the manifest and shard files
+            overwrite: Replace matches computed from different inputs (default: False)
+            
+        Returns:
+            Dictionary with the number of shards, computed shards and skipped shards
+        """
+        trait_vectors = np.ascontiguousarray(trait_vectors, dtype=np.float64)
+        if len(dog_ids) != len(trait_vectors):
+            raise ValueError("dog_ids and trait_vectors must have the same length")
+        
+        n_dogs = len(dog_ids)
+        top_k = min(self.top_k, max(n_dogs - 1, 0))
+        n_shards = (n_dogs + self.shard_size - 1) // self.shard_size
+        manifest = {
+            'dog_ids': list(dog_ids),
+            'top_k': top_k,
+            'shard_size': self.shard_size,
+            'n_shards': n_shards,
+            'fingerprint': self._fingerprint(list(dog_ids), trait_vectors)
+        }
+        self._prepare_output(output_dir, manifest, overwrite)
+        
+        tasks = [
+            (shard_index, start, min(start + self.shard_size, n_dogs), top_k, self.tile_size, output_dir)
+            for shard_index, start in enumerate(range(0, n_dogs, self.shard_size))
+            if not os.path.exists(_shard_path(output_dir, shard_index))
+        ]
+        summary = {'shards': n_shards, 'computed': len(tasks), 'skipped': n_shards - len(tasks)}
+        if not tasks:
+            return summary
+        
+        # Share the trait vectors with all workers without copying them
+        shm = shared_memory.SharedMemory(create=True, size=max(trait_vectors.nbytes, 1))
+        try:
+            shared_vectors = np.ndarray(trait_vectors.shape, dtype=np.float64, buffer=shm.buf)
+            shared_vectors[:] = trait_vectors
+            init_args = (shm.name, trait_vectors.shape, self.weight_vector)
+            
+            if self.workers == 1:
+                _init_worker(*init_args)
+                try:
+                    for task in tasks:
+                        _process_shard(task)
+                finally:
+                    _worker_state.pop('shm').close()
+                    _worker_state.clear()
+            else:
+                with multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=init_args) as pool:
+                    for _ in pool.imap_unordered(_process_shard, tasks):
+                        pass
+        finally:
+            shm.close()
+            shm.unlink()
+        
+        return summary
+
+
+def _load_manifest(output_dir: str) -> Dict:
+    """Load the manifest written by MatchPrecomputer.run."""
+    with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def _shard_match_lists(manifest: Dict, shard: Dict) -> Dict[str, List[Tuple[str, float]]]:
+    """Convert a loaded shard into per-dog match lists."""
+    dog_ids = manifest['dog_ids']
+    start = int(shard['start'])
+    return {
+        dog_ids[start + row]: [(dog_ids[index], float(score)) for index, score in zip(indices, scores)]
+        for row, (indices, scores) in enumerate(zip(shard['indices'], shard['scores']))
+    }
+
+
+def load_match_lists(output_dir: str) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Load all precomputed match lists.
+    
+    Args:
+        output_dir: Directory written by MatchPrecomputer.run
+        
+    Returns:
+        Dictionary mapping each dog id to its (dog_id, similarity) matches, best first
+    """
+    manifest = _load_manifest(output_dir)
+    match_lists = {}
+    for shard_index in range(manifest['n_shards']):
+        with np.load(_shard_path(output_dir, shard_index)) as shard:
+            match_lists.update(_shard_match_lists(manifest, shard))
+    return match_lists
+
+
+class MatchListReader:
+    """
+    Serves single-dog match lookups from a precomputed output directory.
+    
+    The manifest is parsed once and turned into an id -> row mapping, so each
+    lookup only opens the dog's shard and converts the dog's own row.
+    """
+    
+    def __init__(self, output_dir: str):
+        """
+        Load the manifest of a precomputed output directory.
+        
+        Args:
+            output_dir: Directory written by MatchPrecomputer.run
+        """
+        self.output_dir = output_dir
+        self.manifest = _load_manifest(output_dir)
+        self.dog_ids = self.manifest['dog_ids']
+        self.rows = {dog_id: row for row, dog_id in enumerate(self.dog_ids)}
+    
+    def matches_for(self, dog_id: str) -> List[Tuple[str, float]]:
+        """
+        Load the precomputed match list of a single dog, reading only its shard.
+        
+        Args:
+            dog_id: Dog identifier
+            
+        Returns:
+            List of (dog_id, similarity) matches, best first
+        """
+        row = self.rows[dog_id]
+        with np.load(_shard_path(self.output_dir, row // self.manifest['shard_size'])) as shard:
+            shard_row = row - int(shard['start'])
+            indices, scores = shard['indices'][shard_row], shard['scores'][shard_row]
+        return [(self.dog_ids[index], float(score)) for index, score in zip(indices, scores)]
+
+
+def load_matches_for(output_dir: str, dog_id: str) -> List[Tuple[str, float]]:
+    """
+    Load the precomputed match list of a single dog.
+    
+    Parses the manifest on every call; use MatchListReader for repeated lookups.
+    
+    Args:
+        output_dir: Directory written by MatchPrecomputer.run
+        dog_id: Dog identifier
+        
+    Returns:
+        List of (dog_id, similarity) matches, best first
+    """
+    return MatchListReader(output_dir).matches_for(dog_id)
+
+
+def main() -> None:
+    """Run the precomputation job from the command line."""
+    parser = argparse.ArgumentParser(description="Precompute top-k dog matches")
+    parser.add_argument('dogs', help="JSONL file with one dog (id and trait fields) per line")
+    parser.add_argument('output_dir', help="Directory receiving the match lists")
+    parser.add_argument('--top-k', type=int, default=50)
+    parser.add_argument('--shard-size', type=int, default=1024)
+    parser.add_argument('--tile-size', type=int, default=4096)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--overwrite', action='store_true')
+    args = parser.parse_args()
+    
+    precomputer = MatchPrecomputer(top_k=args.top_k, shard_size=args.shard_size,
+                                   tile_size=args.tile_size, workers=args.workers)
+    embedder = precomputer.calculator.embedder
+    
+    dog_ids = []
+    trait_vectors = []
+    with open(args.dogs) as f:
+        for line in f:
+            if line.strip():
+                dog = json.loads(line)
+                dog_ids.append(str(dog['id']))
+                trait_vectors.append(embedder.create_trait_vector_from_dict(dog))
+    
+    summary = precomputer.run(dog_ids, np.array(trait_vectors).reshape(-1, len(embedder.trait_names)),
+                              args.output_dir, overwrite=args.overwrite)
+    print(f"Shards: {summary['shards']} (computed {summary['computed']}, skipped {summary['skipped']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+Match Service
+
+Long-running asyncio HTTP service exposing the Python scoring code, so the
+Node backend no longer has to spawn a Python process per request.
+
+Requests arriving within a few milliseconds of each other are coalesced by a
+MicroBatcher: all match requests in a batch are scored in one vectorized pass
+over their (dog, candidate) pairs, and all sentiment requests share one
+analyzer call. Results are then fanned back out to the waiting requests.
+
+Each request is fully validated and resolved to trait, weight and candidate
+vectors before it joins a batch, so a malformed request is answered with 400
+on its own. Should a batch still fail, its requests are rescored one by one
+and only the failing ones receive the error.
+
+Endpoints:
+    POST /match      {"dog": {traits}, "candidates": [{"id": ..., traits}], "weights": {...}}
+    POST /sentiment  {"reviews": ["...", ...]}
+    GET  /health
+    GET  /metrics    (Prometheus text from the instrumentation registry)
+"""
+
+import argparse
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from cosine_similarity import DogCompatibilityCalculator
+from instrumentation import registry
+from sentiment_analysis import SentimentAnalyzer
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrently submitted items into batches for a batch function.
+    """
+    
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 64,
+                 max_wait: float = 0.002, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Initialize the batcher.
+        
+        Args:
+            process_batch: Function mapping a list of items to a list of results;
+                a result that is an exception fails only its own item
+            max_batch_size: Largest batch handed to process_batch (1 disables batching)
+            max_wait: Seconds the first item of a batch waits for company (default: 0.002)
+            executor: Executor running process_batch off the event loop
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Submit one item and wait for its result.
+        
+        Args:
+            item: Item for process_batch
+            
+        Returns:
+            The item's result
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+    
+    def _flush(self) -> None:
+        """Hand all pending items to process_batch as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(batch))
+    
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Run one batch and resolve the futures of its items."""
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.process_batch, items
+            )
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def isolate_failures(score_batch: Callable[[List[Any]], List[Any]], items: List[Any]) -> List[Any]:
+    """
+    Score a batch, falling back to one item at a time if the batch fails.
+    
+    Args:
+        score_batch: Function mapping a list of items to a list of results
+        items: Items to score
+        
+    Returns:
+        One result per item; items that fail on their own get their exception instead
+    """
+    try:
+        return score_batch(items)
+    except Exception:
+        if len(items) == 1:
+            raise
+    
+    results = []
+    for item in items:
+        try:
+            results.extend(score_batch([item]))
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+class RequestError(ValueError):
+    """Raised for a request body that cannot be scored; answered with 400."""
+
+
+class MatchService:
+    """
+    Batched match and sentiment scoring on top of DogCompatibilityCalculator and SentimentAnalyzer.
+    """
+    
+    def __init__(self, max_batch_size: int = 64, max_wait: float = 0.002,
+                 compatibility_threshold: float = 0.75, fast_sentiment: bool = False):
+        """
+        Initialize the service.
+        
+        Args:
+            max_batch_size: Largest number of requests scored together (1 disables batching)
+            max_wait: Seconds a request waits for others to join its batch (default: 0.002)
+            compatibility_threshold: Minimum cosine similarity for compatibility (default: 0.75)
+            fast_sentiment: Score reviews with the lexicon-only fast path (default: False)
+        """
+        self.calculator = DogCompatibilityCalculator(compatibility_threshold)
+        self.analyzer = SentimentAnalyzer()
+        self.fast_sentiment = fast_sentiment
+        
+        # A single scoring thread keeps the event loop free and the analyzer single-threaded
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.match_batcher = MicroBatcher(partial(isolate_failures, self.score_match_batch),
+                                          max_batch_size, max_wait, self.executor)
+        self.sentiment_batcher = MicroBatcher(partial(isolate_failures, self.score_sentiment_batch),
+                                              max_batch_size, max_wait, self.executor)
+    
+    def _trait_vector(self, traits: Any, label: str) -> np.ndarray:
+        """Resolve one dog's traits to a trait vector, rejecting non-numeric traits."""
+        if not isinstance(traits, dict):
+            raise RequestError(f"{label} must be an object")
+        trait_names = self.calculator.embedder.trait_names
+        for name in trait_names:
+            value = traits.get(name, 0)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise RequestError(f"{label}.{name} must be a finite number")
+        return self.calculator.embedder.create_trait_vector_from_dict(traits)
+    
+    def prepare_match_request(self, payload: Any) -> Dict[str, Any]:
+        """
+        Validate a match request body and resolve it to vectors.
+        
+        Args:
+            payload: Parsed JSON body of a /match request
+            
+        Returns:
+            Dictionary with the candidate ids, the dog's trait vector, the
+            candidates' trait vectors and the weight vector
+            
+        Raises:
+            RequestError: If the body cannot be scored
+        """
+        if not isinstance(payload, dict):
+            raise RequestError("Request body must be an object")
+        candidates = payload.get('candidates', [])
+        if not isinstance(candidates, list):
+            raise RequestError("candidates must be an array")
+        
+        weights = payload.get('weights')
+        if weights is not None and not isinstance(weights, dict):
+            raise RequestError("weights must be an object")
+        try:
+            weight_vector = self.calculator.get_weight_vector(weights)
+        except (TypeError, ValueError) as error:
+            raise RequestError(str(error)) from None
+        if not np.all(np.isfinite(weight_vector)):
+            raise RequestError("weights must be finite numbers")
+        
+        dimension = len(self.calculator.embedder.trait_names)
+        return {
+            'ids': [candidate.get('id') if isinstance(candidate, dict) else None for candidate in candidates],
+            'dog_vector': self._trait_vector(payload.get('dog'), 'dog'),
+            'candidate_vectors': np.array([
+                self._trait_vector(candidate, f'candidates[{index}]') for index, candidate in enumerate(candidates)
+            ]).reshape(len(candidates), dimension),
+            'weight_vector': weight_vector
+        }
+    
+    def prepare_sentiment_request(self, payload: Any) -> List[str]:
+        """
+        Validate a sentiment request body.
+        
+        Args:
+            payload: Parsed JSON body of a /sentiment request
+            
+        Returns:
+            The review texts
+            
+        Raises:
+            RequestError: If the body cannot be scored
+        """
+        if not isinstance(payload, dict) or not isinstance(payload.get('reviews'), list):
+            raise RequestError("Reviews array is required")
+        if not all(isinstance(review, str) for review in payload['reviews']):
+            raise RequestError("Reviews must be strings")
+        return payload['reviews']
+    
+    def score_match_batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Score a batch of match requests in one vectorized pass.
+        
+        Args:
+            requests: Match requests as returned by prepare_match_request
+            
+        Returns:
+            One response body per request
+        """
+        sizes = [len(request['ids']) for request in requests]
+        
+        with registry.stage('match_batch', len(requests)):
+            if sum(sizes):
+                similarities = self.calculator.calculate_pairwise_similarities(
+                    np.repeat([request['dog_vector'] for request in requests], sizes, axis=0),
+                    np.concatenate([request['candidate_vectors'] for request in requests]),
+                    np.repeat([request['weight_vector'] for request in requests], sizes, axis=0)
+                )
+            else:
+                similarities = np.zeros(0)
+        
+        responses = []
+        offset = 0
+        for request, size in zip(requests, sizes):
+            matches = [
+                {
+                    'id': candidate_id,
+                    'cosine_similarity': float(similarity),
+                    'is_compatible': bool(similarity >= self.calculator.compatibility_threshold)
+                }
+                for candidate_id, similarity in zip(request['ids'], similarities[offset:offset + size])
+            ]
+            matches.sort(key=lambda match: match['cosine_similarity'], reverse=True)
+            responses.append({'matches': matches})
+            offset += size
+        return responses
+    
+    def score_sentiment_batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Score the reviews of a batch of sentiment requests in one analyzer call.
+        
+        Args:
+            requests: Review lists as returned by prepare_sentiment_request
+            
+        Returns:
+            One response body per request
+        """
+        all_reviews = [review for reviews in requests for review in reviews]
+        scores = []
+        if all_reviews and self.fast_sentiment:
+            scores = self.analyzer.analyze_batch(all_reviews, fast=True)
+        elif all_reviews:
+            self.analyzer.build_vocabulary(all_reviews)
+            scores = self.analyzer.analyze_batch(all_reviews)
+        
+        responses = []
+        offset = 0
+        for reviews in requests:
+            request_scores = scores[offset:offset + len(reviews)]
+            offset += len(reviews)
+            responses.append({
+                'scores': request_scores,
+                'averageSentiment': float(np.mean(request_scores)) if request_scores else 0.0,
+                'count': len(request_scores)
+            })
+        return responses
+    
+    async def handle_request(self, method: str, path: str, body: bytes) -> Tuple[int, str, str]:
+        """
+        Route one HTTP request.
+        
+        Returns:
+            Tuple of (status code, content type, response body)
+        """
+        if method == 'GET' and path == '/health':
+            return 200, 'application/json', json.dumps({'status': 'ok'})
+        if method == 'GET' and path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', registry.to_prometheus()
+        if method != 'POST' or path not in ('/match', '/sentiment'):
+            return 404, 'application/json', json.dumps({'error': 'Not found'})
+        
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return 400, 'application/json', json.dumps({'error': 'Invalid JSON'})
+        
+        try:
+            if path == '/match':
+                request = self.prepare_match_request(payload)
+            else:
+                request = self.prepare_sentiment_request(payload)
+        except RequestError as error:
+            return 400, 'application/json', json.dumps({'error': str(error)})
+        
+        batcher = self.match_batcher if path == '/match' else self.sentiment_batcher
+        result = await batcher.submit(request)
+        return 200, 'application/json', json.dumps(result)
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one keep-alive connection."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                
+                try:
+                    method, path, _ = request_line.split(' ', 2)
+                    content_length = headers.get('content-length', '0')
+                    if not content_length.isdigit():
+                        raise ValueError(f"Invalid Content-Length: {content_length!r}")
+                    body = await reader.readexactly(int(content_length))
+                except ValueError:
+                    # Without a request line and body length the next request cannot be framed
+                    await self._write_response(writer, 400, 'application/json',
+                                               json.dumps({'error': 'Malformed request'}), keep_alive=False)
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                
+                try:
+                    status, content_type, response = await self.handle_request(method, path, body)
+                except Exception as error:
+                    status, content_type, response = 500, 'application/json', json.dumps({'error': str(error)})
+                
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._write_response(writer, status, content_type, response, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+    
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: int, content_type: str,
+                              response: str, keep_alive: bool) -> None:
+        """Send one HTTP/1.1 response."""
+        encoded = response.encode('utf-8')
+        writer.write(
+            f'HTTP/1.1 {status} {"OK" if status == 200 else "Error"}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(encoded)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + encoded
+        )
+        await writer.drain()
+    
+    async def start(self, host: str = '127.0.0.1', port: int = 8001) -> asyncio.AbstractServer:
+        """
+        Start listening for connections.
+        
+        Args:
+            host: Interface to bind (default: 127.0.0.1)
+            port: Port to bind, 0 picks a free port (default: 8001)
+            
+        Returns:
+            The running asyncio server
+        """
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    service = MatchService(max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000.0,
+                           fast_sentiment=args.fast_sentiment)
+    server = await service.start(args.host, args.port)
+    print(f"Match service listening on http://{args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    """Run the match service from the command line."""
+    parser = argparse.ArgumentParser(description="Batched dog match and sentiment service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--fast-sentiment', action='store_true',
+                        help="Score reviews with the lexicon-only fast path")
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Pairwise Compatibility Cache
+
+Memoizes calculate_compatibility_pipeline per pair of dogs so that repeated
+profile views cost a dictionary lookup instead of re-running the embedding and
+sentiment stack.
+
+Entries are keyed on (min_id, max_id), so A vs B and B vs A share one entry.
+Each dog carries version counters for its traits and its reviews. An entry
+remembers the versions it was computed from, and invalidating a dog only bumps
+its counter: stale entries are detected on lookup, never searched for. A
+result is stored under the versions seen when its lookup missed, so a result
+computed from data invalidated mid-computation is never served as fresh.
+
+Self-pairs are not cached: both sides would share one sentiment slot in the
+components, so the cache rejects them and the cached pipeline computes them
+directly.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from compatibilitywithReviewsandRatings import build_compatibility_result, calculate_compatibility_pipeline
+from vector_embedding import DogTraits
+
+
+# (trait_version_a, review_version_a, trait_version_b, review_version_b)
+PairVersions = Tuple[int, int, int, int]
+
+
+class CompatibilityPairCache:
+    """
+    Size-bounded LRU cache of pairwise compatibility components with version-based invalidation.
+    """
+    
+    def __init__(self, max_size: int = 10000):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of cached pairs (default: 10000)
+        """
+        self.max_size = max_size
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[PairVersions, Dict[str, float]]]' = OrderedDict()
+        self._trait_versions: Dict[str, int] = {}
+        self._review_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.rejected = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _key(dog_a_id: str, dog_b_id: str) -> Tuple[str, str]:
+        """Get the symmetric cache key of a pair, rejecting a dog paired with itself."""
+        if dog_a_id == dog_b_id:
+            raise ValueError(f"Cannot cache a dog paired with itself: {dog_a_id!r}")
+        return (dog_a_id, dog_b_id) if dog_a_id <= dog_b_id else (dog_b_id, dog_a_id)
+    
+    def _versions(self, key: Tuple[str, str]) -> PairVersions:
+        """Get the current versions of both dogs of a pair."""
+        first_id, second_id = key
+        return (
+            self._trait_versions.get(first_id, 0), self._review_versions.get(first_id, 0),
+            self._trait_versions.get(second_id, 0), self._review_versions.get(second_id, 0)
+        )
+    
+    def invalidate_traits(self, dog_id: str) -> None:
+        """
+        Mark every cached pair involving a dog stale after its traits changed.
+        
+        Args:
+            dog_id: Dog identifier
+        """
+        with self._lock:
+            self._trait_versions[dog_id] = self._trait_versions.get(dog_id, 0) + 1
+    
+    def invalidate_reviews(self, dog_id: str) -> None:
+        """
+        Mark every cached pair involving a dog stale after its reviews or ratings changed.
+        
+        Args:
+            dog_id: Dog identifier
+        """
+        with self._lock:
+            self._review_versions[dog_id] = self._review_versions.get(dog_id, 0) + 1
+    
+    def invalidate_dog(self, dog_id: str) -> None:
+        """
+        Mark every cached pair involving a dog stale.
+        
+        Args:
+            dog_id: Dog identifier
+        """
+        self.invalidate_traits(dog_id)
+        self.invalidate_reviews(dog_id)
+    
+    def get(self, dog_a_id: str, dog_b_id: str) -> Optional[Dict[str, float]]:
+        """
+        Look up the cached components of a pair.
+        
+        Args:
+            dog_a_id: First dog's identifier
+            dog_b_id: Second dog's identifier
+            
+        Returns:
+            Dictionary with 'cosine_similarity' and per-dog sentiment keyed by
+            dog id, or None on a miss
+        """
+        return self.lookup(dog_a_id, dog_b_id)[0]
+    
+    def lookup(self, dog_a_id: str, dog_b_id: str) -> Tuple[Optional[Dict[str, float]], PairVersions]:
+        """
+        Look up the cached components of a pair together with the pair's current versions.
+        
+        On a miss, pass the returned versions to put so that a result computed
+        while one of the dogs was invalidated is not stored as fresh.
+        
+        Args:
+            dog_a_id: First dog's identifier
+            dog_b_id: Second dog's identifier
+            
+        Returns:
+            Tuple of (components as returned by get or None on a miss, versions at lookup time)
+            
+        Raises:
+            ValueError: If both ids are the same dog
+        """
+        key = self._key(dog_a_id, dog_b_id)
+        with self._lock:
+            versions = self._versions(key)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != versions:
+                del self._entries[key]
+                self.stale += 1
+                entry = None
+            
+            if entry is None:
+                self.misses += 1
+                return None, versions
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], versions
+    
+    def put(self, dog_a_id: str, dog_b_id: str, components: Dict[str, float],
+            versions: Optional[PairVersions] = None) -> bool:
+        """
+        Store the components of a pair, evicting the least recently used pair if full.
+        
+        Args:
+            dog_a_id: First dog's identifier
+            dog_b_id: Second dog's identifier
+            components: Dictionary as returned by get
+            versions: Versions returned by the lookup that missed; if either dog
+                was invalidated since, the components are not stored. Without
+                versions the components must come from the dogs' current data.
+                
+        Returns:
+            True if the components were stored, False if they were already stale
+            
+        Raises:
+            ValueError: If both ids are the same dog
+        """
+        key = self._key(dog_a_id, dog_b_id)
+        with self._lock:
+            current = self._versions(key)
+            if versions is not None and versions != current:
+                self.rejected += 1
+                return False
+            
+            self._entries[key] = (current, components)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+    
+    def clear(self) -> None:
+        """Drop all cached pairs (version counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache metrics.
+        
+        Returns:
+            Dictionary with hits, misses, stale entries, rejected puts, evictions,
+            size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'rejected': self.rejected,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def calculate_compatibility_pipeline_cached(cache: CompatibilityPairCache,
+                                            dog_a_id: str, dog_b_id: str,
+                                            dog_a_traits: DogTraits, dog_b_traits: DogTraits,
+                                            dog_a_reviews: List[str], dog_b_reviews: List[str],
+                                            dog_a_ratings_sum, dog_b_ratings_sum, k=1.0):
+    """
+    calculate_compatibility_pipeline with pairwise memoization.
+    
+    The cache stores only the expensive, order-independent components (cosine
+    similarity and each dog's average sentiment). The asymmetric formula and the
+    ratings components are re-applied for the requested orientation. A dog
+    paired with itself bypasses the cache.
+    
+    Args:
+        cache: Pair cache to read from and populate
+        dog_a_id: Dog A's identifier
+        dog_b_id: Dog B's identifier
+        Remaining arguments as for calculate_compatibility_pipeline
+        
+    Returns:
+        Dictionary with all scores and final compatibility
+    """
+    if dog_a_id == dog_b_id:
+        return calculate_compatibility_pipeline(
+            dog_a_traits, dog_b_traits, dog_a_reviews, dog_b_reviews,
+            dog_a_ratings_sum, dog_b_ratings_sum, k
+        )
+    
+    components, versions = cache.lookup(dog_a_id, dog_b_id)
+    if components is None:
+        result = calculate_compatibility_pipeline(
+            dog_a_traits, dog_b_traits, dog_a_reviews, dog_b_reviews,
+            dog_a_ratings_sum, dog_b_ratings_sum, k
+        )
+        cache.put(dog_a_id, dog_b_id, {
+            'cosine_similarity': result['cosine_similarity'],
+            dog_a_id: result['sentiment_score_a'],
+            dog_b_id: result['sentiment_score_b']
+        }, versions)
+        return result
+    
+    return build_compatibility_result(
+        components['cosine_similarity'], components[dog_a_id], components[dog_b_id],
+        dog_a_ratings_sum, dog_b_ratings_sum, k
+    )
+
+
+# Example usage
+if __name__ == "__main__":
+    cache = CompatibilityPairCache(max_size=100)
+    
+    dog_a_traits = DogTraits(age=3, weight=45, sex=1, neutered=1, sociability=8, temperament=7)
+    dog_b_traits = DogTraits(age=2, weight=40, sex=0, neutered=1, sociability=9, temperament=8)
+    dog_a_reviews = ["This dog is amazing! So friendly and well-behaved."]
+    dog_b_reviews = ["Wonderful dog! Perfect temperament and very smart."]
+    
+    for _ in range(3):
+        result = calculate_compatibility_pipeline_cached(
+            cache, "dog_a", "dog_b", dog_a_traits, dog_b_traits,
+            dog_a_reviews, dog_b_reviews, 45, 38
+        )
+    
+    cache.invalidate_reviews("dog_b")
+    result = calculate_compatibility_pipeline_cached(
+        cache, "dog_a", "dog_b", dog_a_traits, dog_b_traits,
+        dog_a_reviews, dog_b_reviews, 45, 38
+    )
+    
+    print(f"Overall Compatibility: {result['overall_compatibility']:.3f}")
+    print(f"Cache stats: {cache.get_stats()}")
@@ -0,0 +1,267 @@
+"""
+Quantized Embedding Store
+
+Compact storage of dog trait vectors for similarity scans. Trait vectors are
+stored as int8 with a per-dimension scale (8x smaller than float64) or as
+float16 (4x smaller), and the similarity kernel works on the compact form
+directly: the per-dimension scales are folded into the squared trait weights,
+and codes are widened one block at a time, so no dequantized copy of the
+corpus is ever materialized. Weighted corpus norms are cached per weight
+vector.
+
+Quantization error is small but non-zero, and error_bounds() gives a
+guaranteed per-dog bound on it. search() re-scores against the exact float64
+vectors every dog whose upper bound reaches the k-th best lower bound, so the
+final top-k ranking and scores match an exact scan, and find_compatible()
+re-scores every dog whose bound straddles the compatibility threshold, so its
+decisions match an exact scan too.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from cosine_similarity import DogCompatibilityCalculator, TraitWeights
+
+
+QUANTIZATION_MODES = ('int8', 'float16')
+
+# Unit roundoff of float16 and slack for float32 accumulation in the kernel
+FLOAT16_EPSILON = 2.0 ** -11
+KERNEL_SLACK = 1e-5
+
+
+class QuantizedEmbeddingStore:
+    """
+    Stores trait vectors in int8 or float16 form and scores queries against them.
+    """
+    
+    def __init__(self, mode: str = 'int8', calculator: Optional[DogCompatibilityCalculator] = None,
+                 keep_exact: bool = True, block_size: int = 65536):
+        """
+        Initialize an empty store.
+        
+        Args:
+            mode: 'int8' (per-dimension scale) or 'float16' (default: 'int8')
+            calculator: Compatibility calculator providing weights and threshold (default: new instance)
+            keep_exact: Keep float64 vectors for exact re-scoring (default: True)
+            block_size: Rows widened to float32 at a time while scanning (default: 65536)
+        """
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.mode = mode
+        self.calculator = calculator or DogCompatibilityCalculator()
+        self.keep_exact = keep_exact
+        
+        self.dog_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.exact_vectors: Optional[np.ndarray] = None
+        self.block_size = block_size
+        self._norm_cache: Optional[Tuple[bytes, np.ndarray]] = None
+    
+    def __len__(self) -> int:
+        return len(self.dog_ids)
+    
+    def build(self, dog_ids: Sequence[str], trait_vectors: np.ndarray) -> None:
+        """
+        Quantize and store a corpus of trait vectors, replacing any previous contents.
+        
+        Args:
+            dog_ids: Dog identifiers, one per row of trait_vectors
+            trait_vectors: Unweighted trait vectors of shape (n_dogs, dim)
+        """
+        trait_vectors = np.asarray(trait_vectors, dtype=np.float64)
+        if len(dog_ids) != len(trait_vectors):
+            raise ValueError("dog_ids and trait_vectors must have the same length")
+        
+        self.dog_ids = list(dog_ids)
+        self._rows = {}
+        for row, dog_id in enumerate(self.dog_ids):
+            self._rows.setdefault(dog_id, row)
+        if self.mode == 'int8':
+            # Symmetric per-dimension scale mapping the largest magnitude to 127
+            max_abs = np.max(np.abs(trait_vectors), axis=0) if len(trait_vectors) else np.zeros(trait_vectors.shape[1])
+            self.scales = np.where(max_abs > 0, max_abs / 127.0, 1.0)
+            self.codes = np.clip(np.rint(trait_vectors / self.scales), -127, 127).astype(np.int8)
+        else:
+            self.scales = np.ones(trait_vectors.shape[1])
+            self.codes = trait_vectors.astype(np.float16)
+        self.exact_vectors = trait_vectors.copy() if self.keep_exact else None
+        self._norm_cache = None
+    
+    def memory_bytes(self) -> int:
+        """
+        Get the size of the compact vectors.
+        
+        Returns:
+            Number of bytes used by the quantized codes
+        """
+        return 0 if self.codes is None else self.codes.nbytes
+    
+    def similarities(self, query_vector: np.ndarray, weights: TraitWeights = None) -> np.ndarray:
+        """
+        Score a query against every stored dog using the compact vectors.
+        
+        Args:
+            query_vector: Unweighted trait vector of the query dog
+            weights: Optional trait weights (defaults to the embedder's trait_weights)
+            
+        Returns:
+            Approximate similarity per stored dog, values in [-1, 1]
+        """
+        # Fold the dequantization scales into the weights: w^2 * s per stored dimension
+        squared_weights = self.calculator.get_weight_vector(weights) ** 2
+        query = np.asarray(query_vector, dtype=np.float64)
+        weighted_query = (query * squared_weights * self.scales).astype(np.float32)
+        query_norm = np.float32(np.sqrt(np.sum(query * query * squared_weights)))
+        corpus_norms = self._corpus_norms(squared_weights)
+        
+        # Widen one block of codes at a time instead of dequantizing the corpus
+        dot_products = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), self.block_size):
+            block = self.codes[start:start + self.block_size].astype(np.float32)
+            dot_products[start:start + len(block)] = block @ weighted_query
+        
+        denominators = corpus_norms * query_norm
+        scores = np.divide(dot_products, denominators,
+                           out=np.zeros_like(dot_products), where=denominators > 0)
+        return np.clip(scores, -1.0, 1.0)
+    
+    def _corpus_norms(self, squared_weights: np.ndarray) -> np.ndarray:
+        """Weighted norms of the stored vectors, cached for the last weights used."""
+        key = squared_weights.tobytes()
+        if self._norm_cache is None or self._norm_cache[0] != key:
+            folded = (squared_weights * self.scales ** 2).astype(np.float32)
+            norms = np.empty(len(self.codes), dtype=np.float32)
+            for start in range(0, len(self.codes), self.block_size):
+                block = self.codes[start:start + self.block_size].astype(np.float32)
+                norms[start:start + len(block)] = np.sqrt((block * block) @ folded)
+            self._norm_cache = (key, norms)
+        return self._norm_cache[1]
+    
+    def error_bounds(self, weights: TraitWeights = None) -> np.ndarray:
+        """
+        Bound the similarity error of each stored dog.
+        
+        If a stored vector x is quantized to x + e, the unit vectors of the two
+        differ by at most 2 * |e|_w / |x + e|_w, which bounds the change of the
+        cosine against any query.
+        
+        Args:
+            weights: Optional trait weights (defaults to the embedder's trait_weights)
+            
+        Returns:
+            Upper bound on |approximate - exact| similarity per stored dog
+        """
+        squared_weights = self.calculator.get_weight_vector(weights) ** 2
+        corpus_norms = self._corpus_norms(squared_weights).astype(np.float64)
+        if self.mode == 'int8':
+            # Rounding moves each component by at most half a quantization step
+            error_norms = np.full(len(corpus_norms), 0.5 * np.sqrt(np.sum(squared_weights * self.scales ** 2)))
+        else:
+            error_norms = FLOAT16_EPSILON * corpus_norms
+        
+        bounds = np.full(len(corpus_norms), 2.0)
+        np.divide(2.0 * error_norms, corpus_norms, out=bounds, where=corpus_norms > 0)
+        return np.minimum(bounds + KERNEL_SLACK, 2.0)
+    
+    def search(self, query_vector: np.ndarray, top_k: int = 10, weights: TraitWeights = None,
+               rescore: bool = True, exclude_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Find the most similar stored dogs.
+        
+        With re-scoring, every dog that could still be in the exact top-k given
+        its error bound (approximate score plus bound at least the k-th best
+        approximate score minus bound) is re-scored exactly, so the results
+        equal an exact scan. Without it, the approximate top-k is returned.
+        
+        Args:
+            query_vector: Unweighted trait vector of the query dog
+            top_k: Number of results (default: 10)
+            weights: Optional trait weights (defaults to the embedder's trait_weights)
+            rescore: Re-score candidates with the exact vectors (default: True)
+            exclude_id: Dog id left out of the results, e.g. the query dog itself
+            
+        Returns:
+            List of (dog_id, similarity) tuples, best first
+        """
+        scores = self.similarities(query_vector, weights).astype(np.float64)
+        excluded_row = self._rows.get(exclude_id)
+        if excluded_row is not None:
+            scores[excluded_row] = -np.inf
+        
+        n_results = min(len(scores), top_k)
+        if n_results <= 0:
+            return []
+        
+        rescore = rescore and self.exact_vectors is not None
+        if rescore:
+            bounds = self.error_bounds(weights)
+            lower = scores - bounds
+            kth_lower = np.partition(-lower, n_results - 1)[n_results - 1]
+            candidates = np.flatnonzero((scores + bounds >= -kth_lower) & (scores > -np.inf))
+        else:
+            candidates = np.argpartition(-scores, n_results - 1)[:n_results]
+            candidates = candidates[scores[candidates] > -np.inf]
+        
+        if rescore:
+            scores = np.full(len(scores), -np.inf)
+            scores[candidates] = self.calculator.calculate_similarity_matrix(
+                query_vector, self.exact_vectors[candidates], weights
+            )[0]
+        
+        ranked = sorted(candidates, key=lambda index: (-scores[index], index))[:top_k]
+        return [(self.dog_ids[index], float(scores[index])) for index in ranked]
+    
+    def find_compatible(self, query_vector: np.ndarray, weights: TraitWeights = None,
+                        rescore_margin: Optional[Union[float, np.ndarray]] = None) -> List[Tuple[str, float]]:
+        """
+        Find all stored dogs at or above the calculator's compatibility threshold.
+        
+        Dogs whose approximate score lies within rescore_margin of the threshold
+        are re-scored exactly. With the default margins from error_bounds(),
+        quantization error cannot flip a decision.
+        
+        Args:
+            query_vector: Unweighted trait vector of the query dog
+            weights: Optional trait weights (defaults to the embedder's trait_weights)
+            rescore_margin: Width of the band re-scored exactly (default: each
+                dog's error bound; 0 disables re-scoring)
+                
+        Returns:
+            List of (dog_id, similarity) tuples, best first
+        """
+        threshold = self.calculator.compatibility_threshold
+        scores = self.similarities(query_vector, weights).astype(np.float64)
+        if rescore_margin is None:
+            rescore_margin = self.error_bounds(weights)
+        
+        if np.any(rescore_margin > 0) and self.exact_vectors is not None:
+            borderline = np.flatnonzero(np.abs(scores - threshold) <= rescore_margin)
+            if len(borderline):
+                scores[borderline] = self.calculator.calculate_similarity_matrix(
+                    query_vector, self.exact_vectors[borderline], weights
+                )[0]
+        
+        compatible = np.flatnonzero(scores >= threshold)
+        ranked = sorted(compatible, key=lambda index: (-scores[index], index))
+        return [(self.dog_ids[index], float(scores[index])) for index in ranked]
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    calculator = DogCompatibilityCalculator()
+    trait_vectors = rng.random((100000, len(calculator.embedder.trait_names)))
+    dog_ids = [f"dog{i}" for i in range(len(trait_vectors))]
+    
+    for mode in QUANTIZATION_MODES:
+        store = QuantizedEmbeddingStore(mode, calculator)
+        store.build(dog_ids, trait_vectors)
+        approximate = store.similarities(trait_vectors[0])
+        exact = calculator.calculate_similarity_matrix(trait_vectors[0], trait_vectors)[0]
+        
+        print(f"{mode}: {store.memory_bytes() / 1e6:.1f} MB "
+              f"(float64: {trait_vectors.nbytes / 1e6:.1f} MB), "
+              f"max score error {np.max(np.abs(approximate - exact)):.5f}")
+        print(f"  top 3: {store.search(trait_vectors[0], top_k=3, exclude_id='dog0')}")
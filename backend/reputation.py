@@ -0,0 +1,272 @@
+"""
+Reputation Module
+
+Exponentially time-decayed review aggregates per dog, used as the reputation
+inputs of the compatibility pipeline in place of a plain sentiment mean and a
+raw ratings sum.
+
+A review written at time t has weight 2^((t - epoch) / half_life) relative to
+a fixed epoch, so adding a review never rescales the ones already counted.
+Weighted terms are accumulated as exact fixed-point integers. Each update is
+O(1), removal is the exact inverse of adding, and the aggregates do not
+depend on the order reviews arrive in, so a batch rebuild from the full
+history gives identical values.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from compatibilitywithReviewsandRatings import build_compatibility_result
+from cosine_similarity import DogCompatibilityCalculator
+from data_access import DogRecord
+from instrumentation import registry
+from vector_embedding import DogTraits
+
+
+Timestamp = Union[datetime, str]
+
+DEFAULT_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_timestamp(value: Timestamp) -> datetime:
+    """
+    Convert a created_at value to an aware datetime.
+    
+    Args:
+        value: datetime or ISO 8601 string; naive values are taken as UTC
+        
+    Returns:
+        Timezone-aware datetime
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass
+class DecayedAggregate:
+    """Fixed-point sums of decay-weighted review terms for one dog."""
+    weight: int = 0
+    sentiment: int = 0
+    rating: int = 0
+    reviews: int = 0
+
+
+class ReputationTracker:
+    """
+    Maintains time-decayed sentiment and rating aggregates per dog.
+    """
+    
+    def __init__(self, half_life_days: float = 90.0, epoch: datetime = DEFAULT_EPOCH,
+                 fraction_bits: int = 64):
+        """
+        Initialize an empty tracker.
+        
+        Args:
+            half_life_days: Age at which a review counts half as much (default: 90)
+            epoch: Fixed reference time of the weights (default: 2020-01-01 UTC)
+            fraction_bits: Fixed-point precision of the sums (default: 64)
+        """
+        self.half_life_days = half_life_days
+        self.epoch = parse_timestamp(epoch)
+        self.fraction_bits = fraction_bits
+        self.aggregates: Dict[str, DecayedAggregate] = {}
+    
+    def _half_lives(self, timestamp: Timestamp) -> float:
+        """Half-lives elapsed between the epoch and a timestamp."""
+        seconds = (parse_timestamp(timestamp) - self.epoch).total_seconds()
+        return seconds / (self.half_life_days * 86400.0)
+    
+    def _fixed_point(self, value: float, half_lives: float) -> int:
+        """Exact-integer representation of value * 2^half_lives * 2^fraction_bits."""
+        whole = math.floor(half_lives)
+        numerator, denominator = (value * 2.0 ** (half_lives - whole)).as_integer_ratio()
+        shift = whole + self.fraction_bits
+        # The denominator is a power of two, so this is a pure (deterministic) shift
+        numerator <<= max(shift, 0)
+        return numerator // (denominator << max(-shift, 0))
+    
+    def _terms(self, created_at: Timestamp, sentiment: float,
+               rating: Optional[float]) -> Tuple[int, int, int]:
+        """Fixed-point weight, sentiment and rating terms of one review."""
+        half_lives = self._half_lives(created_at)
+        return (
+            self._fixed_point(1.0, half_lives),
+            self._fixed_point(float(sentiment), half_lives),
+            self._fixed_point(float(rating or 0), half_lives)
+        )
+    
+    def add_review(self, dog_id: str, created_at: Timestamp, sentiment: float,
+                   rating: Optional[float] = None) -> None:
+        """
+        Add one review to a dog's aggregates in O(1).
+        
+        Args:
+            dog_id: Dog the review is about
+            created_at: Time the review was written
+            sentiment: Sentiment score of the review text (-1 to +1)
+            rating: Star rating of the review, if any
+        """
+        weight, weighted_sentiment, weighted_rating = self._terms(created_at, sentiment, rating)
+        aggregate = self.aggregates.setdefault(dog_id, DecayedAggregate())
+        aggregate.weight += weight
+        aggregate.sentiment += weighted_sentiment
+        aggregate.rating += weighted_rating
+        aggregate.reviews += 1
+    
+    def remove_review(self, dog_id: str, created_at: Timestamp, sentiment: float,
+                      rating: Optional[float] = None) -> None:
+        """
+        Remove a previously added review, e.g. after it was deleted or edited.
+        
+        Args:
+            dog_id: Dog the review is about
+            created_at: created_at the review was added with
+            sentiment: Sentiment score the review was added with
+            rating: Rating the review was added with
+        """
+        weight, weighted_sentiment, weighted_rating = self._terms(created_at, sentiment, rating)
+        aggregate = self.aggregates[dog_id]
+        aggregate.weight -= weight
+        aggregate.sentiment -= weighted_sentiment
+        aggregate.rating -= weighted_rating
+        aggregate.reviews -= 1
+        if aggregate.reviews == 0:
+            del self.aggregates[dog_id]
+    
+    def _decayed(self, total: int, now: Optional[Timestamp]) -> float:
+        """Value of a fixed-point sum as seen at time now."""
+        half_lives = self._half_lives(now or datetime.now(timezone.utc))
+        whole = math.floor(half_lives)
+        # Big-integer true division is correctly rounded even for huge sums
+        shift = whole + self.fraction_bits
+        scaled = total / (1 << shift) if shift >= 0 else total * (1 << -shift)
+        return scaled * 2.0 ** (whole - half_lives)
+    
+    def sentiment(self, dog_id: str) -> float:
+        """
+        Get the decay-weighted mean review sentiment of a dog.
+        
+        Args:
+            dog_id: Dog identifier
+            
+        Returns:
+            Weighted mean sentiment, 0.0 for dogs without reviews
+        """
+        aggregate = self.aggregates.get(dog_id)
+        if aggregate is None or aggregate.weight == 0:
+            return 0.0
+        # The epoch scaling cancels, so the mean does not depend on the current time
+        return aggregate.sentiment / aggregate.weight
+    
+    def ratings_sum(self, dog_id: str, now: Optional[Timestamp] = None) -> float:
+        """
+        Get the decayed ratings sum of a dog: each rating times 2^(-age / half_life).
+        
+        Args:
+            dog_id: Dog identifier
+            now: Time the sum is evaluated at (default: current time)
+            
+        Returns:
+            Decayed ratings sum, 0.0 for dogs without reviews
+        """
+        aggregate = self.aggregates.get(dog_id)
+        return 0.0 if aggregate is None else self._decayed(aggregate.rating, now)
+    
+    def review_weight(self, dog_id: str, now: Optional[Timestamp] = None) -> float:
+        """
+        Get the decayed number of reviews of a dog.
+        
+        Args:
+            dog_id: Dog identifier
+            now: Time the count is evaluated at (default: current time)
+            
+        Returns:
+            Sum of the decay factors of all reviews
+        """
+        aggregate = self.aggregates.get(dog_id)
+        return 0.0 if aggregate is None else self._decayed(aggregate.weight, now)
+    
+    @classmethod
+    def rebuild(cls, reviews: Iterable[Tuple[str, Timestamp, float, Optional[float]]],
+                **kwargs) -> 'ReputationTracker':
+        """
+        Build a tracker from a full review history in one pass.
+        
+        Args:
+            reviews: (dog_id, created_at, sentiment, rating) tuples in any order
+            **kwargs: Tracker settings (half_life_days, epoch, fraction_bits)
+            
+        Returns:
+            Tracker with the same aggregates as adding the reviews one by one
+        """
+        tracker = cls(**kwargs)
+        for dog_id, created_at, sentiment, rating in reviews:
+            tracker.add_review(dog_id, created_at, sentiment, rating)
+        return tracker
+    
+    @classmethod
+    def from_dogs(cls, dogs: Dict[str, DogRecord], score_batch: Callable[[List[str]], List[float]],
+                  **kwargs) -> 'ReputationTracker':
+        """
+        Build a tracker from loaded dog records.
+        
+        Args:
+            dogs: Dictionary mapping dog_id to DogRecord, e.g. from DogDataSource.fetch_dogs
+            score_batch: Function scoring a list of texts, e.g. SentimentAnalyzer.analyze_batch
+            **kwargs: Tracker settings (half_life_days, epoch, fraction_bits)
+            
+        Returns:
+            Tracker over all reviews that have a created_at timestamp
+        """
+        reviews = [(dog_id, review) for dog_id, dog in dogs.items()
+                   for review in dog.reviews if review.created_at]
+        with registry.stage('reputation_rebuild', len(reviews)):
+            sentiments = score_batch([review.description or '' for _, review in reviews]) if reviews else []
+            return cls.rebuild(
+                ((dog_id, review.created_at, sentiment, review.rating)
+                 for (dog_id, review), sentiment in zip(reviews, sentiments)),
+                **kwargs
+            )
+
+
+def calculate_compatibility_with_reputation(tracker: ReputationTracker, dog_a_id: str, dog_b_id: str,
+                                            dog_a_traits: DogTraits, dog_b_traits: DogTraits,
+                                            k: float = 1.0, now: Optional[Timestamp] = None) -> Dict:
+    """
+    Calculate compatibility using time-decayed reputation instead of the full review history.
+    
+    Args:
+        tracker: Reputation tracker holding both dogs' reviews
+        dog_a_id: Identifier of dog A
+        dog_b_id: Identifier of dog B
+        dog_a_traits: DogTraits object for dog A
+        dog_b_traits: DogTraits object for dog B
+        k: Smoothing parameter
+        now: Time the decayed ratings are evaluated at (default: current time)
+        
+    Returns:
+        Dictionary with all scores and final compatibility, as calculate_compatibility_pipeline
+    """
+    cosine_result = DogCompatibilityCalculator().calculate_compatibility(dog_a_traits, dog_b_traits, dog_a_id, dog_b_id)
+    return build_compatibility_result(
+        cosine_result.cosine_similarity,
+        tracker.sentiment(dog_a_id), tracker.sentiment(dog_b_id),
+        tracker.ratings_sum(dog_a_id, now), tracker.ratings_sum(dog_b_id, now), k
+    )
+
+
+# Example usage
+if __name__ == "__main__":
+    tracker = ReputationTracker(half_life_days=30)
+    tracker.add_review('rex', '2025-01-01T12:00:00Z', sentiment=-0.6, rating=1)
+    tracker.add_review('rex', '2025-06-01T12:00:00Z', sentiment=0.8, rating=5)
+    tracker.add_review('rex', '2025-06-20T12:00:00Z', sentiment=0.7, rating=4)
+    
+    now = '2025-07-01T00:00:00Z'
+    print(f"Decayed sentiment: {tracker.sentiment('rex'):.3f} (plain mean {(-0.6 + 0.8 + 0.7) / 3:.3f})")
+    print(f"Decayed ratings sum: {tracker.ratings_sum('rex', now):.3f} (raw sum 10)")
+    print(f"Decayed review count: {tracker.review_weight('rex', now):.3f} (raw count 3)")
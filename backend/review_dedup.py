@@ -0,0 +1,217 @@
+"""
+Review Deduplication Module
+
+Detects copy-pasted and templated reviews with MinHash signatures over
+character shingles and locality-sensitive hashing (LSH), so that only one
+representative per cluster of near-identical reviews has to be scored.
+
+Reviews are normalized the same way TextEmbedder preprocesses text (lower
+case, letters only), so reviews differing only in punctuation or case are
+exact duplicates. Candidate pairs found by LSH are verified against the
+estimated Jaccard similarity before being merged with union-find.
+
+Reused scores are approximations: a duplicate that differs from its
+representative in punctuation or capitalization would have received slightly
+different exclamation and caps bonuses from SentimentAnalyzer.
+"""
+
+import re
+import numpy as np
+from typing import Callable, Dict, List, Sequence, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from instrumentation import registry
+
+
+# Multiply-shift hashing works modulo 2^64, which uint64 arithmetic wraps at
+_HASH_BASE = np.uint64(1099511628211)
+
+# Permutations hashed at a time; temporaries are (shingles in batch, block) uint64
+_PERMUTATION_BLOCK = 8
+
+
+class ReviewDeduplicator:
+    """Clusters near-identical reviews with MinHash and LSH."""
+    
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 5, batch_size: int = 2048, max_batch_shingles: int = 1 << 18,
+                 seed: int = 0):
+        """
+        Initialize the deduplicator.
+        
+        Args:
+            threshold: Minimum estimated Jaccard similarity of shingle sets to merge (default: 0.8)
+            num_perm: Number of MinHash permutations (default: 64)
+            bands: Number of LSH bands, must divide num_perm (default: 16)
+            shingle_size: Characters per shingle (default: 5)
+            batch_size: Maximum reviews hashed at a time (default: 2048)
+            max_batch_shingles: Maximum shingles hashed at a time, which bounds
+                the working memory at about 150 bytes per shingle (about 40 MB
+                at the default); a longer review is hashed in a batch of its own
+                (default: 2^18)
+            seed: Seed of the hash permutations (default: 0)
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.batch_size = batch_size
+        self.max_batch_shingles = max_batch_shingles
+        
+        rng = np.random.default_rng(seed)
+        # Odd multipliers make each multiply-shift permutation a bijection on uint64
+        self.multipliers = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.offsets = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.band_multipliers = rng.integers(0, 2 ** 63, num_perm // bands, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.shingle_powers = _HASH_BASE ** np.arange(shingle_size, dtype=np.uint64)
+    
+    def normalize(self, text: str) -> str:
+        """Lower-case a review and keep only letters, single-spaced."""
+        return ' '.join(re.sub(r'[^a-zA-Z\s]', '', text.lower()).split())
+    
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Compute MinHash signatures.
+        
+        Args:
+            texts: Review texts
+            
+        Returns:
+            Array of shape (len(texts), num_perm) with 32-bit minimum hashes
+        """
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        start = 0
+        batch: List[str] = []
+        batch_shingles = 0
+        for index, text in enumerate(texts):
+            # Short reviews are padded so that each one has at least one shingle
+            normalized = self.normalize(text).ljust(self.shingle_size)
+            shingles = len(normalized) - self.shingle_size + 1
+            if batch and (len(batch) == self.batch_size or batch_shingles + shingles > self.max_batch_shingles):
+                result[start:index] = self._batch_signatures(batch)
+                start, batch, batch_shingles = index, [], 0
+            batch.append(normalized)
+            batch_shingles += shingles
+        if batch:
+            result[start:] = self._batch_signatures(batch)
+        return result
+    
+    def _batch_signatures(self, normalized: List[str]) -> np.ndarray:
+        """Signatures of one batch of normalized reviews, a block of permutations at a time."""
+        characters = np.frombuffer(''.join(normalized).encode('ascii'), dtype=np.uint8)
+        lengths = np.fromiter((len(text) for text in normalized), dtype=np.int64, count=len(normalized))
+        text_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        
+        # Global start position of every shingle that lies within a single review
+        window_counts = lengths - self.shingle_size + 1
+        window_starts = np.concatenate(([0], np.cumsum(window_counts)[:-1]))
+        positions = np.arange(window_counts.sum()) - np.repeat(window_starts - text_starts, window_counts)
+        
+        windows = sliding_window_view(characters, self.shingle_size)[positions]
+        shingles = np.zeros(len(positions), dtype=np.uint64)
+        for offset in range(self.shingle_size):
+            shingles += windows[:, offset].astype(np.uint64) * self.shingle_powers[offset]
+        del windows, positions
+        
+        result = np.empty((len(normalized), self.num_perm), dtype=np.uint32)
+        for block in range(0, self.num_perm, _PERMUTATION_BLOCK):
+            permutations = slice(block, block + _PERMUTATION_BLOCK)
+            hashes = shingles[:, None] * self.multipliers[permutations]
+            hashes += self.offsets[permutations]
+            hashes >>= np.uint64(32)
+            result[:, permutations] = np.minimum.reduceat(hashes, window_starts, axis=0)
+        return result
+    
+    def cluster(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Cluster near-identical reviews.
+        
+        Args:
+            texts: Review texts
+            
+        Returns:
+            Array with, for every review, the index of its cluster's representative
+            (the first review of the cluster)
+        """
+        parents = list(range(len(texts)))
+        
+        def find(index: int) -> int:
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+        
+        if len(texts) > 1:
+            signatures = self.signatures(texts)
+            rows = self.num_perm // self.bands
+            for band in range(self.bands):
+                band_keys = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64) @ self.band_multipliers
+                _, first, bucket = np.unique(band_keys, return_index=True, return_inverse=True)
+                
+                # Verify each bucket member against the first review in its bucket
+                heads = first[bucket.ravel()]
+                members = np.flatnonzero(heads != np.arange(len(texts)))
+                agreement = np.mean(signatures[members] == signatures[heads[members]], axis=1)
+                members = members[agreement >= self.threshold]
+                for member, head in zip(members, heads[members]):
+                    root_member, root_head = find(int(member)), find(int(head))
+                    if root_member != root_head:
+                        # The smaller index stays root, so representatives are first occurrences
+                        parents[max(root_member, root_head)] = min(root_member, root_head)
+        
+        return np.array([find(index) for index in range(len(texts))], dtype=np.int64)
+
+
+def score_deduplicated(texts: Sequence[str], score_batch: Callable[[List[str]], List[float]],
+                       deduplicator: ReviewDeduplicator = None) -> Tuple[List[float], Dict[str, float]]:
+    """
+    Score reviews, running score_batch only on one representative per cluster.
+    
+    Args:
+        texts: Review texts
+        score_batch: Function scoring a list of texts, e.g. SentimentAnalyzer.analyze_batch
+        deduplicator: Deduplicator to use (default: new instance)
+        
+    Returns:
+        Tuple of (score per review, statistics on the scoring work saved)
+    """
+    deduplicator = deduplicator or ReviewDeduplicator()
+    with registry.stage('review_dedup', len(texts)):
+        representatives = deduplicator.cluster(texts)
+    
+    unique = np.unique(representatives)
+    unique_scores = dict(zip(unique.tolist(), score_batch([texts[index] for index in unique])))
+    scores = [unique_scores[index] for index in representatives.tolist()]
+    
+    stats = {
+        'reviews': len(texts),
+        'scored': len(unique),
+        'reused': len(texts) - len(unique),
+        'work_saved': (len(texts) - len(unique)) / len(texts) if texts else 0.0
+    }
+    return scores, stats
+
+
+# Example usage
+if __name__ == "__main__":
+    from sentiment_analysis import SentimentAnalyzer
+    
+    reviews = [
+        "Great dog! Highly recommend!",
+        "Great dog!! Highly recommend.",
+        "great dog, highly recommend",
+        "Great dogs! Highly recommend!",
+        "Terrible experience. The dog was aggressive and untrained.",
+        "Terrible experience, the dog was aggressive and untrained!",
+        "Okay dog, nothing special."
+    ]
+    
+    analyzer = SentimentAnalyzer()
+    analyzer.build_vocabulary(reviews)
+    scores, stats = score_deduplicated(reviews, analyzer.analyze_batch)
+    
+    for review, score in zip(reviews, scores):
+        print(f"{score:+.3f}  {review}")
+    print(f"Scored {stats['scored']} of {stats['reviews']} reviews "
+          f"({stats['work_saved']:.0%} of the scoring work saved)")
@@ -7,6 +7,8 @@ Returns sentiment score from -1 (negative) to +1 (positive).
 
 import numpy as np
 from text_embedding import TextEmbedder
+from fast_sentiment import FastSentimentAnalyzer
+from instrumentation import registry
 
 
 class SentimentAnalyzer:
@@ -14,6 +16,7 @@ class SentimentAnalyzer:
     
     def __init__(self):
         self.embedder = TextEmbedder()
+        self.fast_analyzer = None
     
     def build_vocabulary(self, texts):
         """Build vocabulary from training texts."""
@@ -56,6 +59,26 @@ class SentimentAnalyzer:
         
         # Clamp to [-1, 1]
         return np.clip(sentiment_score, -1.0, 1.0)
+    
+    def analyze_batch(self, texts, fast=False):
+        """
+        Analyze sentiment of many texts in one call.
+        
+        Args:
+            texts: List of review texts
+            fast: Use the lexicon-only FastSentimentAnalyzer approximation,
+                which needs no vocabulary (default: False)
+                
+        Returns:
+            List of sentiment scores, one per text
+        """
+        if fast:
+            if self.fast_analyzer is None:
+                self.fast_analyzer = FastSentimentAnalyzer()
+            return self.fast_analyzer.analyze_batch(texts)
+        
+        with registry.stage('sentiment_batch', len(texts)):
+            return [float(self.analyze_sentiment(text)) for text in texts]
 
 
 # Example usage
@@ -0,0 +1,126 @@
+"""
+Sentiment Fast Path Benchmark
+
+Compares FastSentimentAnalyzer against the blended TextBlob + VADER score of
+SentimentAnalyzer on a labelled review corpus: agreement between the two
+scores, accuracy of each against the labels, and throughput of both.
+"""
+
+import argparse
+import csv
+import os
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from fast_sentiment import FastSentimentAnalyzer
+from sentiment_analysis import SentimentAnalyzer
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive', 'labelled_reviews.csv')
+
+# Scores within this distance of zero count as neutral
+NEUTRAL_BAND = 0.1
+
+
+def load_corpus(path: str = DEFAULT_CORPUS) -> Tuple[List[str], List[str]]:
+    """
+    Load a labelled review corpus.
+    
+    Args:
+        path: CSV file with Review and Label columns
+        
+    Returns:
+        Tuple of (review texts, labels)
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        rows = list(csv.DictReader(handle))
+    return [row['Review'] for row in rows], [row['Label'] for row in rows]
+
+
+def score_label(score: float) -> str:
+    """Map a sentiment score to positive, negative or neutral."""
+    if score > NEUTRAL_BAND:
+        return 'positive'
+    if score < -NEUTRAL_BAND:
+        return 'negative'
+    return 'neutral'
+
+
+def agreement_report(texts: List[str], labels: List[str]) -> Dict[str, float]:
+    """
+    Compare the fast and blended scores on a labelled corpus.
+    
+    Args:
+        texts: Review texts
+        labels: positive, negative or neutral per review
+        
+    Returns:
+        Dictionary of agreement and accuracy metrics
+    """
+    analyzer = SentimentAnalyzer()
+    analyzer.build_vocabulary(texts)
+    blended = np.array(analyzer.analyze_batch(texts))
+    fast = np.array(FastSentimentAnalyzer().analyze_batch(texts))
+    
+    blended_labels = [score_label(score) for score in blended]
+    fast_labels = [score_label(score) for score in fast]
+    return {
+        'reviews': len(texts),
+        'pearson': float(np.corrcoef(blended, fast)[0, 1]),
+        'mean_abs_diff': float(np.mean(np.abs(blended - fast))),
+        'label_agreement': float(np.mean([a == b for a, b in zip(blended_labels, fast_labels)])),
+        'blended_accuracy': float(np.mean([a == b for a, b in zip(blended_labels, labels)])),
+        'fast_accuracy': float(np.mean([a == b for a, b in zip(fast_labels, labels)]))
+    }
+
+
+def throughput(texts: List[str]) -> Dict[str, float]:
+    """
+    Measure reviews per second for both analyzers.
+    
+    Args:
+        texts: Review texts to score
+        
+    Returns:
+        Dictionary with both throughputs and the speedup
+    """
+    analyzer = SentimentAnalyzer()
+    analyzer.build_vocabulary(texts)
+    fast_analyzer = FastSentimentAnalyzer()
+    
+    start = time.perf_counter()
+    analyzer.analyze_batch(texts)
+    blended_rate = len(texts) / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    fast_analyzer.analyze_batch(texts)
+    fast_rate = len(texts) / (time.perf_counter() - start)
+    
+    return {'blended_per_sec': blended_rate, 'fast_per_sec': fast_rate, 'speedup': fast_rate / blended_rate}
+
+
+def main() -> None:
+    """Print the agreement report and throughput comparison."""
+    parser = argparse.ArgumentParser(description="Compare the fast sentiment path with the blended analyzer")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="CSV with Review and Label columns")
+    parser.add_argument('--repeat', type=int, default=50, help="Copies of the corpus scored for throughput")
+    args = parser.parse_args()
+    
+    texts, labels = load_corpus(args.corpus)
+    report = agreement_report(texts, labels)
+    print(f"Reviews:            {report['reviews']}")
+    print(f"Pearson r:          {report['pearson']:.3f}")
+    print(f"Mean |difference|:  {report['mean_abs_diff']:.3f}")
+    print(f"Label agreement:    {report['label_agreement']:.1%}")
+    print(f"Blended accuracy:   {report['blended_accuracy']:.1%}")
+    print(f"Fast accuracy:      {report['fast_accuracy']:.1%}")
+    
+    rates = throughput(texts * args.repeat)
+    print(f"Blended:            {rates['blended_per_sec']:.0f} reviews/s")
+    print(f"Fast:               {rates['fast_per_sec']:.0f} reviews/s")
+    print(f"Speedup:            {rates['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
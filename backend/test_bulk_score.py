@@ -0,0 +1,84 @@
+"""
+Tests for the streaming bulk-scoring CLI against the single-pair pipeline.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from bulk_score import join_dogs, run
+from compatibilitywithReviewsandRatings import calculate_compatibility_pipeline
+from vector_embedding import DogTraits
+
+
+DOGS = [
+    {'id': 1, 'age': 3, 'weight': 45, 'sex': 1, 'neutered': 1, 'sociability': 8, 'temperament': 7},
+    {'id': 2, 'age': 2, 'weight': 40, 'sex': 0, 'neutered': 1, 'sociability': 9, 'temperament': 8},
+    {'id': 10, 'age': 9, 'weight': 90, 'sex': 1, 'neutered': 0, 'sociability': 2, 'temperament': 3},
+    {'id': 11, 'age': 5, 'weight': 20, 'sex': 0, 'neutered': 0, 'sociability': 5, 'temperament': 6}
+]
+REVIEWS = [
+    {'id': 1, 'dog_id': 1, 'rating': 5, 'description': "Great dog! Highly recommend!"},
+    {'id': 2, 'dog_id': 1, 'rating': 4, 'description': "Very gentle with puppies."},
+    {'id': 3, 'dog_id': 2, 'rating': 2, 'description': "Terrible experience. The dog was aggressive."},
+    {'id': 4, 'dog_id': 7, 'rating': 3, 'description': "Review of a dog missing from the export."},
+    {'id': 5, 'dog_id': 11, 'rating': 3, 'description': "Okay dog, nothing special."}
+]
+
+
+def write_exports(tmp_path):
+    """Write the dogs as JSONL and the reviews as CSV."""
+    dogs_path = tmp_path / 'dogs.jsonl'
+    dogs_path.write_text(''.join(json.dumps(dog) + '\n' for dog in DOGS))
+    reviews_path = tmp_path / 'reviews.csv'
+    with open(reviews_path, 'w', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=['id', 'dog_id', 'rating', 'description'])
+        writer.writeheader()
+        writer.writerows(REVIEWS)
+    return str(dogs_path), str(reviews_path)
+
+
+def test_results_match_single_pair_pipeline(tmp_path):
+    """Every streamed row equals calculate_compatibility_pipeline for its pair."""
+    dogs_path, reviews_path = write_exports(tmp_path)
+    output = io.StringIO()
+    summary = run(dogs_path, reviews_path, ['2', '11'], output, chunk_size=3)
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    
+    assert summary['dogs'] == 4 and summary['rows'] == len(rows) == 6
+    traits = {str(dog['id']): DogTraits(**{name: value for name, value in dog.items() if name != 'id'})
+              for dog in DOGS}
+    reviews = {dog_id: [r['description'] for r in REVIEWS if str(r['dog_id']) == dog_id] for dog_id in traits}
+    ratings = {dog_id: sum(r['rating'] for r in REVIEWS if str(r['dog_id']) == dog_id) for dog_id in traits}
+    
+    for row in rows:
+        dog_id, target_id = row['dog_id'], row['target_id']
+        expected = calculate_compatibility_pipeline(
+            traits[dog_id], traits[target_id], reviews[dog_id], reviews[target_id],
+            ratings[dog_id], ratings[target_id]
+        )
+        assert row['cosine_similarity'] == pytest.approx(expected['cosine_similarity'])
+        assert row['sentiment_score'] == pytest.approx(expected['sentiment_score_a'])
+        assert row['overall_compatibility'] == pytest.approx(expected['overall_compatibility'])
+        assert row['is_compatible'] == bool(expected['is_compatible'])
+
+
+def test_worker_processes_write_the_same_output(tmp_path):
+    """Scoring on worker processes keeps input order and results."""
+    dogs_path, reviews_path = write_exports(tmp_path)
+    inline, pooled = io.StringIO(), io.StringIO()
+    run(dogs_path, reviews_path, ['1'], inline, output_format='csv', chunk_size=1)
+    run(dogs_path, reviews_path, ['1'], pooled, output_format='csv', chunk_size=1, workers=2)
+    
+    assert pooled.getvalue() == inline.getvalue()
+    assert inline.getvalue().splitlines()[0].startswith('dog_id,target_id')
+
+
+def test_unsorted_exports_are_rejected():
+    """The merge-join refuses exports that are not sorted by dog id."""
+    with pytest.raises(ValueError):
+        list(join_dogs([{'id': 2}, {'id': 1}]))
+    with pytest.raises(ValueError):
+        list(join_dogs([{'id': 1}, {'id': 3}], [{'dog_id': 3}, {'dog_id': 1}]))
@@ -2,10 +2,13 @@
 Test script for the dog compatibility system with fake data.
 """
 
+import numpy as np
+
 from vector_embedding import DogTraits, DogVectorEmbedder
 from cosine_similarity import DogCompatibilityCalculator
 from sentiment_analysis import SentimentAnalyzer
 from compatibilitywithReviewsandRatings import calculate_pairwise_compatibility_with_reviews, calculate_compatibility_pipeline
+from compatibilitywithReviewsandRatings import find_mutual_matches
 
 
 def create_fake_data():
@@ -122,6 +125,48 @@ def test_individual_components():
     print()
 
 
+def test_query_time_trait_weights():
+    """Test that query-time weights match re-embedding with baked-in weights."""
+    print("=== Testing Query-Time Trait Weights ===\n")
+    
+    data = create_fake_data()
+    traits = [dog_data['traits'] for dog_data in data['dogs'].values()]
+    
+    calculator = DogCompatibilityCalculator()
+    embedder = calculator.embedder
+    trait_vectors = np.array([embedder.create_trait_vector(t) for t in traits])
+    
+    # Default weights reproduce the cosine of the baked-in embeddings
+    embeddings = np.array([embedder.create_embedding(t) for t in traits])
+    similarities = calculator.calculate_similarity_matrix(trait_vectors, trait_vectors)
+    assert np.allclose(similarities, np.clip(embeddings @ embeddings.T, -1.0, 1.0))
+    
+    # Per-query weights reproduce a re-embedding with updated weights,
+    # without touching the stored trait vectors
+    new_weights = {'age': 0.2, 'sociability': 2.0}
+    reweighted = DogVectorEmbedder()
+    reweighted.update_trait_weights(new_weights)
+    embeddings = np.array([reweighted.create_embedding(t) for t in traits])
+    similarities = calculator.calculate_similarity_matrix(trait_vectors, trait_vectors, new_weights)
+    assert np.allclose(similarities, np.clip(embeddings @ embeddings.T, -1.0, 1.0))
+    
+    # One weight vector per query row
+    per_query = np.array([embedder.get_weight_vector(), reweighted.get_weight_vector()])
+    rows = calculator.calculate_similarity_matrix(trait_vectors[:2], trait_vectors, per_query)
+    assert np.allclose(rows[0], calculator.calculate_similarity_matrix(trait_vectors[0], trait_vectors)[0])
+    assert np.allclose(rows[1], similarities[1])
+    
+    # Trait dictionaries forward the weights too
+    dicts = [vars(t) for t in traits[:2]]
+    from_dicts = calculator.calculate_compatibility_from_dicts(dicts[0], dicts[1], weights=new_weights)
+    assert np.isclose(from_dicts.cosine_similarity, similarities[0, 1])
+    assert from_dicts == calculator.calculate_compatibility(traits[0], traits[1], weights=new_weights)
+    assert not np.isclose(calculator.calculate_compatibility_from_dicts(*dicts).cosine_similarity,
+                          similarities[0, 1])
+    print(f"   Reweighted A vs B similarity: {similarities[0, 1]:.4f}")
+    print()
+
+
 def test_compatibility_formula():
     """Test the compatibility formula with fake data."""
     print("=== Testing Compatibility Formula ===\n")
@@ -223,13 +268,47 @@ def test_complete_pipeline():
     print()
 
 
+def test_mutual_matches():
+    """Test that bulk mutual matching agrees with the formula in both directions."""
+    print("=== Testing Mutual Matches ===\n")
+    
+    data = create_fake_data()
+    calculator = DogCompatibilityCalculator()
+    sentiments = {'A': 0.8, 'B': 0.6, 'C': -0.4}
+    dogs = [(name, dog_data['traits']) for name, dog_data in data['dogs'].items()]
+    
+    for name, traits in dogs:
+        candidates = [(other, other_traits) for other, other_traits in dogs if other != name]
+        matches = find_mutual_matches(traits, sentiments[name], candidates,
+                                      [sentiments[other] for other, _ in candidates], threshold=0.3)
+        
+        for other, other_traits in candidates:
+            cosine = calculator.calculate_compatibility(traits, other_traits).cosine_similarity
+            forward = calculate_pairwise_compatibility_with_reviews(cosine, sentiments[name], sentiments[other], 0, 0)
+            backward = calculate_pairwise_compatibility_with_reviews(cosine, sentiments[other], sentiments[name], 0, 0)
+            match = next((m for m in matches if m['dog_id'] == other), None)
+            
+            # Only pairs compatible in both directions are returned
+            assert (match is not None) == (min(forward, backward) >= 0.3)
+            if match is not None:
+                assert np.isclose(match['compatibility_to_candidate'], forward)
+                assert np.isclose(match['compatibility_from_candidate'], backward)
+        
+        scores = [match['mutual_compatibility'] for match in matches]
+        assert scores == sorted(scores, reverse=True)
+        print(f"   Dog {name} mutual matches: {[match['dog_id'] for match in matches]}")
+    print()
+
+
 if __name__ == "__main__":
     print("🐕 Dog Compatibility System Test 🐕\n")
     
     try:
         test_individual_components()
+        test_query_time_trait_weights()
         test_compatibility_formula()
         test_complete_pipeline()
+        test_mutual_matches()
         
         print("✅ All tests completed successfully!")
         
@@ -0,0 +1,187 @@
+"""
+Tests for the batched data-access layer on the offline SQLite backend.
+"""
+
+import random
+import sqlite3
+import threading
+
+import pytest
+
+import data_access
+from compatibilitywithReviewsandRatings import calculate_compatibility_for_pairs, calculate_compatibility_pipeline
+from data_access import (CachedDataSource, ConnectionPool, DogDataSource, DogRecord, SQLiteDataSource,
+                         SQLITE_MAX_IDS_PER_QUERY, _split_sql_statements)
+from vector_embedding import DogTraits
+
+
+REVIEW_TEXTS = [
+    "Great dog! Highly recommend!",
+    "Barks a lot at night.",
+    "Very gentle with puppies and kids.",
+    "Aggressive at times, needs more training.",
+    "Okay dog, nothing special."
+]
+
+
+@pytest.fixture
+def source():
+    """In-memory database built from frontend/supabase/migrations."""
+    data_source = SQLiteDataSource()
+    yield data_source
+    data_source.close()
+
+
+def add_random_dogs(data_source, count, seed=0):
+    """Insert dogs with zero to three reviews each and return their ids."""
+    rng = random.Random(seed)
+    dog_ids = [f"test-dog-{index:05d}" for index in range(count)]
+    with data_source.pool.connection() as conn:
+        for dog_id in dog_ids:
+            conn.execute(
+                "INSERT INTO dogs (id, name, age, weight, sex, neutered, sociability, temperament) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (dog_id, dog_id, rng.randint(0, 15), rng.randint(5, 120), rng.randint(0, 1),
+                 rng.randint(0, 1), rng.randint(0, 5), rng.randint(0, 5))
+            )
+            for review in range(rng.randint(0, 3)):
+                conn.execute(
+                    "INSERT INTO reviews (id, rating, dog_id, description, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (f"{dog_id}-r{review}", rng.randint(1, 5), dog_id, rng.choice(REVIEW_TEXTS),
+                     f"2025-0{review + 1}-01 12:00:00")
+                )
+        conn.commit()
+    return dog_ids
+
+
+def test_schema_is_replayed_from_migrations(source):
+    """Tables, later added columns and seed rows from the migrations exist in SQLite."""
+    with source.pool.connection() as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        dog_columns = {row[1] for row in conn.execute("PRAGMA table_info(dogs)")}
+        seeded = conn.execute("SELECT COUNT(*) FROM dogs").fetchone()[0]
+    
+    assert {'dogs', 'reviews', 'owners'} <= tables
+    assert {'about', 'sociability', 'temperament', 'city', 'lat', 'lng'} <= dog_columns
+    assert seeded > 0
+
+
+def test_sql_splitting_keeps_dollar_quoted_bodies():
+    """Semicolons inside $$ function bodies and comments do not end a statement."""
+    script = (
+        "create table a (id int); -- trailing; comment\n"
+        "create function f() returns trigger as $$\n"
+        "begin\n  new.x := 1;\n  return new;\nend;\n$$ language plpgsql;\n"
+        "insert into a values (1)"
+    )
+    statements = _split_sql_statements(script)
+    
+    assert len(statements) == 3
+    assert statements[0] == "create table a (id int)"
+    assert statements[1].startswith("create function f()") and "return new;" in statements[1]
+    assert statements[2] == "insert into a values (1)"
+
+
+def test_batched_fetch_matches_per_id_queries(source):
+    """One fetch over more ids than fit in a query equals fetching every dog on its own."""
+    dog_ids = add_random_dogs(source, 2 * SQLITE_MAX_IDS_PER_QUERY + 50)
+    requested = dog_ids + dog_ids[:10] + ['no-such-dog']
+    
+    statements = []
+    with source.pool.connection() as conn:
+        conn.set_trace_callback(statements.append)
+    batched = source.fetch_dogs(requested)
+    with source.pool.connection() as conn:
+        conn.set_trace_callback(None)
+    
+    assert sum('LEFT JOIN reviews' in statement for statement in statements) == 3
+    assert list(batched) == sorted(dog_ids)
+    for dog_id in dog_ids[::7]:
+        assert batched[dog_id] == source.fetch_dog(dog_id)
+    assert source.fetch_dog('no-such-dog') is None
+    assert sum(len(record.reviews) for record in batched.values()) > len(dog_ids)
+
+
+def test_connection_pool_reuses_and_bounds_connections():
+    """Borrowers beyond max_size wait, and idle connections are reused."""
+    opened = []
+    
+    def connect():
+        opened.append(sqlite3.connect(':memory:', check_same_thread=False))
+        return opened[-1]
+    
+    pool = ConnectionPool(connect, max_size=2)
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first is not second
+            acquired = threading.Event()
+            
+            def borrow():
+                with pool.connection():
+                    acquired.set()
+            
+            thread = threading.Thread(target=borrow)
+            thread.start()
+            assert not acquired.wait(0.1)
+        assert acquired.wait(1.0)
+        thread.join()
+    
+    for _ in range(5):
+        with pool.connection():
+            pass
+    assert len(opened) == 2
+    
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+
+
+class RecordingSource(DogDataSource):
+    """Source returning synthetic dogs and recording every requested id list."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def fetch_dogs(self, dog_ids):
+        self.calls.append(list(dog_ids))
+        return {dog_id: DogRecord(dog_id, DogTraits(1, 20, 0, 0, 5, 5)) for dog_id in dog_ids if dog_id != 'ghost'}
+
+
+def test_cache_fetches_only_missing_ids(monkeypatch):
+    """Cached dogs are served from memory; expired, evicted and invalidated ones are refetched."""
+    clock = [1000.0]
+    monkeypatch.setattr(data_access.time, 'monotonic', lambda: clock[0])
+    wrapped = RecordingSource()
+    cache = CachedDataSource(wrapped, max_size=3, ttl=60)
+    
+    first = cache.fetch_dogs(['a', 'b'])
+    assert cache.fetch_dogs(['b', 'a', 'c', 'b', 'ghost']).keys() == {'a', 'b', 'c'}
+    assert cache.fetch_dogs(['a'])['a'] is first['a']
+    assert wrapped.calls == [['a', 'b'], ['c', 'ghost']]
+    
+    cache.fetch_dogs(['d'])
+    cache.fetch_dogs(['b', 'a'])
+    assert wrapped.calls[-2:] == [['d'], ['b']]
+    
+    cache.invalidate('a')
+    clock[0] += 61
+    cache.fetch_dogs(['a', 'd'])
+    assert wrapped.calls[-1] == ['a', 'd']
+    assert (cache.hits, cache.misses) == (4, 8)
+
+
+def test_pair_results_equal_pipeline(source):
+    """Batched pair scoring equals running the pipeline on each pair's fetched data."""
+    dog_ids = add_random_dogs(source, 12, seed=3)
+    pairs = [(dog_ids[0], dog_ids[1]), (dog_ids[1], dog_ids[0]), (dog_ids[2], dog_ids[5]), (dog_ids[7], dog_ids[11])]
+    
+    results = calculate_compatibility_for_pairs(source, pairs, k=2.0)
+    assert list(results) == pairs
+    for dog_a_id, dog_b_id in pairs:
+        dog_a, dog_b = source.fetch_dog(dog_a_id), source.fetch_dog(dog_b_id)
+        expected = calculate_compatibility_pipeline(dog_a.traits, dog_b.traits, dog_a.review_texts, dog_b.review_texts,
+                                                    dog_a.ratings_sum, dog_b.ratings_sum, 2.0)
+        assert results[(dog_a_id, dog_b_id)] == pytest.approx(expected, rel=1e-12)
+    
+    with pytest.raises(ValueError, match="Unknown dog ids"):
+        calculate_compatibility_for_pairs(source, [(dog_ids[0], 'no-such-dog')])
@@ -0,0 +1,43 @@
+"""
+Tests for the vectorized lexicon-only sentiment fast path.
+"""
+
+import numpy as np
+
+from fast_sentiment import FastSentimentAnalyzer
+from sentiment_analysis import SentimentAnalyzer
+from sentiment_benchmark import agreement_report, load_corpus
+
+
+def test_batch_scores_match_single_scores():
+    """Scores do not depend on batch neighbours, including empty reviews."""
+    analyzer = FastSentimentAnalyzer()
+    texts = ["", "Great dog!", "", "Not a good dog.", "!!!", "Terrible, very aggressive.", ""]
+    
+    batch = analyzer.analyze_batch(texts)
+    assert batch == [analyzer.analyze_sentiment(text) for text in texts]
+    assert batch[0] == batch[2] == batch[6] == 0.0
+    assert analyzer.analyze_batch([]) == []
+
+
+def test_negation_and_intensifiers():
+    """Negation flips polarity and intensifiers strengthen it."""
+    analyzer = FastSentimentAnalyzer()
+    good, not_good, very_good = analyzer.analyze_batch(["good dog", "not a good dog", "very good dog"])
+    
+    assert good > 0
+    assert not_good < 0
+    assert very_good > good
+
+
+def test_agreement_with_blended_score():
+    """The fast path tracks SentimentAnalyzer on the labelled corpus."""
+    texts, labels = load_corpus()
+    report = agreement_report(texts, labels)
+    
+    assert report['pearson'] > 0.95
+    assert report['label_agreement'] > 0.9
+    
+    analyzer = SentimentAnalyzer()
+    assert analyzer.analyze_batch(texts[:5], fast=True) == FastSentimentAnalyzer().analyze_batch(texts[:5])
+    assert np.all(np.abs(analyzer.analyze_batch(texts, fast=True)) <= 1.0)
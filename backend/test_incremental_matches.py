@@ -0,0 +1,62 @@
+"""
+Tests for incremental match-list maintenance against full recomputation.
+"""
+
+import random
+
+from incremental_matches import IncrementalMatchIndex
+from vector_embedding import DogTraits
+
+
+def random_traits(rng):
+    """Create random dog traits from small ranges so that ties are common."""
+    return DogTraits(
+        age=rng.randint(0, 4),
+        weight=rng.choice([20, 45, 70]),
+        sex=rng.randint(0, 1),
+        neutered=rng.randint(0, 1),
+        sociability=rng.randint(1, 3),
+        temperament=rng.randint(1, 3)
+    )
+
+
+def test_incremental_updates_match_full_recompute():
+    """Randomized insert/update/delete sequences must equal a full recompute."""
+    for seed in range(5):
+        rng = random.Random(seed)
+        top_k = rng.randint(1, 6)
+        index = IncrementalMatchIndex(top_k=top_k, initial_capacity=4)
+        traits = {}
+        
+        for step in range(300):
+            action = rng.random()
+            if traits and action < 0.25:
+                dog_id = rng.choice(sorted(traits))
+                del traits[dog_id]
+                index.remove_dog(dog_id)
+            elif traits and action < 0.55:
+                dog_id = rng.choice(sorted(traits))
+                traits[dog_id] = random_traits(rng)
+                index.upsert_dog(dog_id, traits[dog_id])
+            else:
+                dog_id = f"dog{step}"
+                traits[dog_id] = random_traits(rng)
+                index.upsert_dog(dog_id, traits[dog_id])
+            
+            if step % 10 == 0:
+                assert index.match_lists == index.compute_full_match_lists()
+        
+        assert index.match_lists == index.compute_full_match_lists()
+        
+        # A fresh index built from the final state in a different order agrees
+        rebuilt = IncrementalMatchIndex(top_k=top_k)
+        for dog_id in sorted(traits, reverse=True):
+            rebuilt.upsert_dog(dog_id, traits[dog_id])
+        assert rebuilt.match_lists == index.match_lists
+        
+        # The reverse-neighbour map mirrors the match lists
+        for dog_id, entries in index.match_lists.items():
+            for _, other_id in entries:
+                assert dog_id in index.reverse_neighbours[other_id]
+        assert sum(len(listed_by) for listed_by in index.reverse_neighbours.values()) == \
+            sum(len(entries) for entries in index.match_lists.values())
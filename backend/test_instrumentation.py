@@ -0,0 +1,95 @@
+"""
+Tests for the metrics registry and the profiling hooks.
+"""
+
+import json
+import time
+
+import pytest
+
+from instrumentation import MetricsRegistry, profile_call
+
+
+def busy_loop(seconds):
+    """Keep the calling thread on the CPU for a while."""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def test_disabled_registry_records_nothing():
+    """While disabled, stage() is a shared no-op and nothing is recorded."""
+    metrics = MetricsRegistry()
+    with metrics.stage('embedding', 8):
+        pass
+    
+    assert metrics.stage('embedding') is metrics.stage('cosine')
+    assert metrics.snapshot() == {}
+
+
+def test_enabled_registry_records_stages():
+    """Timed blocks and externally measured executions accumulate per stage."""
+    metrics = MetricsRegistry()
+    metrics.enable()
+    with metrics.stage('cosine', 4):
+        pass
+    metrics.record('cosine', 0.5, 6)
+    metrics.record('vader', 0.25)
+    
+    snapshot = metrics.snapshot()
+    assert list(snapshot) == ['cosine', 'vader']
+    assert snapshot['cosine']['count'] == 2
+    assert snapshot['cosine']['items'] == 10
+    assert snapshot['cosine']['max_batch_size'] == 6
+    assert snapshot['cosine']['mean_batch_size'] == 5.0
+    assert snapshot['cosine']['max_seconds'] == 0.5
+    assert snapshot['vader']['min_seconds'] == snapshot['vader']['total_seconds'] == 0.25
+    assert json.loads(metrics.to_json()) == snapshot
+    
+    metrics.disable()
+    metrics.record('vader', 0.25)
+    with metrics.stage('vader'):
+        pass
+    assert metrics.snapshot()['vader']['count'] == 2
+    
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_prometheus_export_format():
+    """Every metric gets HELP and TYPE lines and one labelled sample per stage."""
+    metrics = MetricsRegistry(enabled=True)
+    metrics.record('embedding', 0.5, 3)
+    metrics.record('final_formula', 0.25)
+    
+    lines = metrics.to_prometheus(prefix='paw').splitlines()
+    assert lines[:4] == [
+        '# HELP paw_stage_calls_total Number of stage executions',
+        '# TYPE paw_stage_calls_total counter',
+        'paw_stage_calls_total{stage="embedding"} 1',
+        'paw_stage_calls_total{stage="final_formula"} 1'
+    ]
+    assert 'paw_stage_seconds_total{stage="embedding"} 0.5' in lines
+    assert '# TYPE paw_stage_batch_size_max gauge' in lines
+    assert 'paw_stage_items_total{stage="embedding"} 3' in lines
+    assert len([line for line in lines if line.startswith('# TYPE')]) == 5
+    assert len(lines) == 5 * 4
+
+
+@pytest.mark.parametrize('mode', ['cprofile', 'sampling'])
+def test_profile_call_returns_result_and_report(mode):
+    """Both profilers return the call's result and a report naming the profiled function."""
+    result, report = profile_call(busy_loop, args=(0.05,), mode=mode)
+    
+    assert result > 0
+    assert 'busy_loop' in report
+    if mode == 'sampling':
+        assert int(report.split()[0]) > 0
+
+
+def test_profile_call_rejects_unknown_mode():
+    """An unknown profiling mode raises ValueError."""
+    with pytest.raises(ValueError, match="Unknown profiling mode"):
+        profile_call(busy_loop, args=(0,), mode='perf')
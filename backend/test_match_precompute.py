@@ -0,0 +1,75 @@
+"""
+Tests for the sharded top-k match precomputation job.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from cosine_similarity import DogCompatibilityCalculator
+from match_precompute import MatchListReader, MatchPrecomputer, load_match_lists, load_matches_for
+
+
+def random_dogs(n_dogs=45, seed=0):
+    """Create dog ids and continuous random trait vectors, so scores have no ties."""
+    rng = np.random.default_rng(seed)
+    return [f"dog-{index}" for index in range(n_dogs)], rng.random((n_dogs, 6))
+
+
+def brute_force_top_k(dog_ids, trait_vectors, top_k):
+    """Top-k match lists from the full similarity matrix."""
+    scores = DogCompatibilityCalculator().calculate_similarity_matrix(trait_vectors, trait_vectors)
+    np.fill_diagonal(scores, -np.inf)
+    return {
+        dog_id: [(dog_ids[index], scores[row, index]) for index in np.argsort(-scores[row], kind='stable')[:top_k]]
+        for row, dog_id in enumerate(dog_ids)
+    }
+
+
+def assert_matches_equal(actual, expected):
+    """Same dogs in the same order, scores equal up to float32 storage."""
+    assert actual.keys() == expected.keys()
+    for dog_id, matches in expected.items():
+        assert [match for match, _ in actual[dog_id]] == [match for match, _ in matches]
+        np.testing.assert_allclose([score for _, score in actual[dog_id]],
+                                   [score for _, score in matches], atol=1e-6)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_shards_match_brute_force_and_resume(tmp_path, workers):
+    """Output equals a brute-force top-k, and a rerun only recomputes missing shards."""
+    dog_ids, trait_vectors = random_dogs()
+    precomputer = MatchPrecomputer(top_k=5, shard_size=10, tile_size=8, workers=workers)
+    expected = brute_force_top_k(dog_ids, trait_vectors, 5)
+    
+    assert precomputer.run(dog_ids, trait_vectors, str(tmp_path)) == {'shards': 5, 'computed': 5, 'skipped': 0}
+    assert_matches_equal(load_match_lists(str(tmp_path)), expected)
+    
+    shard_files = sorted(name for name in os.listdir(tmp_path) if name.startswith('shard_'))
+    kept_times = {name: os.stat(tmp_path / name).st_mtime_ns for name in shard_files if name != shard_files[2]}
+    os.remove(tmp_path / shard_files[2])
+    
+    assert precomputer.run(dog_ids, trait_vectors, str(tmp_path)) == {'shards': 5, 'computed': 1, 'skipped': 4}
+    assert {name: os.stat(tmp_path / name).st_mtime_ns for name in kept_times} == kept_times
+    assert_matches_equal(load_match_lists(str(tmp_path)), expected)
+    
+    reader = MatchListReader(str(tmp_path))
+    for dog_id in ['dog-0', 'dog-23', 'dog-44']:
+        assert_matches_equal({dog_id: reader.matches_for(dog_id)}, {dog_id: expected[dog_id]})
+        assert load_matches_for(str(tmp_path), dog_id) == reader.matches_for(dog_id)
+
+
+def test_fingerprint_mismatch_requires_overwrite(tmp_path):
+    """Different inputs are refused unless overwrite=True, which recomputes every shard."""
+    dog_ids, trait_vectors = random_dogs()
+    precomputer = MatchPrecomputer(top_k=3, shard_size=16, workers=1)
+    precomputer.run(dog_ids, trait_vectors, str(tmp_path))
+    
+    _, changed_vectors = random_dogs(seed=1)
+    with pytest.raises(ValueError, match="different inputs"):
+        precomputer.run(dog_ids, changed_vectors, str(tmp_path))
+    
+    summary = precomputer.run(dog_ids, changed_vectors, str(tmp_path), overwrite=True)
+    assert summary == {'shards': 3, 'computed': 3, 'skipped': 0}
+    assert_matches_equal(load_match_lists(str(tmp_path)), brute_force_top_k(dog_ids, changed_vectors, 3))
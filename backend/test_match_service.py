@@ -0,0 +1,194 @@
+"""
+Tests for the micro-batching match service and its HTTP handler.
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from match_service import MatchService, MicroBatcher, isolate_failures
+
+
+DOG = {'age': 3, 'weight': 45, 'sex': 1, 'neutered': 1, 'sociability': 8, 'temperament': 7}
+CANDIDATES = [
+    {'id': 1, 'age': 2, 'weight': 40, 'sex': 0, 'neutered': 1, 'sociability': 9, 'temperament': 8},
+    {'id': 2, 'age': 12, 'weight': 90, 'sex': 1, 'neutered': 0, 'sociability': 2, 'temperament': 3}
+]
+
+
+def run_batcher(process_batch, items, max_batch_size=64, max_wait=0.01):
+    """Submit items concurrently and collect results or exceptions."""
+    async def run():
+        batcher = MicroBatcher(process_batch, max_batch_size, max_wait)
+        return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+    return asyncio.run(run())
+
+
+def test_batcher_coalesces_and_fans_out():
+    """Concurrent submissions share one batch and each gets its own result."""
+    batches = []
+    
+    def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+    
+    assert run_batcher(double, [1, 2, 3, 4, 5]) == [2, 4, 6, 8, 10]
+    assert batches == [[1, 2, 3, 4, 5]]
+    
+    batches.clear()
+    assert run_batcher(double, [1, 2, 3, 4, 5], max_batch_size=2) == [2, 4, 6, 8, 10]
+    assert batches == [[1, 2], [3, 4], [5]]
+
+
+def test_batcher_fails_only_items_with_errors():
+    """An exception returned for one item fails that item alone; a raised one fails the batch."""
+    def score(items):
+        return [ValueError(item) if item < 0 else item for item in items]
+    
+    results = run_batcher(score, [1, -1, 2])
+    assert results[0] == 1 and results[2] == 2
+    assert isinstance(results[1], ValueError)
+    
+    def crash(items):
+        raise RuntimeError("scorer down")
+    
+    assert all(isinstance(result, RuntimeError) for result in run_batcher(crash, [1, 2]))
+
+
+def test_isolate_failures_rescores_items_one_by_one():
+    """A failing batch is retried per item so only the bad item carries the error."""
+    def score(items):
+        if 'bad' in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+    
+    results = isolate_failures(score, ['a', 'bad', 'c'])
+    assert results[0] == 'A' and results[2] == 'C'
+    assert isinstance(results[1], ValueError)
+    assert isolate_failures(score, ['a', 'b']) == ['A', 'B']
+
+
+def handle_concurrently(service, requests):
+    """Route (path, payload) requests concurrently so they land in the same batches."""
+    async def run():
+        return await asyncio.gather(*(
+            service.handle_request('POST', path, json.dumps(payload).encode('utf-8'))
+            for path, payload in requests
+        ))
+    return asyncio.run(run())
+
+
+def test_bad_request_does_not_fail_its_batch():
+    """Invalid weights, traits or reviews get a 400 while batch-mates still get 200."""
+    service = MatchService(max_wait=0.01)
+    responses = handle_concurrently(service, [
+        ('/match', {'dog': DOG, 'candidates': CANDIDATES}),
+        ('/match', {'dog': DOG, 'candidates': CANDIDATES, 'weights': {'bogus': 1}}),
+        ('/match', {'dog': DOG, 'candidates': [{'id': 3, 'age': 'old'}]}),
+        ('/sentiment', {'reviews': ["Great dog! Highly recommend!"]}),
+        ('/sentiment', {'reviews': ["ok", 5]})
+    ])
+    service.executor.shutdown()
+    
+    assert [status for status, _, _ in responses] == [200, 400, 400, 200, 400]
+    assert 'Unknown traits in weights' in json.loads(responses[1][2])['error']
+    assert json.loads(responses[2][2])['error'] == 'candidates[0].age must be a finite number'
+    assert json.loads(responses[4][2])['error'] == 'Reviews must be strings'
+    
+    matches = json.loads(responses[0][2])['matches']
+    calculator = service.calculator
+    expected = calculator.calculate_similarity_matrix(
+        calculator.embedder.create_trait_vector_from_dict(DOG),
+        np.array([calculator.embedder.create_trait_vector_from_dict(candidate) for candidate in CANDIDATES])
+    )[0]
+    assert [match['id'] for match in matches] == [1, 2]
+    assert [match['cosine_similarity'] for match in matches] == pytest.approx(expected.tolist(), abs=1e-12)
+    assert json.loads(responses[3][2])['count'] == 1
+
+
+def test_batched_matches_equal_unbatched():
+    """Requests with different weights scored in one batch match scoring them alone."""
+    requests = [('/match', {'dog': DOG, 'candidates': CANDIDATES, 'weights': {'age': weight}})
+                for weight in (0.5, 1.0, 3.0)] + [('/match', {'dog': DOG, 'candidates': []})]
+    batched_service, unbatched_service = MatchService(max_wait=0.01), MatchService(max_batch_size=1)
+    batched = handle_concurrently(batched_service, requests)
+    unbatched = handle_concurrently(unbatched_service, requests)
+    batched_service.executor.shutdown()
+    unbatched_service.executor.shutdown()
+    
+    assert [json.loads(body) for _, _, body in batched] == [json.loads(body) for _, _, body in unbatched]
+    assert json.loads(batched[3][2]) == {'matches': []}
+
+
+async def http_exchange(port, requests):
+    """
+    Send HTTP/1.1 requests over one keep-alive connection and parse the responses.
+    
+    Requests are (method, path, body) tuples or raw bytes; reading stops early
+    when the server closes the connection.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    try:
+        for request in requests:
+            if isinstance(request, tuple):
+                method, path, body = request
+                request = (f'{method} {path} HTTP/1.1\r\nHost: test\r\n'
+                           f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+            writer.write(request)
+            await writer.drain()
+            try:
+                head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+            except asyncio.IncompleteReadError:
+                break
+            status = int(head.split(' ', 2)[1])
+            length = next(int(line.split(':', 1)[1]) for line in head.split('\r\n')
+                          if line.lower().startswith('content-length:'))
+            responses.append((status, (await reader.readexactly(length)).decode('utf-8')))
+    finally:
+        writer.close()
+    return responses
+
+
+def test_http_handler_routes_requests():
+    """
+    The server answers match, health, metrics, unknown paths and bad JSON on one
+    connection, and answers a malformed request line or Content-Length with a
+    400 before closing the connection.
+    """
+    health = ('GET', '/health', b'')
+    
+    async def run():
+        service = MatchService(max_wait=0.001)
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            responses = await http_exchange(port, [
+                ('POST', '/match', json.dumps({'dog': DOG, 'candidates': CANDIDATES}).encode('utf-8')),
+                health,
+                ('GET', '/metrics', b''),
+                ('GET', '/nowhere', b''),
+                ('POST', '/sentiment', b'{not json'),
+                b'GARBAGE\r\nHost: test\r\n\r\n',
+                health
+            ])
+            bad_length = await http_exchange(port, [
+                b'POST /match HTTP/1.1\r\nHost: test\r\nContent-Length: ten\r\n\r\n{}',
+                health
+            ])
+            negative_length = await http_exchange(port, [
+                b'POST /match HTTP/1.1\r\nHost: test\r\nContent-Length: -1\r\n\r\n'
+            ])
+            after_errors = await http_exchange(port, [health])
+        service.executor.shutdown()
+        return responses, bad_length, negative_length, after_errors
+    
+    responses, bad_length, negative_length, after_errors = asyncio.run(run())
+    assert [status for status, _ in responses] == [200, 200, 200, 404, 400, 400]
+    assert [match['id'] for match in json.loads(responses[0][1])['matches']] == [1, 2]
+    assert json.loads(responses[1][1]) == {'status': 'ok'}
+    assert json.loads(responses[4][1]) == {'error': 'Invalid JSON'}
+    assert bad_length == negative_length == [responses[5]] == [(400, json.dumps({'error': 'Malformed request'}))]
+    assert after_errors == [responses[1]]
@@ -0,0 +1,113 @@
+"""
+Tests for the memoized pairwise compatibility cache.
+"""
+
+import pytest
+
+from compatibilitywithReviewsandRatings import calculate_compatibility_pipeline
+from pair_cache import CompatibilityPairCache, calculate_compatibility_pipeline_cached
+from vector_embedding import DogTraits
+
+
+COMPONENTS = {'cosine_similarity': 0.9, 'a': 0.5, 'b': -0.2}
+
+
+def test_keys_are_symmetric():
+    """A vs B and B vs A share one entry."""
+    cache = CompatibilityPairCache()
+    cache.put('b', 'a', COMPONENTS)
+    
+    assert cache.get('a', 'b') is COMPONENTS
+    assert cache.get('b', 'a') is COMPONENTS
+    assert len(cache) == 1
+
+
+def test_least_recently_used_pair_is_evicted():
+    """Lookups refresh recency, so the untouched pair is evicted first."""
+    cache = CompatibilityPairCache(max_size=2)
+    cache.put('a', 'b', COMPONENTS)
+    cache.put('a', 'c', COMPONENTS)
+    cache.get('b', 'a')
+    cache.put('c', 'd', COMPONENTS)
+    
+    assert cache.get('a', 'b') is COMPONENTS
+    assert cache.get('a', 'c') is None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_invalidation_makes_entries_stale_and_stats_count_them():
+    """Bumping either dog's traits or reviews turns the next lookup into a stale miss."""
+    cache = CompatibilityPairCache()
+    cache.put('a', 'b', COMPONENTS)
+    cache.put('a', 'c', COMPONENTS)
+    cache.get('a', 'b')
+    
+    cache.invalidate_traits('b')
+    cache.invalidate_reviews('c')
+    assert cache.get('a', 'b') is None
+    assert cache.get('c', 'a') is None
+    assert cache.get('a', 'b') is None
+    
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['stale'], stats['size']) == (1, 3, 2, 0)
+    assert stats['hit_rate'] == 0.25
+
+
+def test_result_computed_across_an_invalidation_is_not_stored():
+    """A put carrying the versions of the missed lookup is refused once a dog was invalidated."""
+    cache = CompatibilityPairCache()
+    components, versions = cache.lookup('a', 'b')
+    assert components is None
+    
+    cache.invalidate_reviews('a')
+    assert cache.put('a', 'b', COMPONENTS, versions) is False
+    assert cache.get('a', 'b') is None
+    assert cache.get_stats()['rejected'] == 1
+    
+    _, versions = cache.lookup('a', 'b')
+    assert cache.put('a', 'b', COMPONENTS, versions) is True
+    assert cache.get('b', 'a') is COMPONENTS
+
+
+def test_cached_pipeline_returns_results_in_the_requested_orientation():
+    """Hits in either orientation equal an uncached pipeline run for that orientation."""
+    cache = CompatibilityPairCache()
+    traits_a = DogTraits(age=3, weight=45, sex=1, neutered=1, sociability=8, temperament=7)
+    traits_b = DogTraits(age=9, weight=12, sex=0, neutered=0, sociability=2, temperament=4)
+    reviews_a = ["Great dog! Highly recommend!", "Very gentle with puppies."]
+    reviews_b = ["Barks a lot at night.", "Nervous around other dogs."]
+    
+    first = calculate_compatibility_pipeline_cached(cache, 'a', 'b', traits_a, traits_b,
+                                                    reviews_a, reviews_b, 9, 4)
+    forward = calculate_compatibility_pipeline_cached(cache, 'a', 'b', traits_a, traits_b,
+                                                      reviews_a, reviews_b, 9, 4)
+    backward = calculate_compatibility_pipeline_cached(cache, 'b', 'a', traits_b, traits_a,
+                                                       reviews_b, reviews_a, 4, 9)
+    
+    assert cache.get_stats()['hits'] == 2
+    assert first == forward == calculate_compatibility_pipeline(traits_a, traits_b, reviews_a, reviews_b, 9, 4)
+    # Cosine similarity can differ in the last bit between orientations
+    assert backward == pytest.approx(calculate_compatibility_pipeline(traits_b, traits_a, reviews_b, reviews_a, 4, 9),
+                                     rel=1e-12)
+    assert backward['overall_compatibility'] != forward['overall_compatibility']
+
+
+def test_self_pairs_are_not_cached():
+    """A dog paired with itself is rejected by the cache and computed directly by the pipeline."""
+    cache = CompatibilityPairCache()
+    with pytest.raises(ValueError, match="paired with itself"):
+        cache.lookup('a', 'a')
+    with pytest.raises(ValueError, match="paired with itself"):
+        cache.put('a', 'a', COMPONENTS)
+    
+    traits_a = DogTraits(age=3, weight=45, sex=1, neutered=1, sociability=8, temperament=7)
+    traits_b = DogTraits(age=9, weight=12, sex=0, neutered=0, sociability=2, temperament=4)
+    reviews_a = ["Great dog! Highly recommend!"]
+    reviews_b = ["Barks a lot at night."]
+    result = calculate_compatibility_pipeline_cached(cache, 'a', 'a', traits_a, traits_b,
+                                                     reviews_a, reviews_b, 9, 4)
+    
+    assert result == calculate_compatibility_pipeline(traits_a, traits_b, reviews_a, reviews_b, 9, 4)
+    assert result['sentiment_score_a'] != result['sentiment_score_b']
+    assert len(cache) == 0
+    assert cache.get_stats()['misses'] == 0
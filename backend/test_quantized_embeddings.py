@@ -0,0 +1,94 @@
+"""
+Tests for the quantized embedding store against exact float64 scoring.
+"""
+
+import random
+
+import numpy as np
+
+from cosine_similarity import DogCompatibilityCalculator
+from quantized_embeddings import QUANTIZATION_MODES, QuantizedEmbeddingStore
+from vector_embedding import DogTraits
+
+
+def random_trait_vectors(calculator, count, seed=0):
+    """Create trait vectors for random dogs within the embedder's trait ranges."""
+    rng = random.Random(seed)
+    return np.array([
+        calculator.embedder.create_trait_vector(DogTraits(
+            age=rng.randint(0, 15),
+            weight=rng.uniform(5, 120),
+            sex=rng.randint(0, 1),
+            neutered=rng.randint(0, 1),
+            sociability=rng.randint(1, 10),
+            temperament=rng.randint(1, 10)
+        ))
+        for _ in range(count)
+    ])
+
+
+def test_quantized_scores_stay_within_error_bound():
+    """Approximate similarities stay within the per-dog error bounds."""
+    calculator = DogCompatibilityCalculator()
+    vectors = random_trait_vectors(calculator, 2000)
+    dog_ids = [f"dog{i}" for i in range(len(vectors))]
+    
+    for mode in QUANTIZATION_MODES:
+        store = QuantizedEmbeddingStore(mode, calculator, block_size=256)
+        store.build(dog_ids, vectors)
+        assert store.memory_bytes() < vectors.nbytes
+        
+        for query in vectors[:20]:
+            for weights in (None, {'age': 2.0, 'sex': 0.5}):
+                exact = calculator.calculate_similarity_matrix(query, vectors, weights)[0]
+                approximate = store.similarities(query, weights)
+                assert np.all(np.abs(approximate - exact) <= store.error_bounds(weights))
+        
+        # Bounds are loose only for the few dogs whose vectors lie near the origin
+        assert np.median(store.error_bounds()) < (0.02 if mode == 'int8' else 0.001)
+
+
+def test_rescoring_matches_exact_decisions():
+    """Re-scored searches return the exact top-k and the exact compatible set."""
+    calculator = DogCompatibilityCalculator()
+    vectors = random_trait_vectors(calculator, 1000, seed=1)
+    dog_ids = [f"dog{i}" for i in range(len(vectors))]
+    
+    for mode in QUANTIZATION_MODES:
+        store = QuantizedEmbeddingStore(mode, calculator)
+        store.build(dog_ids, vectors)
+        
+        for query_index in range(10):
+            exact = calculator.calculate_similarity_matrix(vectors[query_index], vectors)[0]
+            
+            compatible = store.find_compatible(vectors[query_index])
+            assert {dog_id for dog_id, _ in compatible} == \
+                {dog_ids[i] for i in np.flatnonzero(exact >= calculator.compatibility_threshold)}
+            
+            results = store.search(vectors[query_index], top_k=5, exclude_id=dog_ids[query_index])
+            exact[query_index] = -np.inf
+            expected = sorted(range(len(exact)), key=lambda i: (-exact[i], i))[:5]
+            assert results == [(dog_ids[i], exact[i]) for i in expected]
+
+
+def test_rescored_search_keeps_all_tied_candidates():
+    """With many dogs tied at the top, re-scored search still returns the exact top-k by index."""
+    calculator = DogCompatibilityCalculator()
+    rng = random.Random(2)
+    # Few distinct trait combinations, so dozens of dogs share each exact score
+    vectors = np.array([
+        calculator.embedder.create_trait_vector(DogTraits(
+            age=rng.choice([2, 9]), weight=rng.choice([20, 70]), sex=rng.randint(0, 1),
+            neutered=1, sociability=5, temperament=5
+        ))
+        for _ in range(800)
+    ])
+    dog_ids = [f"dog{i}" for i in range(len(vectors))]
+    
+    for mode in QUANTIZATION_MODES:
+        store = QuantizedEmbeddingStore(mode, calculator)
+        store.build(dog_ids, vectors)
+        exact = calculator.calculate_similarity_matrix(vectors[0], vectors)[0]
+        expected = sorted(range(len(exact)), key=lambda i: (-exact[i], i))[:10]
+        
+        assert store.search(vectors[0], top_k=10) == [(dog_ids[i], exact[i]) for i in expected]
@@ -0,0 +1,100 @@
+"""
+Tests for time-decayed, incrementally updated reputation aggregates.
+"""
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from data_access import DogRecord, ReviewRecord
+from reputation import ReputationTracker, calculate_compatibility_with_reputation
+from compatibilitywithReviewsandRatings import build_compatibility_result
+from cosine_similarity import DogCompatibilityCalculator
+from vector_embedding import DogTraits
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+NOW = datetime(2025, 7, 1, tzinfo=timezone.utc)
+
+
+def random_reviews(count=500, seed=7):
+    """Random (dog_id, created_at, sentiment, rating) tuples over 18 months."""
+    rng = random.Random(seed)
+    return [
+        (f"dog-{rng.randrange(20)}", START + timedelta(seconds=rng.randrange(540 * 86400)),
+         rng.uniform(-1, 1), rng.randint(1, 5))
+        for _ in range(count)
+    ]
+
+
+def test_incremental_updates_match_batch_rebuild_exactly():
+    """Any arrival order of single-review updates gives the rebuild's values bit for bit."""
+    reviews = random_reviews()
+    rebuilt = ReputationTracker.rebuild(reviews, half_life_days=30)
+    
+    shuffled = reviews[:]
+    random.Random(1).shuffle(shuffled)
+    incremental = ReputationTracker(half_life_days=30)
+    for dog_id, created_at, sentiment, rating in shuffled:
+        incremental.add_review(dog_id, created_at.isoformat(), sentiment, rating)
+    
+    assert incremental.aggregates == rebuilt.aggregates
+    for dog_id in rebuilt.aggregates:
+        assert incremental.sentiment(dog_id) == rebuilt.sentiment(dog_id)
+        assert incremental.ratings_sum(dog_id, NOW) == rebuilt.ratings_sum(dog_id, NOW)
+
+
+def test_aggregates_match_direct_decay_formula():
+    """Decayed values agree with recomputing every review's decay from scratch."""
+    reviews = random_reviews()
+    tracker = ReputationTracker.rebuild(reviews, half_life_days=30)
+    
+    for dog_id in tracker.aggregates:
+        own = [review for review in reviews if review[0] == dog_id]
+        decay = [0.5 ** ((NOW - created_at).total_seconds() / (30 * 86400)) for _, created_at, _, _ in own]
+        expected_sentiment = sum(d * s for d, (_, _, s, _) in zip(decay, own)) / sum(decay)
+        expected_ratings = sum(d * r for d, (_, _, _, r) in zip(decay, own))
+        
+        assert math.isclose(tracker.sentiment(dog_id), expected_sentiment, rel_tol=1e-12, abs_tol=1e-12)
+        assert math.isclose(tracker.ratings_sum(dog_id, NOW), expected_ratings, rel_tol=1e-12)
+        assert math.isclose(tracker.review_weight(dog_id, NOW), sum(decay), rel_tol=1e-12)
+
+
+def test_decay_and_removal():
+    """A rating halves per half-life, and removing a review exactly undoes adding it."""
+    tracker = ReputationTracker(half_life_days=10)
+    tracker.add_review('rex', '2025-01-01T00:00:00Z', 0.5, 4)
+    assert math.isclose(tracker.ratings_sum('rex', '2025-01-11T00:00:00Z'), 2.0, rel_tol=1e-12)
+    assert math.isclose(tracker.ratings_sum('rex', '2025-01-21T00:00:00+00:00'), 1.0, rel_tol=1e-12)
+    
+    before = ReputationTracker.rebuild([('rex', '2025-01-01T00:00:00Z', 0.5, 4)], half_life_days=10)
+    tracker.add_review('rex', datetime(2025, 3, 1), -0.9, 1)
+    tracker.remove_review('rex', datetime(2025, 3, 1), -0.9, 1)
+    assert tracker.aggregates == before.aggregates
+    
+    tracker.remove_review('rex', '2025-01-01T00:00:00Z', 0.5, 4)
+    assert tracker.sentiment('rex') == 0.0 and tracker.ratings_sum('rex', NOW) == 0.0
+
+
+def test_tracker_feeds_compatibility_result():
+    """Dog records build a tracker whose values drive build_compatibility_result."""
+    dogs = {
+        'a': DogRecord('a', DogTraits(3, 45, 1, 1, 8, 7), [
+            ReviewRecord('r1', 5, "Great dog", '2025-06-01T00:00:00+00:00'),
+            ReviewRecord('r2', 2, "Barks a lot", '2025-01-01T00:00:00+00:00'),
+            ReviewRecord('r3', 4, "No date", None)
+        ]),
+        'b': DogRecord('b', DogTraits(2, 40, 0, 1, 9, 8), [
+            ReviewRecord('r4', 3, "Okay", '2025-05-01T00:00:00+00:00')
+        ])
+    }
+    scores = {"Great dog": 0.8, "Barks a lot": -0.4, "Okay": 0.1}
+    tracker = ReputationTracker.from_dogs(dogs, lambda texts: [scores[text] for text in texts])
+    
+    assert tracker.aggregates['a'].reviews == 2
+    result = calculate_compatibility_with_reputation(
+        tracker, 'a', 'b', dogs['a'].traits, dogs['b'].traits, now=NOW)
+    cosine = DogCompatibilityCalculator().calculate_compatibility(dogs['a'].traits, dogs['b'].traits).cosine_similarity
+    assert result == build_compatibility_result(
+        cosine, tracker.sentiment('a'), tracker.sentiment('b'),
+        tracker.ratings_sum('a', NOW), tracker.ratings_sum('b', NOW), 1.0)
+    assert tracker.sentiment('a') > (0.8 - 0.4) / 2
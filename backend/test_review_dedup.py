@@ -0,0 +1,69 @@
+"""
+Tests for near-duplicate review clustering and deduplicated scoring.
+"""
+
+from compatibilitywithReviewsandRatings import calculate_compatibility_pipeline
+from review_dedup import ReviewDeduplicator, score_deduplicated
+from vector_embedding import DogTraits
+
+
+def test_near_duplicates_share_a_representative():
+    """Templated reviews cluster together; unrelated reviews stay apart."""
+    reviews = [
+        "Great dog! Highly recommend!",
+        "Terrible experience. The dog was aggressive and untrained.",
+        "great dog, highly recommend",
+        "Terrible experience, the dog was aggressive and untrained!!",
+        "Okay dog, nothing special.",
+        "Great dog!! Highly recommend.",
+        "",
+        "Loves to play fetch in the park every morning."
+    ]
+    representatives = ReviewDeduplicator().cluster(reviews).tolist()
+    
+    assert representatives == [0, 1, 0, 1, 4, 0, 6, 7]
+    assert ReviewDeduplicator().cluster([]).tolist() == []
+
+
+def test_scores_are_reused_within_clusters():
+    """Only representatives reach the scorer, and the saved work is reported."""
+    reviews = ["Great dog! Highly recommend!"] * 4 + ["Okay dog, nothing special."]
+    scored = []
+    
+    def score_batch(texts):
+        scored.extend(texts)
+        return [float(len(text)) for text in texts]
+    
+    scores, stats = score_deduplicated(reviews, score_batch)
+    
+    assert scored == [reviews[0], reviews[4]]
+    assert scores == [28.0] * 4 + [26.0]
+    assert stats == {'reviews': 5, 'scored': 2, 'reused': 3, 'work_saved': 0.6}
+
+
+def test_pipeline_deduplication_keeps_exact_duplicate_scores():
+    """Deduplicating exact copies leaves the pipeline result unchanged."""
+    dog_a = DogTraits(age=3, weight=45, sex=1, neutered=1, sociability=8, temperament=7)
+    dog_b = DogTraits(age=2, weight=40, sex=0, neutered=1, sociability=9, temperament=8)
+    reviews_a = ["Great dog! Highly recommend!"] * 3 + ["Very gentle with puppies."]
+    reviews_b = ["Great dog! Highly recommend!", "Barks a lot at night."]
+    
+    plain = calculate_compatibility_pipeline(dog_a, dog_b, reviews_a, reviews_b, 20, 12)
+    deduplicated = calculate_compatibility_pipeline(dog_a, dog_b, reviews_a, reviews_b, 20, 12,
+                                                    deduplicate_reviews=True)
+    
+    stats = deduplicated.pop('review_dedup')
+    assert stats['scored'] == 3 and stats['reused'] == 3
+    assert deduplicated == plain
+
+
+def test_signatures_do_not_depend_on_batching():
+    """Splitting by review count or shingle count leaves the signatures unchanged."""
+    reviews = ["Great dog! Highly recommend!", "", "ok", "Loves to play fetch in the park every morning." * 20,
+               "Terrible experience. The dog was aggressive and untrained."] * 5
+    
+    whole = ReviewDeduplicator(batch_size=1000, max_batch_shingles=1 << 20).signatures(reviews)
+    by_count = ReviewDeduplicator(batch_size=3).signatures(reviews)
+    by_shingles = ReviewDeduplicator(max_batch_shingles=100).signatures(reviews)
+    
+    assert (whole == by_count).all() and (whole == by_shingles).all()
@@ -0,0 +1,106 @@
+"""
+Tests for the inverted TF-IDF index against brute-force cosine search.
+"""
+
+import random
+
+import pytest
+
+from text_embedding import TextEmbedder
+from text_index import TextIndex
+
+
+WORDS = ("friendly playful calm gentle loud shy energetic loyal smart stubborn "
+         "loves fetch treats walks kids cats park swimming training cuddles").split()
+
+
+def random_text(rng):
+    """Create a random description from a small word pool."""
+    return ' '.join(rng.choice(WORDS[:rng.randint(4, len(WORDS))]) for _ in range(rng.randint(0, 12)))
+
+
+def fetch_text(rng):
+    """Create a description mentioning fetch once among a few distinct other words."""
+    return ' '.join(['fetch'] + rng.sample([word for word in WORDS if word != 'fetch'], rng.randint(1, 8)))
+
+
+def brute_force(index, query, top_k, exclude_id=None):
+    """Score every indexed document densely."""
+    scores = []
+    for doc_id, weights in index.document_weights.items():
+        score = sum(weight * weights.get(term, 0.0) for term, weight in query.items())
+        if doc_id != exclude_id and any(term in weights for term in query):
+            scores.append(score)
+    return sorted(scores, reverse=True)[:top_k]
+
+
+def test_search_matches_brute_force_under_updates():
+    """Pruned top-k scores equal a full scan after random adds, updates and removes."""
+    rng = random.Random(0)
+    embedder = TextEmbedder()
+    embedder.build_vocabulary([random_text(rng) for _ in range(200)])
+    index = TextIndex(embedder)
+    texts = {}
+    
+    for step in range(400):
+        action = rng.random()
+        if texts and action < 0.2:
+            doc_id = rng.choice(sorted(texts))
+            del texts[doc_id]
+            index.remove_document(doc_id)
+        elif texts and action < 0.4:
+            doc_id = rng.choice(sorted(texts))
+            texts[doc_id] = random_text(rng)
+            index.update_document(doc_id, texts[doc_id])
+        else:
+            texts[step] = random_text(rng)
+            index.add_document(step, texts[step])
+        
+        if step % 20 == 0:
+            top_k = rng.randint(1, 8)
+            query = index.vectorize(random_text(rng))
+            results = index.search_vector(query, top_k)
+            assert [score for _, score in results] == pytest.approx(brute_force(index, query, top_k))
+            assert index.last_query_stats['postings_scanned'] <= index.last_query_stats['total_postings']
+            
+            doc_id = rng.choice(sorted(texts))
+            results = index.search_similar(doc_id, top_k)
+            assert doc_id not in [result_id for result_id, _ in results]
+            assert [score for _, score in results] == \
+                pytest.approx(brute_force(index, index.document_weights[doc_id], top_k, doc_id))
+    
+    # Impact orders stay sorted and in sync with the posting dictionaries
+    assert index._impact_orders.keys() == index.postings.keys()
+    for term, posting in index.postings.items():
+        order = index._impact_orders[term]
+        assert order == sorted(order)
+        assert sorted((-negative_weight, doc_id) for negative_weight, _, doc_id in order) == \
+            sorted((weight, doc_id) for doc_id, weight in posting.items())
+    assert len(index) == len(texts)
+
+
+def test_queries_between_updates_stay_pruned():
+    """Updates edit a term's impact order in place, and queries in between still scan a fraction of it."""
+    rng = random.Random(1)
+    embedder = TextEmbedder()
+    embedder.build_vocabulary([random_text(rng) for _ in range(200)])
+    index = TextIndex(embedder)
+    for doc_id in range(300):
+        index.add_document(doc_id, fetch_text(rng))
+    
+    query = index.vectorize('fetch')
+    (term,) = query
+    order = index._impact_orders[term]
+    for step in range(200):
+        doc_id = rng.randrange(400)
+        if doc_id in index and step % 3 == 0:
+            index.remove_document(doc_id)
+        else:
+            index.update_document(doc_id, fetch_text(rng))
+        
+        results = index.search_vector(query, top_k=5)
+        assert [score for _, score in results] == pytest.approx(brute_force(index, query, 5))
+        assert index._impact_orders[term] is order
+        assert index.last_query_stats['postings_scanned'] < len(index.postings[term]) // 10
+        assert index.last_query_stats['total_postings'] == \
+            sum(len(weights) for weights in index.document_weights.values())
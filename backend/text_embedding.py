@@ -10,6 +10,7 @@ from collections import Counter
 import math
 from textblob import TextBlob
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from instrumentation import registry
 
 
 class TextEmbedder:
@@ -27,8 +28,7 @@ class TextEmbedder:
         doc_counts = Counter()
         
         for text in texts:
-            processed_text = re.sub(r'[^a-zA-Z\s]', '', text.lower())
-            words = processed_text.split()
+            words = self.tokenize(text)
             unique_words = set(words)
             
             for word in words:
@@ -52,35 +52,62 @@ class TextEmbedder:
         
         self.is_fitted = True
     
-    def create_embedding(self, text):
-        """Convert text to vector embedding."""
+    def tokenize(self, text):
+        """Lower-case text, strip everything but letters and split into words."""
+        return re.sub(r'[^a-zA-Z\s]', '', text.lower()).split()
+    
+    def tfidf_weights(self, text):
+        """
+        Compute the sparse TF-IDF weights of a text.
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            Dictionary mapping vocabulary index to unnormalized TF-IDF weight
+        """
         if not self.is_fitted:
             raise ValueError("Build vocabulary first")
-        
-        # Preprocess text
-        processed_text = re.sub(r'[^a-zA-Z\s]', '', text.lower())
-        words = processed_text.split()
-        
-        # TF-IDF vector
+        return self._tfidf_from_words(self.tokenize(text))
+    
+    def _tfidf_from_words(self, words):
+        """TF-IDF weights of the in-vocabulary words of a tokenized text."""
         word_counts = Counter(words)
         total_words = len(words)
-        tf_idf_vector = np.zeros(len(self.vocabulary))
+        weights = {}
         
         for word, count in word_counts.items():
             if word in self.vocabulary:
-                word_idx = self.vocabulary[word]
                 tf = count / total_words
                 idf = self.idf_scores[word]
-                tf_idf_vector[word_idx] = tf * idf
+                weights[self.vocabulary[word]] = tf * idf
+        return weights
+    
+    def create_embedding(self, text):
+        """Convert text to vector embedding."""
+        if not self.is_fitted:
+            raise ValueError("Build vocabulary first")
+        
+        with registry.stage('tfidf'):
+            # Preprocess text
+            words = self.tokenize(text)
+            total_words = len(words)
+            
+            # TF-IDF vector
+            tf_idf_vector = np.zeros(len(self.vocabulary))
+            for word_idx, weight in self._tfidf_from_words(words).items():
+                tf_idf_vector[word_idx] = weight
         
         # Sentiment features using libraries
         # TextBlob sentiment
-        blob = TextBlob(text)
-        textblob_polarity = blob.sentiment.polarity  # -1 to 1
-        textblob_subjectivity = blob.sentiment.subjectivity  # 0 to 1
+        with registry.stage('textblob'):
+            blob = TextBlob(text)
+            textblob_polarity = blob.sentiment.polarity  # -1 to 1
+            textblob_subjectivity = blob.sentiment.subjectivity  # 0 to 1
         
         # VADER sentiment
-        vader_scores = self.vader_analyzer.polarity_scores(text)
+        with registry.stage('vader'):
+            vader_scores = self.vader_analyzer.polarity_scores(text)
         vader_compound = vader_scores['compound']  # -1 to 1
         vader_pos = vader_scores['pos']  # 0 to 1
         vader_neg = vader_scores['neg']  # 0 to 1
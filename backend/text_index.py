@@ -0,0 +1,250 @@
+"""
+Text Index Module
+
+Inverted index over the fitted TextEmbedder vocabulary for "dogs described
+like this one" searches over review and about text.
+
+Each posting list maps document ids to the document's L2-normalized TF-IDF
+weight for the term. Top-k cosine queries use max-score pruning over
+impact-ordered postings: query terms are visited in order of decreasing score
+contribution, each posting list from its largest weight down, and scanning
+stops as soon as the best possible score of a document not seen yet cannot
+beat the current k-th score.
+
+Documents can be added, updated and removed one at a time. Each term keeps its
+impact order as a sorted list that updates edit in place with bisection, so a
+change costs a binary search and a list insert or delete per term of the
+document and queries never re-sort a posting list.
+"""
+
+import bisect
+import heapq
+import math
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+from text_embedding import TextEmbedder
+from instrumentation import registry
+
+
+class TextIndex:
+    """
+    Inverted TF-IDF index answering exact top-k cosine similarity queries.
+    """
+    
+    def __init__(self, embedder: TextEmbedder):
+        """
+        Initialize an empty index.
+        
+        Args:
+            embedder: TextEmbedder with a built vocabulary; its vocabulary and IDF
+                scores stay fixed for the lifetime of the index
+        """
+        if not embedder.is_fitted:
+            raise ValueError("Build vocabulary first")
+        self.embedder = embedder
+        self.postings: Dict[int, Dict[Hashable, float]] = {}
+        self.document_weights: Dict[Hashable, Dict[int, float]] = {}
+        self.last_query_stats: Dict[str, int] = {}
+        # Per term (-weight, sequence, doc_id) entries in ascending order; the
+        # unique sequence number breaks weight ties by insertion order and keeps
+        # comparisons from ever reaching doc ids of mixed types
+        self._impact_orders: Dict[int, List[Tuple[float, int, Hashable]]] = {}
+        self._sequences: Dict[Hashable, int] = {}
+        self._next_sequence = 0
+        self._total_postings = 0
+    
+    def __len__(self) -> int:
+        return len(self.document_weights)
+    
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self.document_weights
+    
+    def vectorize(self, text: str) -> Dict[int, float]:
+        """
+        Convert text to a sparse, L2-normalized TF-IDF vector.
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            Dictionary mapping vocabulary index to weight; words appearing in
+            every training text have zero IDF and are left out
+        """
+        weights = self.embedder.tfidf_weights(text)
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        if norm == 0:
+            return {}
+        return {term: weight / norm for term, weight in weights.items() if weight > 0}
+    
+    def add_document(self, doc_id: Hashable, text: str) -> None:
+        """
+        Index a document, replacing any previous text of the same id.
+        
+        Args:
+            doc_id: Document identifier, e.g. a dog id
+            text: Review or about text
+        """
+        if doc_id in self.document_weights:
+            self.remove_document(doc_id)
+        
+        weights = self.vectorize(text)
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        self.document_weights[doc_id] = weights
+        self._sequences[doc_id] = sequence
+        for term, weight in weights.items():
+            self.postings.setdefault(term, {})[doc_id] = weight
+            bisect.insort(self._impact_orders.setdefault(term, []), (-weight, sequence, doc_id))
+        self._total_postings += len(weights)
+    
+    def update_document(self, doc_id: Hashable, text: str) -> None:
+        """
+        Re-index a document with new text.
+        
+        Args:
+            doc_id: Document identifier
+            text: New review or about text
+        """
+        self.add_document(doc_id, text)
+    
+    def remove_document(self, doc_id: Hashable) -> None:
+        """
+        Remove a document from the index.
+        
+        Args:
+            doc_id: Document identifier
+        """
+        weights = self.document_weights.pop(doc_id)
+        sequence = self._sequences.pop(doc_id)
+        for term, weight in weights.items():
+            posting = self.postings[term]
+            del posting[doc_id]
+            order = self._impact_orders[term]
+            del order[bisect.bisect_left(order, (-weight, sequence))]
+            if not posting:
+                del self.postings[term]
+                del self._impact_orders[term]
+        self._total_postings -= len(weights)
+    
+    def search(self, text: str, top_k: int = 10,
+               exclude_id: Optional[Hashable] = None) -> List[Tuple[Any, float]]:
+        """
+        Find the documents most similar to a text.
+        
+        Args:
+            text: Query text
+            top_k: Number of results (default: 10)
+            exclude_id: Document id left out of the results
+            
+        Returns:
+            List of (doc_id, cosine similarity) tuples, best first
+        """
+        return self.search_vector(self.vectorize(text), top_k, exclude_id)
+    
+    def search_similar(self, doc_id: Hashable, top_k: int = 10) -> List[Tuple[Any, float]]:
+        """
+        Find the documents most similar to an indexed document.
+        
+        Args:
+            doc_id: Identifier of an indexed document
+            top_k: Number of results (default: 10)
+            
+        Returns:
+            List of (doc_id, cosine similarity) tuples, best first, without doc_id itself
+        """
+        return self.search_vector(self.document_weights[doc_id], top_k, doc_id)
+    
+    def search_vector(self, query: Dict[int, float], top_k: int = 10,
+                      exclude_id: Optional[Hashable] = None) -> List[Tuple[Any, float]]:
+        """
+        Top-k cosine search for a normalized sparse query vector with max-score pruning.
+        
+        Args:
+            query: Dictionary mapping vocabulary index to normalized weight
+            top_k: Number of results (default: 10)
+            exclude_id: Document id left out of the results
+            
+        Returns:
+            List of (doc_id, cosine similarity) tuples, best first; documents
+            sharing no term with the query are never returned
+        """
+        if top_k <= 0:
+            return []
+        
+        with registry.stage('text_index_search'):
+            # Query terms by decreasing maximum contribution q_t * max_d w_td
+            terms = sorted(
+                ((-query[term] * self._impact_orders[term][0][0], term) for term in query if term in self.postings),
+                reverse=True
+            )
+            remaining_bounds = [0.0] * (len(terms) + 1)
+            for position in range(len(terms) - 1, -1, -1):
+                remaining_bounds[position] = remaining_bounds[position + 1] + terms[position][0]
+            
+            heap: List[Tuple[float, int, Hashable]] = []
+            scored: Set[Hashable] = set()
+            if exclude_id is not None:
+                scored.add(exclude_id)
+            postings_scanned = 0
+            # Bound on what an unseen document gets from the terms already scanned:
+            # it can only hold them with weights below where each scan stopped
+            scanned_bound = 0.0
+            
+            for position, (_, term) in enumerate(terms):
+                if len(heap) == top_k and scanned_bound + remaining_bounds[position] < heap[0][0]:
+                    break
+                
+                stop_weight = 0.0
+                for negative_weight, _, doc_id in self._impact_orders[term]:
+                    weight = -negative_weight
+                    if len(heap) == top_k and \
+                            scanned_bound + query[term] * weight + remaining_bounds[position + 1] < heap[0][0]:
+                        stop_weight = weight
+                        break
+                    postings_scanned += 1
+                    if doc_id in scored:
+                        continue
+                    scored.add(doc_id)
+                    
+                    document = self.document_weights[doc_id]
+                    score = sum(query[other] * document[other] for _, other in terms if other in document)
+                    
+                    # Among equal scores the latest-scored document is evicted first
+                    entry = (score, -len(scored), doc_id)
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, entry)
+                    elif score > heap[0][0]:
+                        heapq.heapreplace(heap, entry)
+                scanned_bound += query[term] * stop_weight
+        
+        self.last_query_stats = {
+            'query_terms': len(terms),
+            'postings_scanned': postings_scanned,
+            'documents_scored': len(scored) - (exclude_id is not None),
+            'total_postings': self._total_postings
+        }
+        # Earlier-scored documents win ties, matching a stable sort by score
+        ranked = sorted(heap, key=lambda entry: (-entry[0], -entry[1]))
+        return [(doc_id, score) for score, _, doc_id in ranked]
+
+
+# Example usage
+if __name__ == "__main__":
+    from data_access import SQLiteDataSource
+    
+    source = SQLiteDataSource()
+    with source.pool.connection() as conn:
+        dog_ids = [row['id'] for row in conn.execute("SELECT id FROM dogs")]
+    dogs = source.fetch_dogs(dog_ids)
+    texts = {dog_id: ' '.join([dog.about or ''] + dog.review_texts) for dog_id, dog in dogs.items()}
+    
+    embedder = TextEmbedder()
+    embedder.build_vocabulary(list(texts.values()))
+    index = TextIndex(embedder)
+    for dog_id, text in texts.items():
+        index.add_document(dog_id, text)
+    
+    query = "Great with kids and loves training"
+    print(f"Query: {query}")
+    for dog_id, score in index.search(query, top_k=3):
+        print(f"  {score:.3f}  {texts[dog_id][:70]}")
+    print(f"Stats: {index.last_query_stats}")
@@ -21,6 +21,26 @@ class DogTraits:
     temperament: int  # Scale 1-10
 
 
+def traits_from_dict(traits_dict: Dict[str, int]) -> DogTraits:
+    """
+    Build a DogTraits object from a dictionary, filling in default values.
+    
+    Args:
+        traits_dict: Dictionary with trait names as keys and values as integers
+        
+    Returns:
+        DogTraits object
+    """
+    return DogTraits(
+        age=traits_dict.get('age', 0),
+        weight=traits_dict.get('weight', 0),
+        sex=traits_dict.get('sex', 0),
+        neutered=traits_dict.get('neutered', 0),
+        sociability=traits_dict.get('sociability', 1),
+        temperament=traits_dict.get('temperament', 1)
+    )
+
+
 class DogVectorEmbedder:
     """
     Converts dog traits into normalized vector embeddings for compatibility calculations.
@@ -38,6 +58,9 @@ class DogVectorEmbedder:
             'temperament': (1, 10)  # Scale 1-10
         }
         
+        # Fixed dimension order shared by trait vectors and weight vectors
+        self.trait_names = list(self.trait_ranges)
+        
         # Define weights for each trait (can be adjusted based on importance)
         self.trait_weights = {
             'age': 1.0,
@@ -62,6 +85,55 @@ class DogVectorEmbedder:
         min_val, max_val = self.trait_ranges[trait_name]
         return (value - min_val) / (max_val - min_val)
     
+    def create_trait_vector(self, dog_traits: DogTraits) -> np.ndarray:
+        """
+        Create an unweighted trait vector from dog traits.
+        
+        Each trait is range-normalized but neither weighted nor L2 normalized,
+        so the vector stays valid when trait weights change. Weights are applied
+        at query time by the similarity kernel.
+        
+        Args:
+            dog_traits: DogTraits object containing all trait values
+            
+        Returns:
+            Range-normalized trait vector as numpy array (in trait_names order)
+        """
+        return np.array([
+            self.normalize_trait(trait_name, getattr(dog_traits, trait_name))
+            for trait_name in self.trait_names
+        ])
+    
+    def create_trait_vector_from_dict(self, traits_dict: Dict[str, int]) -> np.ndarray:
+        """
+        Create an unweighted trait vector from a dictionary of traits.
+        
+        Args:
+            traits_dict: Dictionary with trait names as keys and values as integers
+            
+        Returns:
+            Range-normalized trait vector as numpy array
+        """
+        return self.create_trait_vector(traits_from_dict(traits_dict))
+    
+    def get_weight_vector(self, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Get trait weights as a vector aligned with create_trait_vector.
+        
+        Args:
+            weights: Optional per-query weights overriding the stored trait_weights
+            
+        Returns:
+            Weight vector as numpy array (in trait_names order)
+        """
+        merged = dict(self.trait_weights)
+        if weights:
+            unknown = set(weights) - set(merged)
+            if unknown:
+                raise ValueError(f"Unknown traits in weights: {sorted(unknown)}")
+            merged.update(weights)
+        return np.array([merged[trait_name] for trait_name in self.trait_names], dtype=float)
+    
     def create_embedding(self, dog_traits: DogTraits) -> np.ndarray:
         """
         Create a vector embedding from dog traits.
@@ -72,25 +144,8 @@ class DogVectorEmbedder:
         Returns:
             Normalized vector embedding as numpy array
         """
-        # Convert traits to dictionary for easier processing
-        traits_dict = {
-            'age': dog_traits.age,
-            'weight': dog_traits.weight,
-            'sex': dog_traits.sex,
-            'neutered': dog_traits.neutered,
-            'sociability': dog_traits.sociability,
-            'temperament': dog_traits.temperament
-        }
-        
-        # Normalize and weight each trait
-        embedding = []
-        for trait_name, value in traits_dict.items():
-            normalized_value = self.normalize_trait(trait_name, value)
-            weighted_value = normalized_value * self.trait_weights[trait_name]
-            embedding.append(weighted_value)
-        
-        # Convert to numpy array and normalize the entire vector
-        embedding_vector = np.array(embedding)
+        # Weight each range-normalized trait
+        embedding_vector = self.create_trait_vector(dog_traits) * self.get_weight_vector()
         
         # L2 normalization to ensure unit vector
         norm = np.linalg.norm(embedding_vector)
@@ -109,21 +164,15 @@ class DogVectorEmbedder:
         Returns:
             Normalized vector embedding as numpy array
         """
-        dog_traits = DogTraits(
-            age=traits_dict.get('age', 0),
-            weight=traits_dict.get('weight', 0),
-            sex=traits_dict.get('sex', 0),
-            neutered=traits_dict.get('neutered', 0),
-            sociability=traits_dict.get('sociability', 1),
-            temperament=traits_dict.get('temperament', 1)
-        )
-        
-        return self.create_embedding(dog_traits)
+        return self.create_embedding(traits_from_dict(traits_dict))
     
     def update_trait_weights(self, new_weights: Dict[str, float]) -> None:
         """
         Update the weights for trait importance.
         
+        Embeddings from create_embedding bake these weights in and must be
+        recreated afterwards; trait vectors from create_trait_vector do not.
+        
         Args:
             new_weights: Dictionary with trait names and their new weights
         """